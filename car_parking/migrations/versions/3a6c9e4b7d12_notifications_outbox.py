@@ -0,0 +1,36 @@
+"""'notifications_outbox'
+
+Revision ID: 3a6c9e4b7d12
+Revises: 8d3f6a1c2e57
+Create Date: 2026-10-18 18:05:47.226391
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3a6c9e4b7d12'
+down_revision = '8d3f6a1c2e57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('notifications_table',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=30), nullable=False),
+    sa.Column('payload', sa.JSON(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('delivered_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('attempts', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_notifications_pending', 'notifications_table', ['id'], unique=False,
+                    postgresql_where=sa.text('delivered_at IS NULL'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_notifications_pending', table_name='notifications_table',
+                  postgresql_where=sa.text('delivered_at IS NULL'))
+    op.drop_table('notifications_table')
@@ -0,0 +1,24 @@
+"""'parking_occupancy_index'
+
+Revision ID: 5b1e7c2d9a40
+Revises: bbd1b831e087
+Create Date: 2026-10-18 10:12:41.318254
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b1e7c2d9a40'
+down_revision = 'bbd1b831e087'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_parking_enter_departure', 'parking_places_table', ['enter_time', 'departure_time'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_parking_enter_departure', table_name='parking_places_table')
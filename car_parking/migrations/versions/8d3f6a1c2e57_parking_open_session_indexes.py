@@ -0,0 +1,45 @@
+"""'parking_open_session_indexes'
+
+Revision ID: 8d3f6a1c2e57
+Revises: 5b1e7c2d9a40
+Create Date: 2026-10-18 14:37:05.902613
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d3f6a1c2e57'
+down_revision = '5b1e7c2d9a40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # close duplicate open sessions left by racing gates, the newest one stays open, the older
+    # ones become empty closed sessions so the history, the invoices and the occupancy don't
+    # count them
+    op.execute(
+        """
+        UPDATE parking_places_table p
+        SET status = true, departure_time = p.enter_time, duration = 0, amount_paid = 0
+        WHERE p.status = false
+          AND EXISTS (
+            SELECT 1 FROM parking_places_table newer
+            WHERE newer.license_plate = p.license_plate
+              AND newer.status = false
+              AND newer.id > p.id
+          )
+        """
+    )
+    op.create_index('ux_parking_open_license_plate', 'parking_places_table', ['license_plate'], unique=True,
+                    postgresql_where=sa.text('status = false'))
+    op.create_index('ix_parking_license_plate_enter', 'parking_places_table', ['license_plate', 'enter_time'],
+                    unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_parking_license_plate_enter', table_name='parking_places_table')
+    op.drop_index('ux_parking_open_license_plate', table_name='parking_places_table',
+                  postgresql_where=sa.text('status = false'))
@@ -0,0 +1,24 @@
+"""'parking_departure_index'
+
+Revision ID: c4f2a9d81b36
+Revises: 3a6c9e4b7d12
+Create Date: 2026-10-18 21:14:09.508137
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4f2a9d81b36'
+down_revision = '3a6c9e4b7d12'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_parking_departure', 'parking_places_table', ['departure_time'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_parking_departure', table_name='parking_places_table')
@@ -0,0 +1,26 @@
+"""'notifications_lease'
+
+Revision ID: e5d1b7a3c960
+Revises: c4f2a9d81b36
+Create Date: 2026-10-18 22:03:41.271845
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5d1b7a3c960'
+down_revision = 'c4f2a9d81b36'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('notifications_table', sa.Column('locked_until', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('notifications_table', sa.Column('claimed_by', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('notifications_table', 'claimed_by')
+    op.drop_column('notifications_table', 'locked_until')
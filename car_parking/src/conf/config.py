@@ -8,6 +8,12 @@ load_dotenv()
 
 class Settings(BaseSettings):
     sqlalchemy_database_url: str = os.environ.get('SQLALCHEMY_DATABASE_URL')
+    sqlalchemy_async_database_url: str = os.environ.get('SQLALCHEMY_ASYNC_DATABASE_URL', '')
+    db_pool_size: int = os.environ.get('DB_POOL_SIZE', 5)
+    db_max_overflow: int = os.environ.get('DB_MAX_OVERFLOW', 10)
+    db_pool_timeout: float = os.environ.get('DB_POOL_TIMEOUT', 30)
+    db_pool_recycle: int = os.environ.get('DB_POOL_RECYCLE', 1800)
+    db_pool_pre_ping: bool = os.environ.get('DB_POOL_PRE_PING', True)
     secret_key: str = os.environ.get('SECRET_KEY')
     algorithm: str = os.environ.get('ALGORITHM')
     mail_username: str = os.environ.get('MAIL_USERNAME')
@@ -15,6 +21,16 @@ class Settings(BaseSettings):
     mail_from: EmailStr = os.environ.get('MAIL_FROM')
     mail_port: int = os.environ.get('MAIL_PORT')
     mail_server: str = os.environ.get('MAIL_SERVER')
+    mail_connections: int = os.environ.get('MAIL_CONNECTIONS', 2)
+    mail_batch_size: int = os.environ.get('MAIL_BATCH_SIZE', 50)
+    mail_max_retries: int = os.environ.get('MAIL_MAX_RETRIES', 5)
+    mail_queue_size: int = os.environ.get('MAIL_QUEUE_SIZE', 10000)
+    mail_idle_timeout: float = os.environ.get('MAIL_IDLE_TIMEOUT', 60)
+    outbox_poll_interval: float = os.environ.get('OUTBOX_POLL_INTERVAL', 1.0)
+    outbox_batch_size: int = os.environ.get('OUTBOX_BATCH_SIZE', 50)
+    outbox_max_attempts: int = os.environ.get('OUTBOX_MAX_ATTEMPTS', 10)
+    outbox_lease_seconds: int = os.environ.get('OUTBOX_LEASE_SECONDS', 120)
+    outbox_redis: bool = os.environ.get('OUTBOX_REDIS', False)
     cloudinary_name: str = os.environ.get('CLOUDINARY_NAME')
     cloudinary_api_key: str = os.environ.get('CLOUDINARY_API_KEY')
     cloudinary_api_secret: str = os.environ.get('CLOUDINARY_API_SECRET')
@@ -23,6 +39,43 @@ class Settings(BaseSettings):
     redis_host: str = os.environ.get('REDIS_HOST')
     redis_port: int = os.environ.get('REDIS_PORT')
     redis_db: int = os.environ.get('REDIS_DB')
+    inference_pool: str = os.environ.get('INFERENCE_POOL', 'thread')
+    inference_workers: int = os.environ.get('INFERENCE_WORKERS', 2)
+    inference_max_pending: int = os.environ.get('INFERENCE_MAX_PENDING', 8)
+    inference_warm_up: bool = os.environ.get('INFERENCE_WARM_UP', True)
+    classifier_batch_max_samples: int = os.environ.get('CLASSIFIER_BATCH_MAX_SAMPLES', 64)
+    classifier_batch_max_wait_ms: float = os.environ.get('CLASSIFIER_BATCH_MAX_WAIT_MS', 10)
+    image_max_pixels: int = os.environ.get('IMAGE_MAX_PIXELS', 25_000_000)
+    image_max_side: int = os.environ.get('IMAGE_MAX_SIDE', 4096)
+    image_decode_workers: int = os.environ.get('IMAGE_DECODE_WORKERS', 2)
+    image_decode_max_pending: int = os.environ.get('IMAGE_DECODE_MAX_PENDING', 16)
+    plate_min_confidence: float = os.environ.get('PLATE_MIN_CONFIDENCE', 0.0)
+    recognize_batch_max_files: int = os.environ.get('RECOGNIZE_BATCH_MAX_FILES', 32)
+    recognize_batch_max_pixels: int = os.environ.get('RECOGNIZE_BATCH_MAX_PIXELS', 100_000_000)
+    recognition_cache_size: int = os.environ.get('RECOGNITION_CACHE_SIZE', 1024)
+    recognition_cache_ttl: int = os.environ.get('RECOGNITION_CACHE_TTL', 60)
+    recognition_cache_redis: bool = os.environ.get('RECOGNITION_CACHE_REDIS', False)
+    recognition_cache_phash: bool = os.environ.get('RECOGNITION_CACHE_PHASH', False)
+    jwt_backend: str = os.environ.get('JWT_BACKEND', 'jose')
+    jwt_cache_size: int = os.environ.get('JWT_CACHE_SIZE', 4096)
+    password_hash_rounds: int = os.environ.get('PASSWORD_HASH_ROUNDS', 12)
+    password_hash_workers: int = os.environ.get('PASSWORD_HASH_WORKERS', 2)
+    password_hash_max_pending: int = os.environ.get('PASSWORD_HASH_MAX_PENDING', 32)
+    user_cache_ttl: int = os.environ.get('USER_CACHE_TTL', 900)
+    token_blacklist_bloom_size: int = os.environ.get('TOKEN_BLACKLIST_BLOOM_SIZE', 1 << 20)
+    token_blacklist_bloom_hashes: int = os.environ.get('TOKEN_BLACKLIST_BLOOM_HASHES', 7)
+    token_blacklist_rebuild_interval: int = os.environ.get('TOKEN_BLACKLIST_REBUILD_INTERVAL', 3600)
+    tariff_cache_ttl: int = os.environ.get('TARIFF_CACHE_TTL', 300)
+    tariff_cache_redis: bool = os.environ.get('TARIFF_CACHE_REDIS', False)
+    stream_detect_every: int = os.environ.get('STREAM_DETECT_EVERY', 5)
+    stream_stable_frames: int = os.environ.get('STREAM_STABLE_FRAMES', 5)
+    stream_stable_iou: float = os.environ.get('STREAM_STABLE_IOU', 0.9)
+    classifier_backend: str = os.environ.get('CLASSIFIER_BACKEND', 'keras')
+    classifier_onnx_path: str = os.environ.get('CLASSIFIER_ONNX_PATH', '')
+    detector_input_size: int = os.environ.get('DETECTOR_INPUT_SIZE', 416)
+    detector_refine_size: int = os.environ.get('DETECTOR_REFINE_SIZE', 832)
+    detector_conf_threshold: float = os.environ.get('DETECTOR_CONF_THRESHOLD', 0.5)
+    detector_nms_threshold: float = os.environ.get('DETECTOR_NMS_THRESHOLD', 0.4)
 
     class Config:
         env_file = ".env"
@@ -1,15 +1,58 @@
 from contextlib import contextmanager
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
 from ..conf.config import settings
+from .pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool
 
 
 SQLALCHEMY_DATABASE_URL = settings.sqlalchemy_database_url
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+
+POOL_OPTIONS = dict(
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    pool_recycle=settings.db_pool_recycle,
+    # drops connections killed by a postgres restart instead of failing the request
+    pool_pre_ping=settings.db_pool_pre_ping,
+)
+
+# sync engine stays for alembic and scripts
+engine = create_engine(SQLALCHEMY_DATABASE_URL, poolclass=InstrumentedQueuePool, **POOL_OPTIONS)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+def get_async_database_url(url: str):
+    url = make_url(url)
+    if url.drivername.startswith("postgresql"):
+        url = url.set(drivername="postgresql+asyncpg")
+    return url
+
+
+ASYNC_SQLALCHEMY_DATABASE_URL = (
+    settings.sqlalchemy_async_database_url
+    or get_async_database_url(SQLALCHEMY_DATABASE_URL)
+)
+async_engine = create_async_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URL, poolclass=InstrumentedAsyncQueuePool, **POOL_OPTIONS
+)
+
+# objects stay usable after commit, lazy loading is not possible on an async session
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+
+def pool_stats() -> dict:
+    # engine.pool is replaced on dispose, read it on every call
+    return {
+        "async": async_engine.pool.stats(),
+        "sync": engine.pool.stats(),
+    }
+
+
 # Dependency
 def get_db():
     db = SessionLocal()
@@ -19,6 +62,12 @@ def get_db():
         db.close()
 
 
+# Async dependency
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 @contextmanager
 def db_transaction(session: Session):
     try:
@@ -7,6 +7,8 @@ from sqlalchemy import (
     func,
     CheckConstraint,
     Numeric,
+    Index,
+    JSON,
 )
 from sqlalchemy.orm import relationship, declarative_base
 from sqlalchemy.sql.sqltypes import DateTime
@@ -61,6 +63,22 @@ class Parking(Base):
     duration = Column(Numeric)
     car = relationship("Car", uselist=False, back_populates="parking_place")
 
+    __table_args__ = (
+        # occupancy at a moment: enter_time <= t < departure_time
+        Index("ix_parking_enter_departure", "enter_time", "departure_time"),
+        # departures inside a window of the occupancy timeline
+        Index("ix_parking_departure", "departure_time"),
+        # at most one open session per car, also serves the gate lookup
+        Index(
+            "ux_parking_open_license_plate",
+            "license_plate",
+            unique=True,
+            postgresql_where=status == False,
+        ),
+        # parking history of a car
+        Index("ix_parking_license_plate_enter", "license_plate", "enter_time"),
+    )
+
 
 """
 # Define an event listener to automatically update exit_time
@@ -107,3 +125,23 @@ class BlacklistedToken(Base):
         "user_id", ForeignKey("users_table.id", ondelete="CASCADE"), unique=True
     )
     user = relationship("User", back_populates="blacklisted_token")
+
+
+# outbox row, written in the gate transaction and delivered by the outbox worker
+class Notification(Base):
+    __tablename__ = "notifications_table"
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(30), nullable=False)
+    payload = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    delivered_at = Column(DateTime(timezone=True))
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    # lease of the worker delivering the row, also delays the retry after a failed delivery
+    locked_until = Column(DateTime(timezone=True))
+    claimed_by = Column(String(64))
+
+    __table_args__ = (
+        # the worker and the backlog metric only look at undelivered rows
+        Index("ix_notifications_pending", "id", postgresql_where=delivered_at.is_(None)),
+    )
@@ -0,0 +1,64 @@
+import threading
+import time
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+# times every connection checkout, _do_get is where a request waits for a free or overflow connection
+class PoolStatsMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.checkout_timeouts = 0
+        self.checkout_seconds = 0.0
+        self.checkout_max_seconds = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            with self._stats_lock:
+                self.checkout_timeouts += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._stats_lock:
+                self.checkouts += 1
+                self.checkout_seconds += elapsed
+                self.checkout_max_seconds = max(self.checkout_max_seconds, elapsed)
+
+    def recreate(self):
+        # called on invalidation after a database restart, keep the counters
+        pool = super().recreate()
+        pool._stats_lock = self._stats_lock
+        pool.checkouts = self.checkouts
+        pool.checkout_timeouts = self.checkout_timeouts
+        pool.checkout_seconds = self.checkout_seconds
+        pool.checkout_max_seconds = self.checkout_max_seconds
+        return pool
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            checkouts = self.checkouts
+            return {
+                "size": self.size(),
+                "max_overflow": self._max_overflow,
+                "in_use": self.checkedout(),
+                "idle": self.checkedin(),
+                "overflow": max(self.overflow(), 0),
+                "checkouts": checkouts,
+                "checkout_timeouts": self.checkout_timeouts,
+                "avg_checkout_ms": round(self.checkout_seconds / checkouts * 1000, 3) if checkouts else 0.0,
+                "max_checkout_ms": round(self.checkout_max_seconds * 1000, 3),
+            }
+
+
+class InstrumentedQueuePool(PoolStatsMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(PoolStatsMixin, AsyncAdaptedQueuePool):
+    pass
@@ -0,0 +1,11 @@
+import redis.asyncio as redis
+
+from ..conf.config import settings
+
+
+# one connection pool per worker, shared by the caches, the blacklist and the outbox
+redis_client = redis.Redis(
+    host=settings.redis_host,
+    port=settings.redis_port,
+    password=settings.redis_password,
+)
@@ -6,48 +6,55 @@ import os
 from pathlib import Path
 
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from typing import Optional, Type
 from car_parking.src.repository import users as repository_users
+from car_parking.src.services.tariff_cache import tariff_cache
+from car_parking.src.services.user_cache import user_cache
 
 
-async def change_user_role(user: User, body: UserRoleUpdate, db: Session) -> User:
+async def change_user_role(user: User, body: UserRoleUpdate, db: AsyncSession) -> User:
     user.role = body.role
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await user_cache.invalidate(user.email)
+    await db.refresh(user)
     return user
 
 
-async def delete_user(user_id: int, db: Session) -> None:
-    user = db.query(User).filter(User.id == user_id).first()
+async def delete_user(user_id: int, db: AsyncSession) -> None:
+    user = await db.scalar(select(User).filter(User.id == user_id))
     if user:
-        db.delete(user)
-        db.commit()
+        await db.delete(user)
+        await db.commit()
+        await user_cache.invalidate(user.email)
     return None
 
 
-async def return_all_users(db: Session) -> dict:
-    users = db.query(User).all()
+async def return_all_users(db: AsyncSession) -> dict:
+    users = (await db.scalars(select(User))).all()
     usernames = {f"username(id: {user.id})": user.username for user in users}
     return usernames
 
 
-async def update_banned_status(user: User, db: Session):
+async def update_banned_status(user: User, db: AsyncSession):
     user.banned = True
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await user_cache.invalidate(user.email)
+    await db.refresh(user)
     return user
 
 
-async def update_unbanned_status(user: User, db: Session):
+async def update_unbanned_status(user: User, db: AsyncSession):
     user.banned = False
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await user_cache.invalidate(user.email)
+    await db.refresh(user)
     return user
 
 
-async def create_parking_csv(license_plate, filename, db: Session):
+async def create_parking_csv(license_plate, filename, db: AsyncSession):
     default_dir = r"\csv_files"
     path = str(Path(__file__).parent.parent.parent) + default_dir
     file_path = os.path.join(path, f"{filename}.csv")
@@ -85,8 +92,8 @@ async def create_parking_csv(license_plate, filename, db: Session):
     return "CSV file created"
 
 
-async def get_user_by_email(email: str, db: Session) -> Optional[User]:
-    return db.query(User).filter_by(email=email).first()
+async def get_user_by_email(email: str, db: AsyncSession) -> Optional[User]:
+    return await db.scalar(select(User).filter_by(email=email))
 
 
 # async def admin_edit_user(user_id, new_data):
@@ -105,32 +112,34 @@ async def get_user_by_email(email: str, db: Session) -> Optional[User]:
 #         print("Користувача з таким ID не знайдено.")
 
 
-async def get_all_users(db: Session) -> list[Type[User]]:
-    users = db.query(User).all()
+async def get_all_users(db: AsyncSession) -> list[Type[User]]:
+    users = (await db.scalars(select(User))).all()
     return users
 
 
 async def change_tariff(
     user_id: int,
     new_tariff: str,
-    db: Session,
+    db: AsyncSession,
 ):
     user = await repository_users.get_user_by_id(user_id=user_id, db=db)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    tariff = db.query(Tariff).filter(Tariff.tariff_name == new_tariff).first()
+    tariff = await tariff_cache.get_by_name(new_tariff, db)
     if not tariff:
         raise HTTPException(status_code=404, detail="Tariff not found")
 
     user.tariff_id = tariff.id
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await user_cache.invalidate(user.email)
+    await db.refresh(user)
     return {"message": "Tariff changed successfully"}
 
 
-async def add_tariff(tariff_name: str, tariff_cost: int, db: Session):
+async def add_tariff(tariff_name: str, tariff_cost: int, db: AsyncSession):
     new_tariff = Tariff(tariff_name=tariff_name, tariff_value=tariff_cost)
     db.add(new_tariff)
-    db.commit()
+    await db.commit()
+    await tariff_cache.invalidate()
     return f"Tariff {tariff_name} has been created"
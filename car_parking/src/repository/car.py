@@ -1,29 +1,30 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from car_parking.src.database.models import Car
 
 
-async def create_car(license_plate, db: Session) -> Car:
+async def create_car(license_plate, db: AsyncSession) -> Car:
     license_plate = license_plate.upper()
     car = Car(license_plate=license_plate)
     db.add(car)
-    db.commit()
+    await db.commit()
     return car
 
 
-async def get_car_by_license_plate(license_plate: str, db: Session) -> Car | None:
-    return db.query(Car).filter(Car.license_plate == license_plate).first()
+async def get_car_by_license_plate(license_plate: str, db: AsyncSession) -> Car | None:
+    return await db.scalar(select(Car).filter(Car.license_plate == license_plate))
 
 
-async def update_car_banned_status(car: Car, db: Session):
+async def update_car_banned_status(car: Car, db: AsyncSession):
     car.banned = True
-    db.commit()
-    db.refresh(car)
+    await db.commit()
+    await db.refresh(car)
     return car
 
 
-async def update_car_unbanned_status(car: Car, db: Session):
+async def update_car_unbanned_status(car: Car, db: AsyncSession):
     car.banned = False
-    db.commit()
-    db.refresh(car)
+    await db.commit()
+    await db.refresh(car)
     return car
@@ -0,0 +1,41 @@
+from sqlalchemy import update, select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from car_parking.src.database.models import Parking, Parking_count
+
+
+async def reserve_place(db: AsyncSession) -> bool:
+    # check and increment in one statement, concurrent gates can't overbook
+    result = await db.execute(
+        update(Parking_count)
+        .where(Parking_count.ococcupied_quantity < Parking_count.total_quantity)
+        .values(ococcupied_quantity=Parking_count.ococcupied_quantity + 1)
+        .returning(Parking_count.ococcupied_quantity)
+        .execution_options(synchronize_session=False)
+    )
+    return result.first() is not None
+
+
+async def release_place(db: AsyncSession) -> None:
+    await db.execute(
+        update(Parking_count)
+        .where(Parking_count.ococcupied_quantity > 0)
+        .values(ococcupied_quantity=Parking_count.ococcupied_quantity - 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def reconcile_occupancy(db: AsyncSession) -> int:
+    # counter is derived from the open parking sessions, fixes any drift
+    occupied = (
+        select(func.count(Parking.id))
+        .where(Parking.status == False)
+        .scalar_subquery()
+    )
+    await db.execute(
+        update(Parking_count)
+        .values(ococcupied_quantity=occupied)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return await db.scalar(select(Parking_count.ococcupied_quantity))
@@ -1,18 +1,22 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func, or_, text
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import File
 # from src.database.models import User, Image
-from ..database.models import User, Parking, Car, Parking_count, Tariff
+from ..database.models import User, Parking, Parking_count
 from ..schemas.users import UserModel, UserRoleUpdate, UserParkingResponse, UserResponse
-from ..schemas.parking import CurrentParking, ParkingResponse, ParkingInfo, ParkingSchema
-from ..repository.car import create_car
+from ..schemas.parking import CurrentParking, ParkingResponse, ParkingInfo, ParkingSchema, OccupancyBucket
 # from ..conf.tariffs import STANDART, AUTORIZED
 from ..conf.extensions import EXTENSIONS
-from ..repository import users as repository_users
-from datetime import datetime, timezone
+from ..repository import occupancy as repository_occupancy
+from ..services.tariff_cache import tariff_cache
+from datetime import datetime, timedelta, timezone
 import pytz
 from decimal import Decimal
 
 
+MAX_OCCUPANCY_BUCKETS = 1000
+
+
 def calculate_datetime_difference(start_time, end_time):
     time_difference = end_time - start_time
     hours = time_difference.days * 24 + time_difference.seconds / 3600
@@ -24,29 +28,17 @@ def calculate_cost(hours, cost):
     return round(result, 2)
 
 
-async def create_parking_place(license_plate: str, db: Session):
-    parking_place = Parking(license_plate=license_plate)
-
-    db.add(parking_place)
-    db.commit()
-    return parking_place
-
-
-async def change_parking_status_not_authorised(parking_place_id: int, db: Session):
-    parking_place = db.query(Parking).filter(Parking.id == parking_place_id).first()
-    user = db.query(User).filter(User.license_plate == parking_place.license_plate).first()
+async def change_parking_status_not_authorised(parking_place_id: int, db: AsyncSession):
+    parking_place = await db.scalar(select(Parking).filter(Parking.id == parking_place_id))
+    user = await db.scalar(select(User).filter(User.license_plate == parking_place.license_plate))
     departure_time = datetime.now(pytz.timezone('Europe/Kiev'))
     duration = calculate_datetime_difference(parking_place.enter_time, departure_time)
+    was_open = not parking_place.status
     parking_place.status = True
     parking_place.departure_time = departure_time
     parking_place.duration = duration
-    count = db.query(Parking_count).first()
-    if user:
-        tariff = db.query(Tariff).filter_by(id=user.tariff_id).first()
-        parking_place.amount_paid = calculate_cost(duration, int(tariff.tariff_value))
-    else:
-        tariff = db.query(Tariff).filter_by(id=1).first()
-        parking_place.amount_paid = calculate_cost(duration, int(tariff.tariff_value))
+    tariff = await tariff_cache.get_by_id(user.tariff_id if user else 1, db)
+    parking_place.amount_paid = calculate_cost(duration, int(tariff.tariff_value))
     parking = ParkingSchema(info=ParkingResponse(
                                     id=parking_place.id,
                                     enter_time=parking_place.enter_time.strftime("%Y-%m-%d %H:%M:%S"),
@@ -56,16 +48,17 @@ async def change_parking_status_not_authorised(parking_place_id: int, db: Sessio
                                     duration=parking_place.duration,
                                     status=False),
                 status=f"The barrier is open, See you next time!")
-    count.ococcupied_quantity -= 1
-    db.commit()
+    if was_open:
+        await repository_occupancy.release_place(db)
+    await db.commit()
     return parking
 
 
 
-async def change_parking_status_authorised(parking_place_id: int, db: Session):
-    parking_place = db.query(Parking).filter(Parking.id == parking_place_id).first()
+async def change_parking_status_authorised(parking_place_id: int, db: AsyncSession):
+    parking_place = await db.scalar(select(Parking).filter(Parking.id == parking_place_id))
+    was_open = not parking_place.status
     parking_place.status = True
-    count = db.query(Parking_count).first()
     parking_status = ParkingSchema(info=ParkingResponse(
                                             id=parking_place.id,
                                             enter_time=parking_place.enter_time.strftime("%Y-%m-%d %H:%M:%S"),
@@ -75,154 +68,109 @@ async def change_parking_status_authorised(parking_place_id: int, db: Session):
                                             duration=parking_place.duration,
                                             status=False),
                         status=f"The barrier is open, See you next time!")
-    count.ococcupied_quantity -= 1
-    db.commit()
+    if was_open:
+        await repository_occupancy.release_place(db)
+    await db.commit()
     return parking_status
 
 
-async def calculate_invoice(parking_place_id: int, db: Session):
-    parking_place = db.query(Parking).filter(Parking.id == parking_place_id).first()
-    user = (
-        db.query(User).filter(User.license_plate == parking_place.license_plate).first()
-    )
-    departure_time = datetime.now(pytz.timezone("Europe/Kiev"))
-    duration = calculate_datetime_difference(parking_place.enter_time, departure_time)
-    parking_place.departure_time = departure_time
-    parking_place.duration = duration
-    if user:
-        tariff = db.query(Tariff).filter_by(id=user.tariff_id).first()
-        parking_place.amount_paid = calculate_cost(duration, int(tariff.tariff_value))
-    else:
-        tariff = db.query(Tariff).filter_by(id=1).first()
-        parking_place.amount_paid = calculate_cost(duration, int(tariff.tariff_value))
-    db.commit()
-    return parking_place
-
-
-async def entry_to_the_parking(license_plate: str, db: Session):
-    car = db.query(Car).filter(Car.license_plate == license_plate).first()
-
-    count = db.query(Parking_count).first()
-    if count.ococcupied_quantity == count.total_quantity:
-        return "Sorry we don't have places for parking"
-    if not car:
-        await create_car(license_plate, db)
-    parking_place = (
-        db.query(Parking)
-        .filter(Parking.license_plate == license_plate, Parking.status == False)
-        .first()
-    )
-
-    user = await repository_users.get_user_by_car_license_plate(license_plate, db)
-    # if user:
-    if not parking_place:
-        parking_place = await create_parking_place(license_plate, db)
-        parking = ParkingSchema(
-            info=ParkingResponse(
-                enter_time=parking_place.enter_time.strftime("%Y-%m-%d %H:%M:%S"),
-                departure_time=parking_place.departure_time,
-                license_plate=parking_place.license_plate,
-                amount_paid=parking_place.amount_paid,
-                duration=parking_place.duration,
-                status=False,
-            ),
-            status=f"Parking successful, please check your email<< {user.email} >> for details"
-            if user
-            else "Parking successful, to get details please sign up for our Car Parking service",
-        )
-        count.ococcupied_quantity += 1
-        db.commit()
-        return parking
-
-    parking = ParkingSchema(
-        info=ParkingResponse(
-            enter_time=parking_place.enter_time.strftime("%Y-%m-%d %H:%M:%S"),
-            departure_time=parking_place.departure_time,
-            license_plate=parking_place.license_plate,
-            amount_paid=parking_place.amount_paid,
-            duration=parking_place.duration,
-            status=False,
-        ),
-        status="This car already in parking.",
-    )
-    return parking
-
-
-async def exit_from_the_parking(license_plate: str, db: Session):
-
-    user = await repository_users.get_user_by_car_license_plate(license_plate, db)
-    # if user:
-    parking_place = (
-        db.query(Parking)
-        .filter(Parking.license_plate == license_plate, Parking.status == False)
-        .first()
-    )
-    if parking_place:
-        parking_place = await calculate_invoice(parking_place.id, db)
-        departure_time = datetime.now(pytz.timezone("Europe/Kiev"))
-        duration = calculate_datetime_difference(
-            parking_place.enter_time, departure_time
-        )
-        parking_place.duration = duration
-        parking = ParkingSchema(
-            info=ParkingResponse(
-                enter_time=parking_place.enter_time.strftime("%Y-%m-%d %H:%M:%S"),
-                departure_time=parking_place.departure_time.strftime(
-                    "%Y-%m-%d %H:%M:%S"
-                ),
-                license_plate=parking_place.license_plate,
-                amount_paid=parking_place.amount_paid,
-                duration=parking_place.duration,
-                status=False,
-            ),
-            status=f"Parking invoice sent to your email << {user.email}>>. Please confirm payment"
-            if user
-            else f"Your parking ID = << {parking_place.id} >>Confirm payment, please.",
-        )
-        return parking
-    return "This car not in parking"
-
-
-async def seed_parking_count(db: Session):
-    if db.query(Parking_count).count() == 0:
+async def seed_parking_count(db: AsyncSession):
+    if await db.scalar(select(func.count(Parking_count.id))) == 0:
         tariffs_data = [
             {"total_quantity": 30, "ococcupied_quantity": 0},
         ]
         for data in tariffs_data:
             tariff = Parking_count(**data)
             db.add(tariff)
-        db.commit()
-    db.close()
+        await db.commit()
+    await db.close()
 
 
-async def free_parking_places(date: str, db: Session):
+def parse_kiev_datetime(date: str) -> datetime:
     date_format = "%Y.%m.%d %H:%M"
+    dt = datetime.strptime(date, date_format)
+    kiev_timezone = pytz.timezone("Europe/Kiev")
+    return kiev_timezone.localize(dt)
+
+
+async def free_parking_places(date: str, db: AsyncSession):
+    try:
+        dt = parse_kiev_datetime(date)
+    except ValueError:
+        return "Wrong date format"
+    # counted in the database, served by ix_parking_enter_departure
+    occupied_places = await db.scalar(
+        select(func.count(Parking.id)).filter(
+            Parking.enter_time <= dt,
+            or_(Parking.departure_time.is_(None), Parking.departure_time > dt),
+        )
+    )
+    return occupied_places
+
+
+async def occupancy_timeline(start: str, end: str, bucket_minutes: int, db: AsyncSession):
     try:
-        dt = datetime.strptime(date, date_format)
-        kiev_timezone = pytz.timezone("Europe/Kiev")
-        dt = kiev_timezone.localize(dt)
-        all_parking = db.query(Parking).all()
-        quantity = db.query(Parking_count).first()
-        all_places = 0
-        for parking in all_parking:
-            if parking.enter_time <= dt and (
-                parking.departure_time is None or dt < parking.departure_time
-            ):
-                all_places += 1
-        free_places = quantity.total_quantity - all_places
-        occupied_places = all_places
-        return occupied_places
-    except Exception:
+        start_dt = parse_kiev_datetime(start)
+        end_dt = parse_kiev_datetime(end)
+    except ValueError:
         return "Wrong date format"
+    if bucket_minutes <= 0 or end_dt < start_dt:
+        return "Wrong time window"
+    step = timedelta(minutes=bucket_minutes)
+    if (end_dt - start_dt) / step > MAX_OCCUPANCY_BUCKETS:
+        return f"Too many buckets, maximum is {MAX_OCCUPANCY_BUCKETS}"
+
+    buckets = int((end_dt - start_dt) / step)
+    # event sweep in one query: the sessions open at the start, then +1 for every enter and
+    # -1 for every departure inside the window, summed per bucket and accumulated over the
+    # buckets, so every session is read once instead of once per bucket
+    rows = (await db.execute(
+        text(
+            """
+            WITH opened AS (
+                SELECT count(*) AS occupied FROM parking_places_table
+                WHERE enter_time <= :start AND (departure_time IS NULL OR departure_time > :start)
+            ),
+            events AS (
+                SELECT enter_time AS ts, 1 AS delta FROM parking_places_table
+                WHERE enter_time > :start AND enter_time <= :last
+                UNION ALL
+                SELECT departure_time, -1 FROM parking_places_table
+                WHERE departure_time > :start AND departure_time <= :last
+            ),
+            changes AS (
+                -- an event counts from the first bucket edge at or after it
+                SELECT CAST(ceil(extract(epoch FROM ts - :start) / :step_seconds) AS integer) AS n,
+                       sum(delta) AS delta
+                FROM events
+                GROUP BY 1
+            )
+            SELECT CAST(:start AS timestamptz) + buckets.n * CAST(:step AS interval) AS bucket,
+                   opened.occupied + sum(coalesce(changes.delta, 0)) OVER (ORDER BY buckets.n) AS occupied
+            FROM generate_series(0, :buckets) AS buckets(n)
+            CROSS JOIN opened
+            LEFT JOIN changes ON changes.n = buckets.n
+            ORDER BY buckets.n
+            """
+        ),
+        {
+            "start": start_dt,
+            "last": start_dt + buckets * step,
+            "step": step,
+            "step_seconds": step.total_seconds(),
+            "buckets": buckets,
+        },
+    )).all()
+    return [OccupancyBucket(time=row.bucket, occupied=row.occupied) for row in rows]
 
 
 async def get_parking_place_by_car_license_plate(
-    license_plate: str, db: Session
+    license_plate: str, db: AsyncSession
 ) -> Parking | None:
-    return (
-        db.query(Parking)
-        .filter(Parking.license_plate == license_plate, Parking.status == False)
-        .first()
+    return await db.scalar(
+        select(Parking).filter(
+            Parking.license_plate == license_plate, Parking.status == False
+        )
     )
 
 
@@ -1,15 +1,16 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from car_parking.src.database.models import Tariff
 
 
-async def get_tariff_by_tariff_id(tariff_id: int, db: Session) -> Tariff | None:
-    tariff = db.query(Tariff).filter(Tariff.id == tariff_id).first()
+async def get_tariff_by_tariff_id(tariff_id: int, db: AsyncSession) -> Tariff | None:
+    tariff = await db.scalar(select(Tariff).filter(Tariff.id == tariff_id))
     return tariff
 
 
-async def seed_tariff_table(db: Session):
-    if db.query(Tariff).count() == 0:
+async def seed_tariff_table(db: AsyncSession):
+    if await db.scalar(select(func.count(Tariff.id))) == 0:
         tariffs_data = [
             {"tariff_name": "STANDART", "tariff_value": 30},
             {"tariff_name": "AUTORIZED", "tariff_value": 20},
@@ -19,5 +20,5 @@ async def seed_tariff_table(db: Session):
         for data in tariffs_data:
             tariff = Tariff(**data)
             db.add(tariff)
-        db.commit()
-    db.close()
+        await db.commit()
+    await db.close()
@@ -1,6 +1,7 @@
 import pytz
-from sqlalchemy.orm import Session
-from car_parking.src.database.models import User, Parking, Tariff, Car
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from car_parking.src.database.models import User, Parking, Car
 from car_parking.src.schemas.users import (
     UserModel,
     UserParkingResponse,
@@ -8,6 +9,8 @@ from car_parking.src.schemas.users import (
     UserByCarResponse,
 )
 from car_parking.src.schemas.parking import CurrentParking, ParkingResponse, ParkingInfo
+from car_parking.src.services.tariff_cache import tariff_cache
+from car_parking.src.services.user_cache import user_cache
 from datetime import datetime
 from decimal import Decimal
 
@@ -23,63 +26,64 @@ def calculate_cost(hours, cost):
     return round(result, 2)
 
 
-async def create_user(body: UserModel, db: Session) -> User:
+async def create_user(body: UserModel, db: AsyncSession) -> User:
     user = User(**body.dict())
     print(body)
     user.license_plate = body.license_plate.upper()
     user.tariff_id = 2
     db.add(user)
-    db.commit()
+    await db.commit()
     if user.id == 1:
         user.role = "admin"
-        db.commit()
-    db.refresh(user)
+        await db.commit()
+    await db.refresh(user)
     return user
 
 
-async def get_user_by_email(email: str, db: Session) -> User | None:
-    return db.query(User).filter(User.email == email).first()
+async def get_user_by_email(email: str, db: AsyncSession) -> User | None:
+    return await db.scalar(select(User).filter(User.email == email))
 
 
-async def get_user_by_username(username: str, db: Session) -> User | None:
-    return db.query(User).filter(User.username == username).first()
+async def get_user_by_username(username: str, db: AsyncSession) -> User | None:
+    return await db.scalar(select(User).filter(User.username == username))
 
 
-async def update_token(user: User, refresh_token: str, db: Session) -> None:
+async def update_token(user: User, refresh_token: str, db: AsyncSession) -> None:
     user.refresh_token = refresh_token
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
 
 
-async def confirmed_email(email: str, db: Session) -> None:
+async def confirmed_email(email: str, db: AsyncSession) -> None:
     user = await get_user_by_email(email, db)
     user.confirmed = True
-    db.commit()
+    await db.commit()
 
 
-async def change_password(user: User, new_password: str, db: Session) -> None:
+async def change_password(user: User, new_password: str, db: AsyncSession) -> None:
     user.password = new_password
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
 
 
-async def get_user_by_id(user_id: int, db: Session) -> User | None:
-    return db.query(User).filter(User.id == user_id).first()
+async def get_user_by_id(user_id: int, db: AsyncSession) -> User | None:
+    return await db.scalar(select(User).filter(User.id == user_id))
 
 
-async def delete_user(user_id: int, db: Session) -> None:
-    user = db.query(User).filter(User.id == user_id).first()
+async def delete_user(user_id: int, db: AsyncSession) -> None:
+    user = await db.scalar(select(User).filter(User.id == user_id))
     if user:
-        db.delete(user)
-        db.commit()
+        await db.delete(user)
+        await db.commit()
+        await user_cache.invalidate(user.email)
     return None
 
 
 async def get_user_by_car_license_plate(
-    license_plate: str, db: Session
+    license_plate: str, db: AsyncSession
 ) -> User | None:
     license_plate = license_plate.upper()
-    user = db.query(User).filter_by(license_plate=license_plate).first()
+    user = await db.scalar(select(User).filter_by(license_plate=license_plate))
     return user
 
 
@@ -97,17 +101,19 @@ async def calculate_amount_duration(list_of_parking: list[[Parking]]):
     return total_duration
 
 
-async def get_parking_info(license_plate: str, db: Session):
+async def get_parking_info(license_plate: str, db: AsyncSession):
     user = await get_user_by_car_license_plate(license_plate, db)
     license_plate = license_plate.upper()
-    car = db.query(Car).filter(Car.license_plate == license_plate).first()
+    car = await db.scalar(select(Car).filter(Car.license_plate == license_plate))
     if not car:
         return "This car is not registered"
     parking_info = (
-        db.query(Parking)
-        .filter(Parking.license_plate == license_plate, Parking.status == True)
-        .all()
-    )
+        await db.scalars(
+            select(Parking).filter(
+                Parking.license_plate == license_plate, Parking.status == True
+            )
+        )
+    ).all()
     total_payment_amount = await calculate_amount_cost(parking_info)
     total_parking_time = await calculate_amount_duration(parking_info)
     parking_history = ParkingInfo(
@@ -130,13 +136,13 @@ async def get_parking_info(license_plate: str, db: Session):
     return parking_history
 
 
-async def get_user_me(user: User, db: Session):
-    user_parking = (
-        db.query(Parking)
-        .filter(Parking.license_plate == user.license_plate, Parking.status == False)
-        .first()
+async def get_user_me(user: User, db: AsyncSession):
+    user_parking = await db.scalar(
+        select(Parking).filter(
+            Parking.license_plate == user.license_plate, Parking.status == False
+        )
     )
-    tariff = db.query(Tariff).filter_by(id=user.tariff_id).first()
+    tariff = await tariff_cache.get_by_id(user.tariff_id, db)
     if user_parking:
         time_on_parking = calculate_datetime_difference(
             user_parking.enter_time, datetime.now(pytz.timezone("Europe/Kiev"))
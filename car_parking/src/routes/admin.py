@@ -6,9 +6,9 @@ from fastapi import (
     Security,
 )
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from car_parking.src.database.db import get_db
+from car_parking.src.database.db import get_async_db
 from car_parking.src.database.models import User
 from car_parking.src.repository import (
     users as repository_users,
@@ -42,7 +42,7 @@ allowd_operation_by_admin = service_roles.RoleRights(["admin"])
 )
 async def get_all_usernames(
     current_user: User = Depends(service_auth.get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     usernames = await repository_admin.return_all_users(db)
     return usernames
@@ -58,10 +58,10 @@ async def get_all_usernames(
     ],
 )
 async def ban_user(
-    user_id: str,
+    user_id: int,
     credentials: HTTPAuthorizationCredentials = Security(security),
     current_user: User = Depends(service_auth.get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     user = await repository_users.get_user_by_id(user_id, db)
     if not user:
@@ -91,10 +91,10 @@ async def ban_user(
     ],
 )
 async def unban_user(
-    user_id: str,
+    user_id: int,
     credentials: HTTPAuthorizationCredentials = Security(security),
     current_user: User = Depends(service_auth.get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     user = await repository_users.get_user_by_id(user_id, db)
     if not user:
@@ -125,7 +125,7 @@ async def unban_user(
 async def delete_user(
     user_id: int,
     current_user: User = Depends(service_auth.get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     user = await repository_users.get_user_by_id(user_id, db)
     if not user:
@@ -165,7 +165,7 @@ async def change_user_role(
     user_id: int,
     body: UserRoleUpdate,
     current_user: User = Depends(service_auth.get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     if current_user.role != "admin":
         raise HTTPException(
@@ -209,7 +209,7 @@ async def ban_car(
     license_plate: str,
     credentials: HTTPAuthorizationCredentials = Security(security),
     current_user: User = Depends(service_auth.get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     license_plate = license_plate.upper()
     car = await repository_cars.get_car_by_license_plate(license_plate, db)
@@ -254,7 +254,7 @@ async def unban_car(
     license_plate: str,
     credentials: HTTPAuthorizationCredentials = Security(security),
     current_user: User = Depends(service_auth.get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     license_plate = license_plate.upper()
     car = await repository_cars.get_car_by_license_plate(license_plate, db)
@@ -296,7 +296,7 @@ async def unban_car(
     ],
 )
 async def search_user_by_license_plate(
-    license_plate: str, db: Session = Depends(get_db)
+    license_plate: str, db: AsyncSession = Depends(get_async_db)
 ):
     license_plate = license_plate.upper()
     user = await repository_users.get_user_by_car_license_plate(license_plate, db)
@@ -316,7 +316,7 @@ async def search_user_by_license_plate(
 async def create_csv_file(
     license_plate: str,
     filename: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     create_file = await repository_admin.create_parking_csv(license_plate, filename, db)
     return create_file
@@ -331,7 +331,7 @@ async def create_csv_file(
         Depends(allowd_operation_by_admin),
     ],
 )
-async def get_profile_by_car(license_plate: str, db: Session = Depends(get_db)):
+async def get_profile_by_car(license_plate: str, db: AsyncSession = Depends(get_async_db)):
     profile = await repository_users.get_parking_info(license_plate, db)
     print(profile)
     return profile
@@ -344,7 +344,7 @@ async def get_profile_by_car(license_plate: str, db: Session = Depends(get_db)):
         Depends(allowd_operation_by_admin),
     ],
 )
-async def get_all_users(db: Session = Depends(get_db)):
+async def get_all_users(db: AsyncSession = Depends(get_async_db)):
     users = await repository_admin.get_all_users(db)
     return users
 
@@ -359,7 +359,7 @@ async def get_all_users(db: Session = Depends(get_db)):
 async def change_user_tariff(
     user_id: int,
     new_tariff: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     try:
         await repository_admin.change_tariff(user_id, new_tariff, db)
@@ -378,7 +378,7 @@ async def change_user_tariff(
 async def create_tariff(
     tariff_name: str,
     tariff_value: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     new_tariff = await repository_admin.add_tariff(tariff_name, tariff_value, db)
     return new_tariff
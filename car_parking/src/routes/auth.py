@@ -12,14 +12,14 @@ from fastapi.security import (
     HTTPAuthorizationCredentials,
     HTTPBearer,
 )
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from car_parking.src.database.db import get_db
+from car_parking.src.database.db import get_async_db
 from car_parking.src.database.models import User
 from car_parking.src.repository import users as repository_users
 from car_parking.src.repository import car as repository_car
-from car_parking.src.repository.logout import token_to_blacklist
-from car_parking.src.services.auth import service_auth
+from car_parking.src.services.auth import service_auth, Principal, get_principal
+from car_parking.src.services.token_blacklist import token_blacklist
 from car_parking.src.services import (
     email as service_email,
     roles as service_roles,
@@ -45,7 +45,7 @@ async def signup(
     body: schema_users.UserModel,
     background_tasks: BackgroundTasks,
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     exist_user_with_email: User = await repository_users.get_user_by_email(
         body.email, db
@@ -77,7 +77,7 @@ async def signup(
             detail=f"User with license plate: {body.license_plate} already exists",
         )
 
-    body.password = service_auth.get_password_hash(body.password)
+    body.password = await service_auth.get_password_hash(body.password)
     car = await repository_car.get_car_by_license_plate(body.license_plate.upper(), db)
     if not car:
         car = await repository_car.create_car(body.license_plate.upper(), db)
@@ -98,7 +98,7 @@ async def signup(
     status_code=status.HTTP_202_ACCEPTED,
 )
 async def login(
-    body: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)
+    body: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)
 ):
 
     user = await repository_users.get_user_by_email(body.username, db)
@@ -115,10 +115,14 @@ async def login(
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Email is not confirmed"
         )
-    if not service_auth.verify_password(body.password, user.password):
+    verified, new_hash = await service_auth.verify_password(body.password, user.password)
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid password"
         )
+    if new_hash:
+        # hash cost changed, stored with the refresh token below
+        user.password = new_hash
     access_token = await service_auth.create_access_token(data={"sub": user.email})
     refresh_token = await service_auth.create_refresh_token(data={"sub": user.email})
     await repository_users.update_token(user, refresh_token, db)
@@ -141,21 +145,21 @@ async def login(
 async def refresh_token(
     credentials: HTTPAuthorizationCredentials = Security(security),
     current_user: User = Depends(service_auth.get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    token = current_user.refresh_token
-    email = await service_auth.decode_refresh_token(token)
-    user = await repository_users.get_user_by_email(email, db)
-
-    if user is None:
+    # the refresh token is read from the database, the cached user doesn't carry it
+    user = await repository_users.get_user_by_email(current_user.email, db)
+    if user is None or user.refresh_token is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User with this token doesn't exist",
         )
 
-    if user.refresh_token != token:
+    token = user.refresh_token
+    email = await service_auth.decode_refresh_token(token)
+    if email != user.email:
         user.refresh_token = None
-        db.commit()
+        await db.commit()
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token"
         )
@@ -171,7 +175,7 @@ async def refresh_token(
 
 
 @router.get("/confirmed_email/{token}", status_code=status.HTTP_202_ACCEPTED)
-async def confirm_email(token: str, db: Session = Depends(get_db)):
+async def confirm_email(token: str, db: AsyncSession = Depends(get_async_db)):
     email = await service_auth.decode_email_token(token)
     user = await repository_users.get_user_by_email(email, db)
     if user is None:
@@ -189,7 +193,7 @@ async def request_email(
     body: schema_email.RequestEmail,
     background_task: BackgroundTasks,
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     user = await repository_users.get_user_by_email(body.email, db)
     if user is not None and user.confirmed:
@@ -206,7 +210,7 @@ async def reset_password_request(
     body: schema_email.RequestEmail,
     background_task: BackgroundTasks,
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     user = await repository_users.get_user_by_email(body.email, db)
     if user:
@@ -221,7 +225,7 @@ async def reset_password_request(
 
 @router.patch("/change_password/{token}", status_code=status.HTTP_202_ACCEPTED)
 async def reset_password(
-    body: schema_users.ChangePassword, token: str, db: Session = Depends(get_db)
+    body: schema_users.ChangePassword, token: str, db: AsyncSession = Depends(get_async_db)
 ):
     email = await service_auth.decode_email_token(token)
     user = await repository_users.get_user_by_email(email, db)
@@ -229,7 +233,7 @@ async def reset_password(
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Verification error"
         )
-    body.new_password = service_auth.get_password_hash(body.new_password)
+    body.new_password = await service_auth.get_password_hash(body.new_password)
     await repository_users.change_password(user, body.new_password, db)
     return {"detail": "User's password was changed succesfully"}
 
@@ -242,12 +246,7 @@ async def reset_password(
         Depends(allowd_operation_any_user),
     ],
 )
-async def logout(
-    credentials: HTTPAuthorizationCredentials = Security(security),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(service_auth.get_current_user),
-):
-    access_token = credentials.credentials
-    user_id = current_user.id
-    result = await token_to_blacklist(access_token, user_id, db)
-    return {"message": f"User {current_user.email} successfully logged out"}
+async def logout(principal: Principal = Depends(get_principal)):
+    # kept in redis until the token would have expired anyway
+    await token_blacklist.revoke(principal.token_id, principal.expires_at)
+    return {"message": f"User {principal.user.email} successfully logged out"}
@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Depends, status
+
+from car_parking.src.database.db import pool_stats
+from car_parking.src.services.auth import service_auth, password_executor
+from car_parking.src.services.image_decoder import decode_executor
+from car_parking.src.services.inference import inference_executor, classifier_executor, classifier_batcher
+from car_parking.src.services.mail_dispatcher import mail_dispatcher
+from car_parking.src.services.outbox import outbox_worker
+from car_parking.src.services.recognition_cache import recognition_cache
+from car_parking.src.services.tariff_cache import tariff_cache
+from car_parking.src.services.token_blacklist import token_blacklist
+from car_parking.src.services.user_cache import user_cache
+from car_parking.src.services import (
+    roles as service_roles,
+    logout as service_logout,
+)
+
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+allowd_operation_by_admin = service_roles.RoleRights(["admin"])
+
+
+@router.get("/",
+            status_code=status.HTTP_200_OK,
+            dependencies=[
+                Depends(service_logout.logout_dependency),
+                Depends(allowd_operation_by_admin),
+            ],
+            )
+async def get_metrics():
+    return {
+        "inference": inference_executor.stats(),
+        "classifier": classifier_executor.stats(),
+        "classifier_batcher": classifier_batcher.stats(),
+        "image_decoder": decode_executor.stats(),
+        "recognition_cache": recognition_cache.stats(),
+        "tariff_cache": tariff_cache.stats(),
+        "user_cache": user_cache.stats(),
+        "auth": service_auth.stats(),
+        "password_hasher": password_executor.stats(),
+        "token_blacklist": token_blacklist.stats(),
+        "db_pool": pool_stats(),
+        "mail": mail_dispatcher.stats(),
+        "outbox": outbox_worker.stats(),
+    }
@@ -1,26 +1,25 @@
-import io
-from PIL import Image
+from typing import List
 
-from fastapi import APIRouter, Depends, status, BackgroundTasks, Request, UploadFile, File, HTTPException
+from fastapi import APIRouter, Depends, status, Request, UploadFile, File, HTTPException
 from fastapi.security import HTTPBearer
-from sqlalchemy.orm import Session
-import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..database.db import get_db
+from ..database.db import get_async_db
 from ..database.models import User, Tariff
-from ..repository import users as repository_users
 from ..repository import parking as repository_parking
-from ..repository import tariff as repository_tariff
-from ..repository import car as repository_car
-from ..repository.logout import token_to_blacklist
 from ..services.auth import service_auth
-from ..services.plate_reader import pr as PlateReader
+from ..services.inference import recognize_plate, recognize_plate_frames, recognize_plates, read_plate_frames
+from ..services.recognition_cache import recognition_cache
+from ..services.image_decoder import decode_upload
+from ..services.stream_ingest import stream_manager
 from ..schemas.users import UserResponse, UserParkingResponse
-from ..schemas.parking import ParkingInfo, ParkingSchema, ParkingResponse
+from ..schemas.parking import ParkingInfo, ParkingSchema, ParkingResponse, PlateRecognition, PlateReading, StreamRequest, OccupancyBucket
 from ..conf.extensions import EXTENSIONS
+from ..conf.config import settings
 from ..services import (
-    email as service_email,
+    gate as service_gate,
     roles as service_roles,
+    logout as service_logout,
 )
 
 
@@ -31,47 +30,80 @@ allowd_operation = service_roles.RoleRights(["user", "admin"])
 allowd_operation_by_admin = service_roles.RoleRights(["admin"])
 
 
+async def read_frames(files: List[UploadFile]) -> list:
+    if len(files) > settings.recognize_batch_max_files:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Too many files, maximum is {settings.recognize_batch_max_files}")
+    images = []
+    pixels = 0
+    for file in files:
+        valid_ext = await repository_parking.is_valid_file_ext(file)
+        if not valid_ext:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                detail=f"Invalid file extension: {file.filename}")
+        request_object_content = await file.read()
+        img = await decode_upload(request_object_content)
+        # bounds the memory of one request, not only of every single image
+        pixels += img.shape[0] * img.shape[1]
+        if pixels > settings.recognize_batch_max_pixels:
+            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                                detail=f"Images are too large, maximum is {settings.recognize_batch_max_pixels} pixels per request")
+        images.append(img)
+    return images
+
+
+async def read_license_plate(file: UploadFile, frames: List[UploadFile] | None = None) -> str | None:
+    if frames:
+        # several quick frames of the same car are fused into one reading
+        images = await read_frames([file, *frames])
+        return await recognize_plate_frames(images)
+
+    request_object_content = await file.read()
+    # gate cameras often resend the same frame, check the cache before decoding
+    key = recognition_cache.key_for_bytes(request_object_content)
+    license_plate = await recognition_cache.get(key, count_miss=not settings.recognition_cache_phash)
+    if license_plate is not None:
+        return license_plate
+
+    img = await decode_upload(request_object_content)
+    image_key = None
+    if settings.recognition_cache_phash:
+        image_key = recognition_cache.key_for_image(img)
+        license_plate = await recognition_cache.get(image_key)
+        if license_plate is not None:
+            await recognition_cache.set(key, license_plate)
+            return license_plate
+
+    license_plate = await recognize_plate(img)
+    if license_plate is not None:
+        await recognition_cache.set(key, license_plate)
+        if image_key is not None:
+            await recognition_cache.set(image_key, license_plate)
+    return license_plate
+
+
 @router.post('/parking/{license_plate}',
              response_model=ParkingSchema | str,
              status_code=status.HTTP_200_OK,
              )
-async def enter_parking(background_tasks: BackgroundTasks,
-                        request: Request, 
+async def enter_parking(request: Request,
                         file: UploadFile = File(...),
-                        db: Session = Depends(get_db)):
+                        frames: List[UploadFile] = File(None),
+                        db: AsyncSession = Depends(get_async_db)):
     
     valid_ext = await repository_parking.is_valid_file_ext(file)
     if not valid_ext:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid file extension")
     
-    request_object_content = await file.read()
-    img = Image.open(io.BytesIO(request_object_content))
-    img = np.array(img, dtype="uint8")
-    license_plate = await PlateReader.get_prediction(img)
+    license_plate = await read_license_plate(file, frames)
 
     if license_plate is None:
         return "License plate not found, please send better picture where car is visible"
     
-    car = await repository_car.get_car_by_license_plate(license_plate, db)
-    if car and car.banned == True:
-        return f"Your car << {car.license_plate} >> banned. Contact parking administrator"
-    
-    parking_place = await repository_parking.entry_to_the_parking(license_plate, db)
-    user = await repository_users.get_user_by_car_license_plate(license_plate, db)
-    if user:
-        enter_time = parking_place.info.enter_time.strftime("%Y-%m-%d %H:%M:%S")
-        tariff = await repository_tariff.get_tariff_by_tariff_id(user.tariff_id, db)
-        background_tasks.add_task(
-            service_email.praking_enter_message,
-            user.email,
-            user.username,
-            user.license_plate,
-            enter_time,
-            tariff.tariff_name,
-            tariff.tariff_value,
-            request.base_url,
-        )
-    return parking_place
+    # car, ban, owner, tariff and open session come from one query, the session and the
+    # owner's email notification are one commit, the outbox worker sends the email
+    result = await service_gate.enter_gate(license_plate, db, host=str(request.base_url))
+    return result.parking
 
 
 
@@ -79,56 +111,27 @@ async def enter_parking(background_tasks: BackgroundTasks,
              response_model=ParkingSchema | str,
              status_code=status.HTTP_200_OK,
              )
-async def exit_parking( background_tasks: BackgroundTasks,
-                        request: Request,
+async def exit_parking(request: Request,
                         file: UploadFile = File(...), 
-                        db: Session = Depends(get_db)):
+                        frames: List[UploadFile] = File(None),
+                        db: AsyncSession = Depends(get_async_db)):
     valid_ext = await repository_parking.is_valid_file_ext(file)
     if not valid_ext:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid file extension")
     
-    request_object_content = await file.read()
-    img = Image.open(io.BytesIO(request_object_content))
-    img = np.array(img, dtype="uint8")
-    license_plate = await PlateReader.get_prediction(img)
+    license_plate = await read_license_plate(file, frames)
 
     if license_plate is None:
         return "License plate not found, please send better picture where car is visible"
     
-    car = await repository_car.get_car_by_license_plate(license_plate, db)
-    if car and car.banned == True:
-        return f"Your car << {car.license_plate} >> banned. Contact parking administrator"
-   
-    parking_place = await repository_parking.get_parking_place_by_car_license_plate(license_plate, db)
-    if parking_place:
-        parking_info = await repository_parking.exit_from_the_parking(license_plate, db)
-        user = await repository_users.get_user_by_car_license_plate(license_plate, db)
-        if user:
-            enter_time = parking_info.info.enter_time.strftime("%Y-%m-%d %H:%M:%S")
-            departure_time = parking_info.info.departure_time.strftime("%Y-%m-%d %H:%M:%S")
-            tariff = await repository_tariff.get_tariff_by_tariff_id(user.tariff_id, db)
-            background_tasks.add_task(
-                service_email.praking_exit_message,
-                user.email,
-                user.username,
-                user.license_plate,
-                parking_place.id,
-                enter_time,
-                departure_time,
-                tariff.tariff_name,
-                tariff.tariff_value,
-                parking_info.info.duration,
-                parking_info.info.amount_paid,
-                request.base_url,
-            )
-        return parking_info
-    else:
-        return f"Parking place for car {license_plate} not found"
+    result = await service_gate.exit_gate(license_plate, db, host=str(request.base_url))
+    return result.parking
+
 
 @router.get('/confirm_payment/{parking_place_id}',
             response_model=ParkingSchema | str, 
             status_code=status.HTTP_202_ACCEPTED)
-async def confirm_payment(parking_place_id: str, db: Session = Depends(get_db)):
+async def confirm_payment(parking_place_id: int, db: AsyncSession = Depends(get_async_db)):
     parking_staus = await repository_parking.change_parking_status_authorised(parking_place_id, db)
     return parking_staus
 
@@ -137,6 +140,84 @@ async def confirm_payment(parking_place_id: str, db: Session = Depends(get_db)):
     "/free_place/{date}",
     status_code=status.HTTP_200_OK,
 )
-async def occupied_places(date: str, db: Session = Depends(get_db)):
+async def occupied_places(date: str, db: AsyncSession = Depends(get_async_db)):
     occupied = await repository_parking.free_parking_places(date, db)
     return occupied
+
+
+@router.get(
+    "/occupancy",
+    response_model=List[OccupancyBucket] | str,
+    status_code=status.HTTP_200_OK,
+)
+async def occupancy(start: str, end: str, bucket_minutes: int = 60, db: AsyncSession = Depends(get_async_db)):
+    timeline = await repository_parking.occupancy_timeline(start, end, bucket_minutes, db)
+    return timeline
+
+
+@router.post('/recognize_batch',
+             response_model=List[PlateRecognition],
+             status_code=status.HTTP_200_OK,
+             dependencies=[
+                 Depends(service_logout.logout_dependency),
+                 Depends(allowd_operation),
+             ],
+             )
+async def recognize_batch(files: List[UploadFile] = File(...)):
+    images = await read_frames(files)
+    license_plates = await recognize_plates(images)
+    return [PlateRecognition(filename=file.filename, license_plate=license_plate)
+            for file, license_plate in zip(files, license_plates)]
+
+
+@router.post('/recognize_frames',
+             response_model=PlateReading | str,
+             status_code=status.HTTP_200_OK,
+             dependencies=[
+                 Depends(service_logout.logout_dependency),
+                 Depends(allowd_operation),
+             ],
+             )
+async def recognize_frames(files: List[UploadFile] = File(...)):
+    images = await read_frames(files)
+    reading = await read_plate_frames(images)
+    if reading is None:
+        return "License plate not found, please send better picture where car is visible"
+    return reading
+
+
+@router.post('/stream',
+             status_code=status.HTTP_201_CREATED,
+             dependencies=[
+                 Depends(service_logout.logout_dependency),
+                 Depends(allowd_operation_by_admin),
+             ],
+             )
+async def start_stream(body: StreamRequest):
+    stream = stream_manager.start(body.source, body.direction)
+    return stream.info()
+
+
+@router.get('/stream',
+            status_code=status.HTTP_200_OK,
+            dependencies=[
+                Depends(service_logout.logout_dependency),
+                Depends(allowd_operation_by_admin),
+            ],
+            )
+async def get_streams():
+    return [stream.info() for stream in stream_manager.streams.values()]
+
+
+@router.delete('/stream/{stream_id}',
+               status_code=status.HTTP_200_OK,
+               dependencies=[
+                   Depends(service_logout.logout_dependency),
+                   Depends(allowd_operation_by_admin),
+               ],
+               )
+async def stop_stream(stream_id: str):
+    stream = stream_manager.stop(stream_id)
+    if stream is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Stream not found")
+    return stream.info()
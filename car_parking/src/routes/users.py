@@ -1,8 +1,8 @@
 from fastapi import APIRouter, Depends, status
 from fastapi.security import HTTPBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from car_parking.src.database.db import get_db
+from car_parking.src.database.db import get_async_db
 from car_parking.src.database.models import User
 from car_parking.src.repository import users as repository_users
 from car_parking.src.services.auth import service_auth
@@ -33,7 +33,7 @@ allowd_operation_by_admin = service_roles.RoleRights(["admin"])
 )
 async def read_users_me(
     current_user: User = Depends(service_auth.get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     user = await repository_users.get_user_me(current_user, db)
     return user
@@ -52,7 +52,7 @@ async def read_users_me(
 )
 async def get_user_profile(
     current_user: User = Depends(service_auth.get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     user_profile = await repository_users.get_parking_info(
         current_user.license_plate, db
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Literal
 from datetime import datetime
 from pydantic import BaseModel
 
@@ -28,3 +28,25 @@ class CurrentParking(BaseModel):
 class ParkingSchema(BaseModel):
     info: ParkingResponse
     status: str
+
+
+class OccupancyBucket(BaseModel):
+    time: datetime
+    occupied: int
+
+
+class PlateRecognition(BaseModel):
+    filename: str
+    license_plate: str | None
+
+
+class PlateReading(BaseModel):
+    license_plate: str | None
+    confidence: float
+    char_confidence: List[float]
+    frames: int
+
+
+class StreamRequest(BaseModel):
+    source: str
+    direction: Literal["entry", "exit"] = "entry"
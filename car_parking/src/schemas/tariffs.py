@@ -0,0 +1,12 @@
+from decimal import Decimal
+
+from pydantic import BaseModel
+
+
+class TariffResponse(BaseModel):
+    id: int
+    tariff_name: str
+    tariff_value: Decimal
+
+    class Config:
+        orm_mode = True
@@ -23,6 +23,20 @@ class UserResponse(BaseModel):
         orm_mode = True
 
 
+# what the auth dependencies need from a user, cached in redis between requests
+class CachedUser(BaseModel):
+    id: int
+    username: str
+    email: EmailStr
+    role: str
+    banned: bool = False
+    tariff_id: Optional[int] = None
+    license_plate: Optional[str] = None
+
+    class Config:
+        orm_mode = True
+
+
 class UserParkingResponse(BaseModel):
     user: UserResponse
     parking: CurrentParking | str
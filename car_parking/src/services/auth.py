@@ -1,36 +1,75 @@
+import time
+import uuid
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
-import pickle
 
-import redis.asyncio as redis
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
+from jose import JWTError
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 
 from car_parking.src.repository import users as repository_auth
-from car_parking.src.database.db import get_db
+from car_parking.src.database.db import get_async_db
 from car_parking.src.conf.config import settings
+from car_parking.src.schemas.users import CachedUser
+from car_parking.src.services.executor import BoundedExecutor
+from car_parking.src.services.jwt_codec import load_codec
+from car_parking.src.services.token_blacklist import token_blacklist
+from car_parking.src.services.token_cache import VerifiedTokenCache
+from car_parking.src.services.user_cache import user_cache
+
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
+
+# bcrypt is CPU bound and releases the GIL, a small dedicated pool keeps a login burst
+# from starving the event loop and the inference threads
+password_executor = BoundedExecutor(
+    "password_hasher",
+    workers=settings.password_hash_workers,
+    max_pending=settings.password_hash_max_pending,
+)
+
+
+# caller of a request: the cached user and the access token it came with
+@dataclass
+class Principal:
+    user: CachedUser
+    token: str
+    # jti, or the digest of tokens issued without one
+    token_id: str
+    expires_at: int
+
+
+async def get_principal(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> Principal:
+    # FastAPI resolves a dependency once per request, every auth check shares this result
+    return await service_auth.resolve_principal(token, db)
 
 
 class Auth:
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    # hashes with another cost are reported by needs_update and rehashed on login
+    pwd_context = CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=settings.password_hash_rounds,
+        bcrypt__min_rounds=settings.password_hash_rounds,
+        bcrypt__max_rounds=settings.password_hash_rounds,
+    )
     SECRET_KEY = settings.secret_key
     ALGORITHM = settings.algorithm
-    oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
-    r_cashe = redis.Redis(
-        host=settings.redis_host,
-        port=settings.redis_port,
-        password=settings.redis_password,
-    )
+    oauth2_scheme = oauth2_scheme
+    codec = load_codec(settings.jwt_backend)
+    # possibly revoked tokens are refused by the cache, the logout check confirms in redis
+    token_cache = VerifiedTokenCache(settings.jwt_cache_size, is_revoked=token_blacklist.maybe_revoked)
 
-    def verify_password(self, plain_password, hashed_password):
-        return self.pwd_context.verify(plain_password, hashed_password)
+    # method to check a password, also returns a new hash if the stored one is outdated
+    async def verify_password(self, plain_password, hashed_password) -> tuple[bool, str | None]:
+        return await password_executor.run(self.pwd_context.verify_and_update, plain_password, hashed_password)
 
-    def get_password_hash(self, password: str):
-        return self.pwd_context.hash(password)
+    async def get_password_hash(self, password: str):
+        return await password_executor.run(self.pwd_context.hash, password)
 
     async def create_access_token(
         self, data: dict, expires_delta: Optional[float] = None
@@ -41,10 +80,10 @@ class Auth:
         else:
             expire = datetime.utcnow() + timedelta(minutes=60)
         to_encode.update(
-            {"iat": datetime.utcnow(), "exp": expire, "scope": "access_token"}
+            {"iat": datetime.utcnow(), "exp": expire, "scope": "access_token", "jti": uuid.uuid4().hex}
         )
-        encoded_access_token = jwt.encode(
-            to_encode, self.SECRET_KEY, algorithm=self.ALGORITHM
+        encoded_access_token = self.codec.encode(
+            to_encode, self.SECRET_KEY, self.ALGORITHM
         )
         return encoded_access_token
 
@@ -57,10 +96,10 @@ class Auth:
         else:
             expire = datetime.utcnow() + timedelta(minutes=60)
         to_encode.update(
-            {"iat": datetime.utcnow(), "exp": expire, "scope": "access_token"}
+            {"iat": datetime.utcnow(), "exp": expire, "scope": "access_token", "jti": uuid.uuid4().hex}
         )
-        encoded_access_token = jwt.encode(
-            to_encode, self.SECRET_KEY, algorithm=self.ALGORITHM
+        encoded_access_token = self.codec.encode(
+            to_encode, self.SECRET_KEY, self.ALGORITHM
         )
         return encoded_access_token
 
@@ -75,47 +114,65 @@ class Auth:
         to_encode.update(
             {"iat": datetime.utcnow(), "exp": expire, "scope": "refresh_token"}
         )
-        encoded_refresh_token = jwt.encode(
-            to_encode, self.SECRET_KEY, algorithm=self.ALGORITHM
+        encoded_refresh_token = self.codec.encode(
+            to_encode, self.SECRET_KEY, self.ALGORITHM
         )
         return encoded_refresh_token
 
-    async def get_current_user(
-        self, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
-    ):
+    # per request auth latency, reported on /api/metrics
+    resolved = 0
+    resolve_seconds = 0.0
+
+    async def resolve_principal(self, token: str, db: AsyncSession) -> Principal:
+        started = time.perf_counter()
+        try:
+            return await self._resolve_principal(token, db)
+        finally:
+            self.resolved += 1
+            self.resolve_seconds += time.perf_counter() - started
+
+    async def _resolve_principal(self, token: str, db: AsyncSession) -> Principal:
         credentials_exception = HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-        try:
-            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
-            if payload.get("scope") == "access_token":
-                email = payload.get("sub")
-                if email is None:
-                    raise credentials_exception
-            else:
+        cached = self.token_cache.get(token)
+        if cached is not None:
+            payload, token_id = cached
+        else:
+            try:
+                payload = self.codec.decode(token, self.SECRET_KEY, self.ALGORITHM)
+            except JWTError as e:
                 raise credentials_exception
-        except JWTError as e:
-            raise credentials_exception
+            if payload.get("scope") != "access_token" or payload.get("sub") is None:
+                raise credentials_exception
+            token_id = token_blacklist.token_id(token, payload)
+            self.token_cache.set(token, payload, token_id)
+        email = payload["sub"]
 
-        user = await self.r_cashe.get(f"user: {email}")
+        user = await user_cache.get(email)
         if user is None:
             user = await repository_auth.get_user_by_email(email, db)
             if user is None:
                 raise credentials_exception
-            await self.r_cashe.set(f"user: {email}", pickle.dumps(user))
-            await self.r_cashe.expire(f"user: {email}", 900)
-        else:
-            user = pickle.loads(user)
-        return user
+            user = await user_cache.set(user)
+        return Principal(user, token, token_id, payload["exp"])
+
+    async def get_current_user(self, principal: Principal = Depends(get_principal)) -> CachedUser:
+        return principal.user
+
+    def stats(self) -> dict:
+        return {
+            "resolved": self.resolved,
+            "avg_resolve_ms": round(self.resolve_seconds / self.resolved * 1000, 3) if self.resolved else 0.0,
+            "verified_tokens": self.token_cache.stats(),
+        }
 
     async def decode_refresh_token(self, refresh_token: str):
         try:
-            payload = jwt.decode(
-                refresh_token, self.SECRET_KEY, algorithms=[self.ALGORITHM]
-            )
+            payload = self.codec.decode(refresh_token, self.SECRET_KEY, self.ALGORITHM)
             if payload["scope"] == "refresh_token":
                 email = payload["sub"]
                 return email
@@ -135,7 +192,7 @@ class Auth:
         to_encode.update(
             {"iat": datetime.utcnow(), "exp": expire, "scope": "email_token"}
         )
-        token = jwt.encode(to_encode, self.SECRET_KEY, algorithm=self.ALGORITHM)
+        token = self.codec.encode(to_encode, self.SECRET_KEY, self.ALGORITHM)
         return token
 
     def sync_create_email_token(self, data: dict):  # for tests
@@ -144,14 +201,12 @@ class Auth:
         to_encode.update(
             {"iat": datetime.utcnow(), "exp": expire, "scope": "email_token"}
         )
-        token = jwt.encode(to_encode, self.SECRET_KEY, algorithm=self.ALGORITHM)
+        token = self.codec.encode(to_encode, self.SECRET_KEY, self.ALGORITHM)
         return token
 
     async def decode_email_token(self, email_token: str):
         try:
-            payload = jwt.decode(
-                email_token, self.SECRET_KEY, algorithms=[self.ALGORITHM]
-            )
+            payload = self.codec.decode(email_token, self.SECRET_KEY, self.ALGORITHM)
             if payload["scope"] == "email_token":
                 email = payload["sub"]
                 return email
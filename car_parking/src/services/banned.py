@@ -1,28 +1,15 @@
-from fastapi import Request, HTTPException, status, Depends, Security
-from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from sqlalchemy.orm import Session
+from fastapi import HTTPException, status, Depends
 
-from car_parking.src.services.auth import service_auth
-from car_parking.src.database.models import User
-from car_parking.src.database.db import get_db
-
-security = HTTPBearer()
+from car_parking.src.services.auth import Principal, get_principal
 
 
 class BannedDependency:
     def __init__(self):
         pass
 
-    async def __call__(
-        self,
-        request: Request,
-        current_user: User = Depends(service_auth.get_current_user),
-        credentials: HTTPAuthorizationCredentials = Security(security),
-        db: Session = Depends(get_db),
-    ):
-        banned_satauts = current_user.banned
-
-        if banned_satauts:
+    async def __call__(self, principal: Principal = Depends(get_principal)):
+        current_user = principal.user
+        if current_user.banned:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"User {current_user.email} banned. Please contact your administrator!",
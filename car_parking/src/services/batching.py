@@ -0,0 +1,72 @@
+import asyncio
+import time
+
+
+# coalesces concurrent calls into one handler call of up to max_samples samples or max_wait_ms,
+# the handler returns the results in the order of the items
+class MicroBatcher:
+    def __init__(self, name: str, handler, max_samples: int = 64, max_wait_ms: float = 10):
+        self.name = name
+        self.handler = handler
+        self.max_samples = max_samples
+        self.max_wait = max_wait_ms / 1000
+        self._queue = []
+        self._samples = 0
+        self._timer = None
+        self._tasks = set()
+        self.batches = 0
+        self.items = 0
+        self.samples = 0
+        self.queue_time_total = 0.0
+
+    async def submit(self, item, size: int = 1):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.append((item, future, time.perf_counter()))
+        self._samples += size
+        if self._samples >= self.max_samples:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, samples = self._queue, self._samples
+        self._queue, self._samples = [], 0
+        if not batch:
+            return
+        task = asyncio.get_running_loop().create_task(self._run(batch, samples))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list, samples: int):
+        started = time.perf_counter()
+        self.batches += 1
+        self.items += len(batch)
+        self.samples += samples
+        self.queue_time_total += sum(started - enqueued for _, _, enqueued in batch)
+        try:
+            results = await self.handler([item for item, _, _ in batch])
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        batches = self.batches or 1
+        items = self.items or 1
+        return {
+            "max_samples": self.max_samples,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches": self.batches,
+            "samples": self.samples,
+            "avg_batch_fill": round(self.samples / (batches * self.max_samples), 3),
+            "avg_queue_ms": round(self.queue_time_total / items * 1000, 3),
+        }
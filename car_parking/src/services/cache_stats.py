@@ -0,0 +1,8 @@
+# hit counters every cache reports on /api/metrics
+def hit_stats(hits: int, misses: int) -> dict:
+    lookups = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / lookups, 3) if lookups else 0.0,
+    }
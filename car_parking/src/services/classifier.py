@@ -0,0 +1,95 @@
+import importlib.util
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from car_parking.src.conf.config import settings
+
+
+path = str(Path(__file__).parent.parent) + "/models"
+KERAS_MODEL_PATH = path + r"/text_classifier.keras"
+ONNX_MODEL_PATH = path + r"/text_classifier.onnx"
+
+
+# reference backend, runs the original keras model
+class KerasClassifier:
+    def __init__(self, model_path: str = KERAS_MODEL_PATH):
+        import keras
+
+        self.model = keras.models.load_model(model_path)
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        return self.model.predict(batch)
+
+
+# runs the exported classifier with onnxruntime on CPU
+class OnnxRuntimeClassifier:
+    def __init__(self, model_path: str = ONNX_MODEL_PATH):
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(
+            model_path, options, providers=["CPUExecutionProvider"]
+        )
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self.input_name: batch.astype(np.float32)})[0]
+
+
+# runs the exported classifier with cv2.dnn, no extra dependency needed
+class OpenCVClassifier:
+    def __init__(self, model_path: str = ONNX_MODEL_PATH):
+        self.net = cv2.dnn.readNetFromONNX(model_path)
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        self.net.setInput(batch.astype(np.float32))
+        return self.net.forward()
+
+
+BACKENDS = {
+    "keras": KerasClassifier,
+    "onnxruntime": OnnxRuntimeClassifier,
+    "opencv": OpenCVClassifier,
+}
+
+# module every backend imports, onnxruntime is the optional extra of the same name
+RUNTIMES = {"keras": "keras", "onnxruntime": "onnxruntime", "opencv": "cv2"}
+
+
+def model_path(backend: str = settings.classifier_backend) -> str:
+    return KERAS_MODEL_PATH if backend == "keras" else settings.classifier_onnx_path or ONNX_MODEL_PATH
+
+
+# method to fail at startup instead of on every recognition, the workers load the model lazily
+def check_backend(backend: str = settings.classifier_backend):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown classifier backend {backend}, use one of {list(BACKENDS)}")
+    if importlib.util.find_spec(RUNTIMES[backend]) is None:
+        raise RuntimeError(f"Classifier backend {backend} needs {RUNTIMES[backend]}, it is not installed")
+    if not Path(model_path(backend)).exists():
+        raise RuntimeError(f"Classifier model {model_path(backend)} is missing")
+
+
+def load_classifier(backend: str = settings.classifier_backend):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown classifier backend {backend}, use one of {list(BACKENDS)}")
+    return BACKENDS[backend](model_path(backend))
+
+
+def export_to_onnx(keras_path: str = KERAS_MODEL_PATH, onnx_path: str = ONNX_MODEL_PATH):
+    import keras
+    import tensorflow as tf
+    import tf2onnx
+
+    model = keras.models.load_model(keras_path)
+    spec = (tf.TensorSpec((None, 44, 24, 1), tf.float32, name="input"),)
+    tf2onnx.convert.from_keras(model, input_signature=spec, opset=13, output_path=onnx_path)
+    return onnx_path
+
+
+if __name__ == "__main__":
+    # python -m car_parking.src.services.classifier
+    print(f"Exported to {export_to_onnx()}")
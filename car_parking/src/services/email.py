@@ -1,65 +1,38 @@
-from pathlib import Path
+import asyncio
 
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
-from fastapi_mail.errors import ConnectionErrors
 from pydantic import EmailStr
 
 from car_parking.src.services.auth import service_auth
-from car_parking.src.conf.config import settings
-
-conf = ConnectionConfig(
-    MAIL_USERNAME=settings.mail_username,
-    MAIL_PASSWORD=settings.mail_password,
-    MAIL_FROM=EmailStr(settings.mail_from),
-    MAIL_PORT=settings.mail_port,
-    MAIL_SERVER=settings.mail_server,
-    MAIL_FROM_NAME="Car parking",
-    MAIL_STARTTLS=False,
-    MAIL_SSL_TLS=True,
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=True,
-    TEMPLATE_FOLDER=Path(__file__).parent.parent / "templates",
-)
+from car_parking.src.services.mail_dispatcher import mail_dispatcher
 
 
 async def send_email(email: EmailStr, username: str, host: str) -> None:
-    try:
-        token_verification = await service_auth.create_email_token({"sub": email})
-        message = MessageSchema(
-            subject="Confirm your email ",
-            recipients=[email],
-            template_body={
-                "host": host,
-                "username": username,
-                "token": token_verification,
-            },
-            subtype=MessageType.html,
-        )
-
-        fm = FastMail(conf)
-        await fm.send_message(message, template_name="email_template.html")
-    except ConnectionErrors as err:
-        print(err)
+    token_verification = await service_auth.create_email_token({"sub": email})
+    # queued, the dispatcher renders and sends it over a pooled connection
+    await mail_dispatcher.enqueue(
+        email,
+        "Confirm your email ",
+        "email_template.html",
+        {
+            "host": host,
+            "username": username,
+            "token": token_verification,
+        },
+    )
 
 
 async def send_reset_password_email(email: EmailStr, username: str, host: str) -> None:
-    try:
-        token_verification = await service_auth.create_email_token({"sub": email})
-        message = MessageSchema(
-            subject="Reset password ",
-            recipients=[email],
-            template_body={
-                "host": host,
-                "username": username,
-                "token": token_verification,
-            },
-            subtype=MessageType.html,
-        )
-
-        fm = FastMail(conf)
-        await fm.send_message(message, template_name="reset_password.html")
-    except ConnectionErrors as err:
-        print(err)
+    token_verification = await service_auth.create_email_token({"sub": email})
+    await mail_dispatcher.enqueue(
+        email,
+        "Reset password ",
+        "reset_password.html",
+        {
+            "host": host,
+            "username": username,
+            "token": token_verification,
+        },
+    )
 
 
 async def praking_enter_message(
@@ -70,28 +43,22 @@ async def praking_enter_message(
     tariff_name,
     tariff_value,
     host: str,
-) -> None:
-    try:
-        token_verification = await service_auth.create_email_token({"sub": email})
-        message = MessageSchema(
-            subject="Parking place info",
-            recipients=[email],
-            template_body={
-                "host": host,
-                "username": username,
-                "license_plate": license_plate,
-                "enter_time": enter_time,
-                "tariff_name": tariff_name,
-                "tariff_value": tariff_value,
-                "token": token_verification,
-            },
-            subtype=MessageType.html,
-        )
-
-        fm = FastMail(conf)
-        await fm.send_message(message, template_name="praking_enter_message.html")
-    except ConnectionErrors as err:
-        print(err)
+) -> asyncio.Future:
+    token_verification = await service_auth.create_email_token({"sub": email})
+    return await mail_dispatcher.send(
+        email,
+        "Parking place info",
+        "praking_enter_message.html",
+        {
+            "host": host,
+            "username": username,
+            "license_plate": license_plate,
+            "enter_time": enter_time,
+            "tariff_name": tariff_name,
+            "tariff_value": tariff_value,
+            "token": token_verification,
+        },
+    )
 
 
 # original code
@@ -137,29 +104,22 @@ async def praking_exit_message(
     duration,
     amount_paid,
     host: str,
-) -> None:
-    try:
-        token_verification = await service_auth.create_email_token({"sub": email})
-        message = MessageSchema(
-            subject="Invoice for payment",
-            recipients=[email],
-            template_body={
-                "host": host,
-                "username": username,
-                "license_plate": license_plate,
-                "parking_place_id": parking_place_id,
-                "enter_time": enter_time,
-                "departure_time": departure_time,
-                "tariff_name": tariff_name,
-                "tariff_value": tariff_value,
-                "duration": duration,
-                "amount_paid": amount_paid,
-                "token": token_verification,
-            },
-            subtype=MessageType.html,
-        )
-
-        fm = FastMail(conf)
-        await fm.send_message(message, template_name="praking_exit_message.html")
-    except ConnectionErrors as err:
-        print(err)
+) -> asyncio.Future:
+    # the invoice links to the parking place, no email token needed
+    return await mail_dispatcher.send(
+        email,
+        "Invoice for payment",
+        "praking_exit_message.html",
+        {
+            "host": host,
+            "username": username,
+            "license_plate": license_plate,
+            "parking_place_id": parking_place_id,
+            "enter_time": enter_time,
+            "departure_time": departure_time,
+            "tariff_name": tariff_name,
+            "tariff_value": tariff_value,
+            "duration": duration,
+            "amount_paid": amount_paid,
+        },
+    )
@@ -0,0 +1,99 @@
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from fastapi import HTTPException, status
+
+
+# runs blocking calls in a thread or process pool, more than max_pending queued or running calls
+# are rejected with 503, max_pending=None admits every call for pools whose callers are bounded
+class BoundedExecutor:
+    def __init__(
+        self,
+        name: str,
+        kind: str = "thread",
+        workers: int = 1,
+        max_pending: int | None = 8,
+        initializer=None,
+        initargs: tuple = (),
+    ):
+        self.name = name
+        self.kind = kind
+        self.workers = workers
+        self.max_pending = max_pending
+        self.initializer = initializer
+        self.initargs = initargs
+        self._pool = None
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.queue_time_total = 0.0
+        self.run_time_total = 0.0
+
+    def _get_pool(self):
+        if self._pool is None:
+            if self.kind == "process":
+                # spawn so every worker loads its own models instead of inheriting
+                # a forked copy of the parent's TensorFlow/OpenCV state
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=self.initializer,
+                    initargs=self.initargs,
+                )
+            else:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix=self.name,
+                    initializer=self.initializer,
+                    initargs=self.initargs,
+                )
+        return self._pool
+
+    async def run(self, fn, *args):
+        if self.max_pending is not None and self._pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"{self.name} is overloaded, please try again later",
+                headers={"Retry-After": "1"},
+            )
+        self._pending += 1
+        submitted = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            started, result = await loop.run_in_executor(
+                self._get_pool(), _timed_call, fn, args
+            )
+            finished = time.perf_counter()
+            self.queue_time_total += max(started - submitted, 0.0)
+            self.run_time_total += finished - max(started, submitted)
+            self.completed += 1
+            return result
+        finally:
+            self._pending -= 1
+
+    def stats(self) -> dict:
+        completed = self.completed or 1
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_queue_ms": round(self.queue_time_total / completed * 1000, 3),
+            "avg_run_ms": round(self.run_time_total / completed * 1000, 3),
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+# module level so it can be pickled into process pool workers
+def _timed_call(fn, args):
+    started = time.perf_counter()
+    return started, fn(*args)
@@ -0,0 +1,169 @@
+from dataclasses import dataclass
+from datetime import datetime
+
+import pytz
+from sqlalchemy import select, func, literal
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from car_parking.src.database.models import User, Parking, Car, Tariff
+from car_parking.src.repository import occupancy as repository_occupancy
+from car_parking.src.repository.parking import calculate_datetime_difference, calculate_cost
+from car_parking.src.schemas.parking import ParkingSchema, ParkingResponse
+from car_parking.src.services.outbox import add_notification, outbox_worker
+
+
+DEFAULT_TARIFF_ID = 1
+
+
+@dataclass
+class GateContext:
+    license_plate: str
+    car: Car | None
+    user: User | None
+    tariff: Tariff | None
+    parking_place: Parking | None
+
+    @property
+    def banned(self) -> bool:
+        return bool(self.car and self.car.banned)
+
+
+@dataclass
+class GateResult:
+    parking: ParkingSchema | str
+
+
+# car, owner, owner's tariff and the open parking session of a plate in one query
+async def load_gate_context(license_plate: str, db: AsyncSession) -> GateContext:
+    license_plate = license_plate.upper()
+    # one row even for an unknown plate, everything else is outer joined to it
+    plate = select(literal(license_plate).label("license_plate")).subquery()
+    row = (await db.execute(
+        select(Car, User, Tariff, Parking)
+        .select_from(plate)
+        .outerjoin(Car, Car.license_plate == plate.c.license_plate)
+        .outerjoin(User, User.license_plate == plate.c.license_plate)
+        .outerjoin(Tariff, Tariff.id == func.coalesce(User.tariff_id, DEFAULT_TARIFF_ID))
+        .outerjoin(Parking, (Parking.license_plate == plate.c.license_plate) & (Parking.status == False))
+        .limit(1)
+    )).first()
+    return GateContext(license_plate, *row)
+
+
+def parking_response(parking_place: Parking) -> ParkingResponse:
+    return ParkingResponse(
+        enter_time=parking_place.enter_time,
+        departure_time=parking_place.departure_time,
+        license_plate=parking_place.license_plate,
+        amount_paid=parking_place.amount_paid,
+        duration=parking_place.duration,
+        status=False,
+    )
+
+
+def already_in_parking(parking_place: Parking) -> GateResult:
+    return GateResult(ParkingSchema(info=parking_response(parking_place),
+                                    status="This car already in parking."))
+
+
+def banned_message(license_plate: str) -> str:
+    return f"Your car << {license_plate} >> banned. Contact parking administrator"
+
+
+# method to register a car at the entry gate, the place, the session and the owner's notification
+# are written in one transaction
+async def enter_gate(license_plate: str, db: AsyncSession, host: str | None = None) -> GateResult:
+    context = await load_gate_context(license_plate, db)
+    if context.banned:
+        return GateResult(banned_message(context.license_plate))
+
+    if context.parking_place is not None:
+        return already_in_parking(context.parking_place)
+
+    if not await repository_occupancy.reserve_place(db):
+        await db.rollback()
+        return GateResult("Sorry we don't have places for parking")
+
+    if context.car is None:
+        db.add(Car(license_plate=context.license_plate))
+    # set here instead of the server default, saves reading the row back
+    parking_place = Parking(license_plate=context.license_plate,
+                            enter_time=datetime.now(pytz.timezone("Europe/Kiev")))
+    db.add(parking_place)
+    user = context.user
+    notification = None
+    if user and host:
+        notification = add_notification("parking_enter", {
+            "email": user.email,
+            "username": user.username,
+            "license_plate": user.license_plate,
+            "enter_time": parking_place.enter_time.strftime("%Y-%m-%d %H:%M:%S"),
+            "tariff_name": context.tariff.tariff_name,
+            "tariff_value": float(context.tariff.tariff_value),
+            "host": host,
+        }, db)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # another gate registered the same car first, ux_parking_open_license_plate
+        # rejected the second open session and the reserved place is rolled back
+        await db.rollback()
+        context = await load_gate_context(license_plate, db)
+        if context.parking_place is None:
+            raise
+        return already_in_parking(context.parking_place)
+    if notification is not None:
+        await outbox_worker.publish(notification.id)
+
+    parking = ParkingSchema(
+        info=parking_response(parking_place),
+        status=f"Parking successful, please check your email<< {user.email} >> for details"
+        if user
+        else "Parking successful, to get details please sign up for our Car Parking service",
+    )
+    return GateResult(parking)
+
+
+# method to close the open parking session with its invoice and the owner's notification in one transaction
+async def exit_gate(license_plate: str, db: AsyncSession, host: str | None = None) -> GateResult:
+    context = await load_gate_context(license_plate, db)
+    if context.banned:
+        return GateResult(banned_message(context.license_plate))
+
+    parking_place = context.parking_place
+    if parking_place is None:
+        return GateResult(f"Parking place for car {context.license_plate} not found")
+
+    departure_time = datetime.now(pytz.timezone("Europe/Kiev"))
+    duration = calculate_datetime_difference(parking_place.enter_time, departure_time)
+    parking_place.departure_time = departure_time
+    parking_place.duration = duration
+    parking_place.amount_paid = calculate_cost(duration, int(context.tariff.tariff_value))
+    user = context.user
+    notification = None
+    if user and host:
+        notification = add_notification("parking_exit", {
+            "email": user.email,
+            "username": user.username,
+            "license_plate": user.license_plate,
+            "parking_place_id": parking_place.id,
+            "enter_time": parking_place.enter_time.strftime("%Y-%m-%d %H:%M:%S"),
+            "departure_time": departure_time.strftime("%Y-%m-%d %H:%M:%S"),
+            "tariff_name": context.tariff.tariff_name,
+            "tariff_value": float(context.tariff.tariff_value),
+            "duration": float(duration),
+            "amount_paid": float(parking_place.amount_paid),
+            "host": host,
+        }, db)
+    await db.commit()
+    if notification is not None:
+        await outbox_worker.publish(notification.id)
+
+    parking = ParkingSchema(
+        info=parking_response(parking_place),
+        status=f"Parking invoice sent to your email << {user.email}>>. Please confirm payment"
+        if user
+        else f"Your parking ID = << {parking_place.id} >>Confirm payment, please.",
+    )
+    return GateResult(parking)
@@ -0,0 +1,88 @@
+import io
+
+import cv2
+import numpy as np
+from fastapi import HTTPException, status
+from PIL import Image, UnidentifiedImageError
+
+from car_parking.src.conf.config import settings
+from car_parking.src.services.executor import BoundedExecutor
+
+
+# cv2 flags that decode straight into a 1/2, 1/4 or 1/8 sized image
+REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+# limits are read on every call, not bound when the module is imported
+def get_reduce_factor(width: int, height: int, max_pixels: int = None, max_side: int = None) -> int:
+    max_pixels = max_pixels or settings.image_max_pixels
+    max_side = settings.image_max_side if max_side is None else max_side
+    reduce = 1
+    while reduce < 8 and (
+        (width // reduce) * (height // reduce) > max_pixels
+        or (max_side and max(width, height) // reduce > max_side)
+    ):
+        reduce *= 2
+    if (width // reduce) * (height // reduce) > max_pixels:
+        raise too_large(max_pixels)
+    return reduce
+
+
+def too_large(max_pixels: int = None) -> HTTPException:
+    max_pixels = max_pixels or settings.image_max_pixels
+    return HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                         detail=f"Image is too large, maximum is {max_pixels} pixels")
+
+
+# method to decode an uploaded frame into a BGR ndarray, only the header is parsed first so
+# oversized images are downscaled while decoding or rejected
+def decode_image(content: bytes) -> np.ndarray:
+    try:
+        # PIL reads only the header here, the pixels are not decoded
+        header = Image.open(io.BytesIO(content))
+        width, height = header.size
+    except Image.DecompressionBombError:
+        raise too_large()
+    except (UnidentifiedImageError, OSError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid image")
+
+    reduce = get_reduce_factor(width, height)
+    if reduce > 1 and header.format != "JPEG":
+        # only JPEG can be downscaled while decoding, anything else is expanded at full
+        # size first, so it has to fit the pixel limit as it is
+        if width * height > settings.image_max_pixels:
+            raise too_large()
+        img = cv2.imdecode(np.frombuffer(content, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if img is not None:
+            return cv2.resize(img, (width // reduce, height // reduce), interpolation=cv2.INTER_AREA)
+    else:
+        img = cv2.imdecode(np.frombuffer(content, dtype=np.uint8), REDUCED_FLAGS[reduce])
+        if img is not None:
+            return img
+
+    # formats cv2 can't decode (webp without codec, avif, ...) go through PIL
+    try:
+        header.draft("RGB", (width // reduce, height // reduce))
+        img = header.convert("RGB")
+    except OSError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid image")
+    if reduce > 1:
+        img = img.reduce(reduce) if img.width > width // reduce else img
+    return cv2.cvtColor(np.asarray(img), cv2.COLOR_RGB2BGR)
+
+
+# cv2.imdecode releases the GIL, a few dedicated threads keep decoding off the event loop
+decode_executor = BoundedExecutor(
+    name="image_decoder",
+    workers=settings.image_decode_workers,
+    max_pending=settings.image_decode_max_pending,
+)
+
+
+async def decode_upload(content: bytes) -> np.ndarray:
+    return await decode_executor.run(decode_image, content)
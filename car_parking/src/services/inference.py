@@ -0,0 +1,128 @@
+import asyncio
+
+import numpy as np
+
+from car_parking.src.conf.config import settings
+from car_parking.src.services.batching import MicroBatcher
+from car_parking.src.services.executor import BoundedExecutor
+from car_parking.src.services.plate_reader import PlatesReader, get_reader, init_worker
+from car_parking.src.schemas.parking import PlateReading
+
+
+# these run inside the pool, every worker thread or process has its own reader
+def _started():
+    return True
+
+
+def _char_images(img):
+    return get_reader().get_char_images(img)
+
+
+def _char_images_batch(images):
+    return get_reader().get_char_images_batch(images)
+
+
+def _classify_batch(chars_list):
+    return get_reader().classify_batch(chars_list)
+
+
+def _predict_batch(images, min_confidence):
+    return get_reader().predict_batch(images, min_confidence)
+
+
+def _detect_vehicles(img):
+    return get_reader().vd.detect_vehicles(img)
+
+
+inference_executor = BoundedExecutor(
+    name="inference",
+    kind=settings.inference_pool,
+    workers=settings.inference_workers,
+    max_pending=settings.inference_max_pending,
+    initializer=init_worker,
+    initargs=(settings.inference_warm_up,),
+)
+
+
+# the batches come from callers already admitted by inference_executor, a second
+# admission could reject a whole batch of them, so the classifier has its own worker
+classifier_executor = BoundedExecutor(
+    name="classifier",
+    kind=settings.inference_pool,
+    workers=1,
+    max_pending=None,
+    initializer=init_worker,
+    initargs=(settings.inference_warm_up, False),
+)
+
+
+async def _run_classifier(chars_list: list) -> list:
+    return await classifier_executor.run(_classify_batch, chars_list)
+
+
+# character crops of concurrent gate requests share one classifier call
+classifier_batcher = MicroBatcher(
+    name="classifier",
+    handler=_run_classifier,
+    max_samples=settings.classifier_batch_max_samples,
+    max_wait_ms=settings.classifier_batch_max_wait_ms,
+)
+
+
+async def warm_up():
+    # concurrent calls start every worker, the initializer loads and warms up its models
+    calls = min(inference_executor.workers, inference_executor.max_pending)
+    await asyncio.gather(classifier_executor.run(_started),
+                         *(inference_executor.run(_started) for _ in range(calls)))
+
+
+def _reading(predicted, frames: int = 1) -> PlateReading:
+    char_confidence, confidence = PlatesReader.prediction_confidence(predicted)
+    return PlateReading(
+        license_plate=PlatesReader.decode_prediction(predicted),
+        confidence=confidence,
+        char_confidence=char_confidence,
+        frames=frames,
+    )
+
+
+async def read_plate(img) -> PlateReading | None:
+    chars = await inference_executor.run(_char_images, img)
+    if chars is None:
+        return None
+    predicted = await classifier_batcher.submit(chars, len(chars))
+    return _reading(predicted)
+
+
+async def read_plate_frames(images: list) -> PlateReading | None:
+    chars_list = await inference_executor.run(_char_images_batch, images)
+    found = [chars for chars in chars_list if chars is not None]
+    if not found:
+        return None
+    # all frames go to the classifier together and are split back afterwards
+    predicted = await classifier_batcher.submit(np.concatenate(found), sum(len(c) for c in found))
+    predictions = np.split(predicted, np.cumsum([len(c) for c in found])[:-1])
+    return _reading(PlatesReader.fuse_predictions(predictions), frames=len(found))
+
+
+async def recognize_plate(img) -> str | None:
+    reading = await read_plate(img)
+    if reading is None or reading.confidence < settings.plate_min_confidence:
+        return None
+    return reading.license_plate
+
+
+async def recognize_plate_frames(images: list) -> str | None:
+    reading = await read_plate_frames(images)
+    if reading is None or reading.confidence < settings.plate_min_confidence:
+        return None
+    return reading.license_plate
+
+
+async def recognize_plates(images: list) -> list[str | None]:
+    # same confidence filter as the single image path
+    return await inference_executor.run(_predict_batch, images, settings.plate_min_confidence)
+
+
+async def detect_vehicles(img) -> list:
+    return await inference_executor.run(_detect_vehicles, img)
@@ -0,0 +1,42 @@
+from jose import JWTError, jwt
+
+from car_parking.src.conf.config import settings
+
+
+# reference backend, python-jose
+class JoseCodec:
+    def encode(self, claims: dict, key: str, algorithm: str) -> str:
+        return jwt.encode(claims, key, algorithm=algorithm)
+
+    def decode(self, token: str, key: str, algorithm: str) -> dict:
+        return jwt.decode(token, key, algorithms=[algorithm])
+
+
+# PyJWT, the optional pyjwt extra, reads and writes the same tokens as jose
+class PyJWTCodec:
+    def __init__(self):
+        import jwt as pyjwt
+
+        self.pyjwt = pyjwt
+
+    def encode(self, claims: dict, key: str, algorithm: str) -> str:
+        return self.pyjwt.encode(claims, key, algorithm=algorithm)
+
+    def decode(self, token: str, key: str, algorithm: str) -> dict:
+        try:
+            return self.pyjwt.decode(token, key, algorithms=[algorithm])
+        except self.pyjwt.PyJWTError as e:
+            # callers only know about jose errors
+            raise JWTError(str(e))
+
+
+CODECS = {
+    "jose": JoseCodec,
+    "pyjwt": PyJWTCodec,
+}
+
+
+def load_codec(backend: str = settings.jwt_backend):
+    if backend not in CODECS:
+        raise ValueError(f"Unknown jwt backend {backend}, use one of {list(CODECS)}")
+    return CODECS[backend]()
@@ -1,37 +1,19 @@
-from fastapi import Request, HTTPException, status, Depends, Security
-from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from sqlalchemy.orm import Session
+from fastapi import HTTPException, status, Depends
 
-from car_parking.src.services.auth import service_auth
-from car_parking.src.database.models import BlacklistedToken, User
-from car_parking.src.database.db import get_db
-
-security = HTTPBearer()
+from car_parking.src.services.auth import Principal, get_principal
+from car_parking.src.services.token_blacklist import token_blacklist
 
 
 class LogoutDependency:
     def __init__(self):
         pass
 
-    async def __call__(
-        self,
-        request: Request,
-        current_user: User = Depends(service_auth.get_current_user),
-        credentials: HTTPAuthorizationCredentials = Security(security),
-        db: Session = Depends(get_db),
-    ):
-        user_id = current_user.id
-        token = (
-            db.query(BlacklistedToken)
-            .filter(BlacklistedToken.user_id == user_id)
-            .first()
-        )
-        access_token = credentials.credentials
-
-        if token and token.blacklisted_token == access_token:
+    async def __call__(self, principal: Principal = Depends(get_principal)):
+        # answered by the in-process bloom filter for tokens that were never revoked
+        if await token_blacklist.contains(principal.token_id):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
-                detail=f"Operation forbidden for {current_user.email}. Please login again!",
+                detail=f"Operation forbidden for {principal.user.email}. Please login again!",
             )
 
 
@@ -0,0 +1,181 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from email.message import EmailMessage
+from email.utils import formataddr
+from pathlib import Path
+
+import aiosmtplib
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from car_parking.src.conf.config import settings
+
+
+TEMPLATE_FOLDER = Path(__file__).parent.parent / "templates"
+
+
+# 4xx replies, dropped connections and timeouts may go through later, 5xx replies and refused recipients won't
+def is_transient(err: Exception) -> bool:
+    if isinstance(err, aiosmtplib.SMTPRecipientsRefused):
+        return False
+    if isinstance(err, aiosmtplib.SMTPResponseException):
+        return 400 <= err.code < 500
+    return isinstance(err, (OSError, TimeoutError, asyncio.TimeoutError))
+
+
+@dataclass
+class MailMessage:
+    recipient: str
+    subject: str
+    template_name: str
+    template_body: dict
+    # transient failures the dispatcher retries itself
+    retries: int = 0
+    attempts: int = 0
+    queued_at: float = field(default_factory=time.perf_counter)
+    # set once sent, raises the error of a failed send
+    result: asyncio.Future | None = None
+
+
+# sends queued emails over a few persistent SMTP connections, up to batch_size per wake-up
+class MailDispatcher:
+    def __init__(self, connections: int = 2, batch_size: int = 50, max_retries: int = 5,
+                 queue_size: int = 10000, idle_timeout: float = 60):
+        self.connections = connections
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.idle_timeout = idle_timeout
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        # compiled once, rendering only fills in the values
+        environment = Environment(loader=FileSystemLoader(TEMPLATE_FOLDER),
+                                  autoescape=select_autoescape(["html"]))
+        self.templates = {name: environment.get_template(name) for name in environment.list_templates()}
+        self._workers = []
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.batches = 0
+        self.delivery_time_total = 0.0
+
+    def _create_connection(self) -> aiosmtplib.SMTP:
+        return aiosmtplib.SMTP(
+            hostname=settings.mail_server,
+            port=settings.mail_port,
+            username=settings.mail_username,
+            password=settings.mail_password,
+            use_tls=True,
+            validate_certs=True,
+        )
+
+    def _build(self, message: MailMessage) -> EmailMessage:
+        email = EmailMessage()
+        email["From"] = formataddr(("Car parking", settings.mail_from))
+        email["To"] = message.recipient
+        email["Subject"] = message.subject
+        email.set_content(self.templates[message.template_name].render(**message.template_body), subtype="html")
+        return email
+
+    # method to queue an email nobody waits for, transient failures are retried up to max_retries times
+    async def enqueue(self, recipient: str, subject: str, template_name: str, template_body: dict) -> None:
+        await self.queue.put(MailMessage(recipient, subject, template_name, template_body, retries=self.max_retries))
+
+    # method to queue a single delivery attempt for callers that retry on their own like the outbox,
+    # the returned future raises the smtp error if the email was not sent
+    async def send(self, recipient: str, subject: str, template_name: str, template_body: dict) -> asyncio.Future:
+        result = asyncio.get_running_loop().create_future()
+        await self.queue.put(MailMessage(recipient, subject, template_name, template_body, result=result))
+        return result
+
+    async def _deliver(self, smtp: aiosmtplib.SMTP, message: MailMessage) -> None:
+        try:
+            if not smtp.is_connected:
+                await smtp.connect()
+            await smtp.send_message(self._build(message))
+        except (aiosmtplib.SMTPException, OSError, asyncio.TimeoutError) as err:
+            if not isinstance(err, (aiosmtplib.SMTPResponseException, aiosmtplib.SMTPRecipientsRefused)):
+                # the connection may be half broken, start over with a new one
+                smtp.close()
+            message.attempts += 1
+            if is_transient(err) and message.attempts <= message.retries:
+                self.retries += 1
+                # requeued after the backoff, the connection goes on with the next messages meanwhile
+                asyncio.get_running_loop().call_later(min(2 ** message.attempts, 60), self._requeue, message)
+                return
+            self._drop(message, err)
+            return
+        self.sent += 1
+        self.delivery_time_total += time.perf_counter() - message.queued_at
+        if message.result is not None and not message.result.done():
+            message.result.set_result(None)
+
+    def _requeue(self, message: MailMessage) -> None:
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull as err:
+            self._drop(message, err)
+
+    def _drop(self, message: MailMessage, err: Exception) -> None:
+        self.failed += 1
+        if message.result is None:
+            print(f"Email to {message.recipient} dropped: {err!r}")
+        elif not message.result.done():
+            message.result.set_exception(err)
+
+    async def _run(self) -> None:
+        smtp = self._create_connection()
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(self.queue.get(), self.idle_timeout)
+                except asyncio.TimeoutError:
+                    if smtp.is_connected:
+                        try:
+                            await smtp.quit()
+                        except (aiosmtplib.SMTPException, OSError):
+                            smtp.close()
+                    continue
+                batch = [message]
+                while len(batch) < self.batch_size and not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+                self.batches += 1
+                for message in batch:
+                    await self._deliver(smtp, message)
+                    self.queue.task_done()
+        finally:
+            smtp.close()
+
+    def start(self) -> None:
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._run()) for _ in range(self.connections)]
+
+    async def stop(self, timeout: float = 5) -> None:
+        try:
+            # give the queued notifications a chance to go out
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def stats(self) -> dict:
+        sent = self.sent or 1
+        return {
+            "connections": len(self._workers),
+            "queued": self.queue.qsize(),
+            "sent": self.sent,
+            "failed": self.failed,
+            "retries": self.retries,
+            "avg_batch": round((self.sent + self.failed) / self.batches, 2) if self.batches else 0.0,
+            "avg_delivery_ms": round(self.delivery_time_total / sent * 1000, 3),
+        }
+
+
+mail_dispatcher = MailDispatcher(
+    connections=settings.mail_connections,
+    batch_size=settings.mail_batch_size,
+    max_retries=settings.mail_max_retries,
+    queue_size=settings.mail_queue_size,
+    idle_timeout=settings.mail_idle_timeout,
+)
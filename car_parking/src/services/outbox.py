@@ -0,0 +1,166 @@
+import asyncio
+import os
+import socket
+from datetime import timedelta
+
+from redis.exceptions import RedisError
+from sqlalchemy import select, func, or_, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from car_parking.src.conf.config import settings
+from car_parking.src.database.db import AsyncSessionLocal
+from car_parking.src.database.redis_client import redis_client
+from car_parking.src.database.models import Notification
+from car_parking.src.services import email as service_email
+from car_parking.src.services.mail_dispatcher import is_transient
+
+
+HANDLERS = {
+    "parking_enter": service_email.praking_enter_message,
+    "parking_exit": service_email.praking_exit_message,
+}
+
+
+def add_notification(kind: str, payload: dict, db: AsyncSession) -> Notification:
+    # committed together with the gate changes, so a notification is never lost or orphaned
+    notification = Notification(kind=kind, payload=payload)
+    db.add(notification)
+    return notification
+
+
+# delivers the notifications table at least once outside of the request: a batch is leased in a short
+# transaction, sent without holding a connection or row locks and marked in a second one, failed rows are
+# retried after a backoff. Woken by a redis stream when given, otherwise polling every poll_interval
+class OutboxWorker:
+    stream = "notifications"
+
+    def __init__(self, poll_interval: float = 1.0, batch_size: int = 50, max_attempts: int = 10,
+                 lease_seconds: int = 120, redis_client=None):
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        # longer than the delivery of a batch, a worker that died is taken over once it expires
+        self.lease = timedelta(seconds=lease_seconds)
+        self.redis_client = redis_client
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"[-64:]
+        self._last_stream_id = "$"
+        self.delivered = 0
+        self.failed = 0
+        self.backlog = 0
+
+    async def publish(self, notification_id: int) -> None:
+        if self.redis_client is None:
+            return
+        try:
+            await self.redis_client.xadd(self.stream, {"id": notification_id}, maxlen=10000, approximate=True)
+        except RedisError:
+            # only a wake-up, the row is picked up by the next poll anyway
+            pass
+
+    async def _wait(self) -> None:
+        if self.redis_client is None:
+            await asyncio.sleep(self.poll_interval)
+            return
+        try:
+            entries = await self.redis_client.xread(
+                {self.stream: self._last_stream_id}, count=self.batch_size, block=int(self.poll_interval * 1000)
+            )
+        except RedisError:
+            await asyncio.sleep(self.poll_interval)
+            return
+        for _, messages in entries:
+            if messages:
+                self._last_stream_id = messages[-1][0]
+
+    async def _deliver(self, notification: Notification) -> None:
+        # a single attempt, the dispatcher raises the smtp error and the retries are ours
+        sent = await HANDLERS[notification.kind](**notification.payload)
+        await sent
+
+    def _pending(self, query):
+        return query.where(Notification.delivered_at.is_(None), Notification.attempts < self.max_attempts)
+
+    async def _claim(self) -> list[Notification]:
+        async with AsyncSessionLocal() as db:
+            # neither leased by a running worker nor waiting for a retry
+            ids = (
+                self._pending(select(Notification.id))
+                .where(or_(Notification.locked_until.is_(None), Notification.locked_until < func.now()))
+                .order_by(Notification.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+                .scalar_subquery()
+            )
+            notifications = (await db.scalars(
+                update(Notification)
+                .where(Notification.id.in_(ids))
+                .values(claimed_by=self.worker_id, locked_until=func.now() + self.lease)
+                .returning(Notification)
+                .execution_options(synchronize_session=False)
+            )).all()
+            # counted on every iteration, rows written since the last batch included
+            self.backlog = await db.scalar(self._pending(select(func.count(Notification.id))))
+            # the row locks end here, the lease keeps the other workers away
+            await db.commit()
+        return notifications
+
+    async def _finish(self, notifications: list[Notification], errors: list) -> None:
+        delivered_ids = [n.id for n, error in zip(notifications, errors) if error is None]
+        async with AsyncSessionLocal() as db:
+            if delivered_ids:
+                await db.execute(
+                    update(Notification)
+                    .where(Notification.id.in_(delivered_ids))
+                    .values(delivered_at=func.now(), locked_until=None, claimed_by=None)
+                    .execution_options(synchronize_session=False)
+                )
+            for notification, error in zip(notifications, errors):
+                if error is None:
+                    continue
+                # a 5xx reply or a broken payload won't go through on the next attempt either
+                attempts = notification.attempts + 1 if is_transient(error) else self.max_attempts
+                print(f"Outbox: notification {notification.id} failed: {error!r}")
+                await db.execute(
+                    update(Notification)
+                    .where(Notification.id == notification.id)
+                    .values(attempts=attempts, claimed_by=None,
+                            locked_until=func.now() + timedelta(seconds=min(2 ** attempts, 300)))
+                    .execution_options(synchronize_session=False)
+                )
+            await db.commit()
+        self.delivered += len(delivered_ids)
+        self.failed += len(notifications) - len(delivered_ids)
+
+    async def process_batch(self) -> int:
+        notifications = await self._claim()
+        if notifications:
+            errors = await asyncio.gather(*(self._deliver(n) for n in notifications), return_exceptions=True)
+            await self._finish(notifications, errors)
+        return len(notifications)
+
+    async def run(self) -> None:
+        while True:
+            try:
+                claimed = await self.process_batch()
+            except (SQLAlchemyError, OSError) as err:
+                print(f"Outbox: {err}")
+                claimed = 0
+            if claimed < self.batch_size:
+                await self._wait()
+
+    def stats(self) -> dict:
+        return {
+            "backlog": self.backlog,
+            "delivered": self.delivered,
+            "failed": self.failed,
+        }
+
+
+outbox_worker = OutboxWorker(
+    poll_interval=settings.outbox_poll_interval,
+    batch_size=settings.outbox_batch_size,
+    max_attempts=settings.outbox_max_attempts,
+    lease_seconds=settings.outbox_lease_seconds,
+    redis_client=redis_client if settings.outbox_redis else None,
+)
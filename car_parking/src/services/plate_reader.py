@@ -1,12 +1,11 @@
+import threading
+
 import cv2
 import numpy as np
-import keras
 from typing import Tuple
 from .vehicle_detector import VehicleDetector
-from pathlib import Path
-
+from .classifier import load_classifier
 
-path = str(Path(__file__).parent.parent) + "/models"
 
 # dictionary of all classes so when model predicts number we can look up the digit or letter
 CLASSES = {
@@ -26,13 +25,39 @@ CLASSES = {
 
 
 class PlatesReader():
-    
-    # loading text classifier model
-    model = keras.models.load_model(path + r"/text_classifier.keras")
-    vd = VehicleDetector()
+
+    def __init__(self):
+        # models are loaded on first use so importing this module stays cheap
+        self._model = None
+        self._vd = None
+        self._lock = threading.Lock()
+
+    # text classifier model
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = load_classifier()
+        return self._model
+
+    # model to find car in the image
+    @property
+    def vd(self):
+        if self._vd is None:
+            with self._lock:
+                if self._vd is None:
+                    self._vd = VehicleDetector()
+        return self._vd
+
+    # method to load models and run a dummy inference so the first real request is fast
+    def warm_up(self, detector: bool = True):
+        self.model.predict(np.zeros((1, 44, 24, 1)))
+        if detector:
+            self.vd.detect_vehicles(np.zeros((416, 416, 3), dtype="uint8"))
 
     # method to get boxes from image where text is located
-    async def get_rectangles(self, img_ori):
+    def get_rectangles(self, img_ori):
         # copy of img
         img_ori = img_ori
         # converting to gray
@@ -62,40 +87,47 @@ class PlatesReader():
         method=cv2.CHAIN_APPROX_NONE
         )
 
-        contours_dict = []
-
-        for contour in contours:
-            x, y, w, h = cv2.boundingRect(contour)
-
-            # insert to dict
-            contours_dict.append({
-                'contour': contour,
-                'x': x,
-                'y': y,
-                'w': w,
-                'h': h,
-                'cx': x + (w / 2),
-                'cy': y + (h / 2)
-            })
-
         MIN_AREA = 80 # min area of the box
         MIN_WIDTH, MIN_HEIGHT = 2, 8
         MIN_RATIO, MAX_RATIO = 0.25, 1.0
 
+        if len(contours) == 0:
+            return []
+
+        # candidate table, one row per contour: x, y, w, h
+        rects = np.array([cv2.boundingRect(contour) for contour in contours], dtype=np.float64)
+        x, y, w, h = rects.T
+        area = w * h
+        ratio = w / np.maximum(h, 1)
+        # checking the area and ratio of every contour at once
+        keep = (area > MIN_AREA) & (w > MIN_WIDTH) & (h > MIN_HEIGHT) \
+            & (MIN_RATIO < ratio) & (ratio < MAX_RATIO)
+        keep_idx = np.flatnonzero(keep)
+
         possible_contours = []
+        for cnt, i in enumerate(keep_idx):
+            bx, by, bw, bh = (int(v) for v in rects[i])
+            possible_contours.append({
+                'contour': contours[i],
+                'x': bx,
+                'y': by,
+                'w': bw,
+                'h': bh,
+                'cx': bx + (bw / 2),
+                'cy': by + (bh / 2),
+                'idx': cnt
+            })
 
-        cnt = 0
-        for d in contours_dict:
-            area = d['w'] * d['h']
-            ratio = d['w'] / d['h']
-            # checking the area and ratio of every contour
-            if area > MIN_AREA \
-            and d['w'] > MIN_WIDTH and d['h'] > MIN_HEIGHT \
-            and MIN_RATIO < ratio < MAX_RATIO:
-                d['idx'] = cnt
-                cnt += 1
-                possible_contours.append(d)
-            
+        result_idx = self.find_chars(rects[keep_idx])
+
+        matched_result = []
+        for idx_list in result_idx:
+            matched_result.append(np.take(possible_contours, idx_list))
+        return matched_result
+
+    # method to group candidate boxes that line up like characters of one plate
+    @staticmethod
+    def find_chars(rects: np.ndarray) -> list:
         MAX_DIAG_MULTIPLYER = 5
         MAX_ANGLE_DIFF = 12.0 
         MAX_AREA_DIFF = 0.5 
@@ -103,68 +135,53 @@ class PlatesReader():
         MAX_HEIGHT_DIFF = 0.2
         MIN_N_MATCHED = 5 
 
-        def find_chars(contour_list):
-            matched_result_idx = []
-
-            for d1 in contour_list:
-                matched_contours_idx = []
-                for d2 in contour_list:
-                    if d1['idx'] == d2['idx']:
-                        continue
-
-                    dx = abs(d1['cx'] - d2['cx'])
-                    dy = abs(d1['cy'] - d2['cy'])
-
-                    diagonal_length1 = np.sqrt(d1['w'] ** 2 + d1['h'] ** 2)
-
-                    distance = np.linalg.norm(np.array([d1['cx'], d1['cy']]) - np.array([d2['cx'], d2['cy']]))
-                    if dx == 0:
-                        angle_diff = 90
-                    else:
-                        angle_diff = np.degrees(np.arctan(dy / dx))
-                    area_diff = abs(d1['w'] * d1['h'] - d2['w'] * d2['h']) / (d1['w'] * d1['h'])
-                    width_diff = abs(d1['w'] - d2['w']) / d1['w']
-                    height_diff = abs(d1['h'] - d2['h']) / d1['h']
-
-                    if distance < diagonal_length1 * MAX_DIAG_MULTIPLYER \
-                    and angle_diff < MAX_ANGLE_DIFF and area_diff < MAX_AREA_DIFF \
-                    and width_diff < MAX_WIDTH_DIFF and height_diff < MAX_HEIGHT_DIFF:
-                        matched_contours_idx.append(d2['idx'])
-
-                # append this contour
-                matched_contours_idx.append(d1['idx'])
-
-                if len(matched_contours_idx) < MIN_N_MATCHED:
-                    continue
-
-                matched_result_idx.append(matched_contours_idx)
-
-                unmatched_contour_idx = []
-                for d4 in contour_list:
-                    if d4['idx'] not in matched_contours_idx:
-                        unmatched_contour_idx.append(d4['idx'])
-
-                unmatched_contour = np.take(possible_contours, unmatched_contour_idx)
-
-                # recursive
-                recursive_contour_list = find_chars(unmatched_contour)
-
-                for idx in recursive_contour_list:
-                    matched_result_idx.append(idx)
-
+        if len(rects) == 0:
+            return []
+
+        x, y, w, h = rects.T
+        cx = x + w / 2
+        cy = y + h / 2
+        area = w * h
+
+        # pairwise comparison of every box (row) against every other box (column),
+        # all differences are relative to the row box like in the original loop
+        dx = np.abs(cx[:, None] - cx[None, :])
+        dy = np.abs(cy[:, None] - cy[None, :])
+        distance = np.sqrt(dx ** 2 + dy ** 2)
+        diagonal_length = np.sqrt(w ** 2 + h ** 2)[:, None]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            angle_diff = np.where(dx == 0, 90, np.degrees(np.arctan(dy / dx)))
+        area_diff = np.abs(area[:, None] - area[None, :]) / area[:, None]
+        width_diff = np.abs(w[:, None] - w[None, :]) / w[:, None]
+        height_diff = np.abs(h[:, None] - h[None, :]) / h[:, None]
+
+        matched = (distance < diagonal_length * MAX_DIAG_MULTIPLYER) \
+            & (angle_diff < MAX_ANGLE_DIFF) & (area_diff < MAX_AREA_DIFF) \
+            & (width_diff < MAX_WIDTH_DIFF) & (height_diff < MAX_HEIGHT_DIFF)
+        np.fill_diagonal(matched, False)
+
+        # greedy pass: take the first box with enough neighbours, remove its group
+        # and repeat on what is left (same groups as the old recursive search)
+        matched_result_idx = []
+        remaining = np.arange(len(rects))
+        while len(remaining):
+            sub = matched[np.ix_(remaining, remaining)]
+            counts = sub.sum(axis=1) + 1
+            hits = np.flatnonzero(counts >= MIN_N_MATCHED)
+            if len(hits) == 0:
                 break
-
-            return matched_result_idx
-
-        result_idx = find_chars(possible_contours)
-
-        matched_result = []
-        for idx_list in result_idx:
-            matched_result.append(np.take(possible_contours, idx_list))
-        return matched_result
+            first = hits[0]
+            group = remaining[sub[first]].tolist()
+            group.append(int(remaining[first]))
+            matched_result_idx.append(group)
+            leftover = ~sub[first]
+            leftover[first] = False
+            remaining = remaining[leftover]
+
+        return matched_result_idx
     
     # method to crop image and leave only car
-    async def get_cropped_img(self, img_ori):
+    def get_cropped_img(self, img_ori):
         print("was called")
         # model to find car in the image 
         img = img_ori
@@ -189,7 +206,7 @@ class PlatesReader():
         return img
 
     # method to add padding to image
-    async def resize_with_pad(self, image: np.array, 
+    def resize_with_pad(self, image: np.array, 
                     new_shape: Tuple[int, int], 
                     padding_color: Tuple[int] = (255, 255, 255)) -> np.array:
         
@@ -209,15 +226,15 @@ class PlatesReader():
         image = cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=padding_color)
         return image
 
-    # method to get prediction of text on the plate
-    async def get_prediction(self, img):
+    # method to get character crops of the plate, ready for the text classifier
+    def get_char_images(self, img):
         img_ori = img
-        matched_result = await self.get_rectangles(img_ori)
+        matched_result = self.get_rectangles(img_ori)
         if len(matched_result) != 1:
-            img_ori = await self.get_cropped_img(img_ori)
+            img_ori = self.get_cropped_img(img_ori)
             if img_ori is None:
                 return None
-            matched_result = await self.get_rectangles(img_ori)
+            matched_result = self.get_rectangles(img_ori)
             if len(matched_result) != 1:
                 return None
         matched_result = matched_result[0]
@@ -243,18 +260,106 @@ class PlatesReader():
             symbol = img_ori[d['y']:d['y']+d['h'], d['x']:d['x']+d['w']]
             img = cv2.cvtColor(symbol, cv2.COLOR_BGR2GRAY)
             img = cv2.resize(img, (15, 25))
-            img = await self.resize_with_pad(img, new_shape, color)
+            img = self.resize_with_pad(img, new_shape, color)
             result.append(img)
 
         result = np.array(result)
         result = np.reshape(result, (result.shape[0], result.shape[1], result.shape[2], 1))
         result = result / 255.
+        return result
 
-        predicted = self.model.predict(result)
+    # method to turn classifier output into the plate text
+    @staticmethod
+    def decode_prediction(predicted):
         predicted = [np.argmax(pred) for pred in predicted] 
         result = [str(CLASSES[pred]) for pred in predicted]
         result = ''.join(result)
         return result
 
+    # method to get the probability of every predicted character and of the whole plate
+    @staticmethod
+    def prediction_confidence(predicted):
+        char_confidence = [float(np.max(pred)) for pred in predicted]
+        # a plate is only as reliable as its weakest character
+        confidence = min(char_confidence) if char_confidence else 0.0
+        return char_confidence, confidence
+
+    # method to fuse classifier output of several frames of the same plate
+    @classmethod
+    def fuse_predictions(cls, predictions):
+        predictions = [p for p in predictions if p is not None and len(p)]
+        if not predictions:
+            return None
+        # frames that found a different number of characters can't be compared position-wise,
+        # keep the most common length and break ties by summed confidence
+        by_length = {}
+        for predicted in predictions:
+            by_length.setdefault(len(predicted), []).append(predicted)
+        group = max(by_length.values(),
+                    key=lambda g: (len(g), sum(cls.prediction_confidence(p)[1] for p in g)))
+        # position-wise probability voting
+        return np.mean(np.stack(group), axis=0)
 
-pr = PlatesReader()
\ No newline at end of file
+    # method to get prediction of text on the plate
+    def get_prediction(self, img):
+        chars = self.get_char_images(img)
+        if chars is None:
+            return None
+        predicted = self.model.predict(chars)
+        return self.decode_prediction(predicted)
+
+    # method to classify character crops of many plates with a single classifier call,
+    # returns the class probabilities of every plate
+    def classify_batch(self, chars_list):
+        predicted = self.model.predict(np.concatenate(chars_list))
+
+        results = []
+        offset = 0
+        for chars in chars_list:
+            results.append(predicted[offset:offset + len(chars)])
+            offset += len(chars)
+        return results
+
+    # method to get predictions for many images with a single classifier call,
+    # plates below min_confidence are treated as not found
+    def predict_batch(self, images, min_confidence: float = 0.0):
+        chars = self.get_char_images_batch(images)
+        found = [c for c in chars if c is not None]
+        if not found:
+            return [None] * len(images)
+
+        plates = iter(self.classify_batch(found))
+        results = []
+        for c in chars:
+            predicted = None if c is None else next(plates)
+            if predicted is None or self.prediction_confidence(predicted)[1] < min_confidence:
+                results.append(None)
+            else:
+                results.append(self.decode_prediction(predicted))
+        return results
+
+    def get_char_images_batch(self, images):
+        return [self.get_char_images(img) for img in images]
+
+
+_local = threading.local()
+
+
+# method to get the reader of the current inference worker, cv2.dnn nets and keras models
+# are not safe to share between threads so every worker thread or process loads its own
+def get_reader() -> PlatesReader:
+    reader = getattr(_local, "reader", None)
+    if reader is None:
+        reader = _local.reader = PlatesReader()
+    return reader
+
+
+# pool initializer, runs once in every worker thread or process
+def init_worker(warm_up: bool = False, detector: bool = True):
+    reader = get_reader()
+    if warm_up:
+        try:
+            reader.warm_up(detector)
+        except Exception as e:
+            # a failing initializer would break the whole pool, the models load again on first use
+            print(f"Inference warm up failed: {e}")
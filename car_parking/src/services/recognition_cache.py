@@ -0,0 +1,86 @@
+import hashlib
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+from redis.exceptions import RedisError
+
+from car_parking.src.conf.config import settings
+from car_parking.src.database.redis_client import redis_client
+from car_parking.src.services.cache_stats import hit_stats
+
+
+# recognised plates by frame hash in an in-process LRU with a TTL, shared through redis when given
+class RecognitionCache:
+    prefix = "plate: "
+
+    def __init__(self, max_size: int = 1024, ttl: int = 60, redis_client=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.redis_client = redis_client
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key_for_bytes(content: bytes) -> str:
+        return "sha256:" + hashlib.sha256(content).hexdigest()
+
+    @staticmethod
+    def key_for_image(img: np.ndarray, hash_size: int = 16) -> str:
+        # difference hash, survives re-encoding and small exposure changes of the same frame
+        gray = img.mean(axis=2) if img.ndim == 3 else img
+        small = cv2.resize(gray.astype(np.float32), (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+        bits = small[:, 1:] > small[:, :-1]
+        return "dhash:" + np.packbits(bits).tobytes().hex()
+
+    # count_miss=False for a lookup that falls back to another key, the fallback counts the miss
+    async def get(self, key: str, count_miss: bool = True) -> str | None:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, license_plate = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return license_plate
+            del self._entries[key]
+
+        if self.redis_client is not None:
+            try:
+                license_plate = await self.redis_client.get(self.prefix + key)
+            except RedisError:
+                license_plate = None
+            if license_plate is not None:
+                license_plate = license_plate.decode()
+                self._store(key, license_plate)
+                self.hits += 1
+                return license_plate
+
+        if count_miss:
+            self.misses += 1
+        return None
+
+    async def set(self, key: str, license_plate: str) -> None:
+        self._store(key, license_plate)
+        if self.redis_client is not None:
+            try:
+                await self.redis_client.set(self.prefix + key, license_plate, ex=self.ttl)
+            except RedisError:
+                pass
+
+    def _store(self, key: str, license_plate: str) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, license_plate)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), **hit_stats(self.hits, self.misses)}
+
+
+recognition_cache = RecognitionCache(
+    max_size=settings.recognition_cache_size,
+    ttl=settings.recognition_cache_ttl,
+    redis_client=redis_client if settings.recognition_cache_redis else None,
+)
@@ -0,0 +1,201 @@
+import asyncio
+import uuid
+
+import cv2
+from fastapi import HTTPException
+
+from car_parking.src.conf.config import settings
+from car_parking.src.database.db import AsyncSessionLocal
+from car_parking.src.services import gate as service_gate
+from car_parking.src.services.inference import detect_vehicles, recognize_plate
+
+
+def box_iou(a, b) -> float:
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    w = min(ax + aw, bx + bw) - max(ax, bx)
+    h = min(ay + ah, by + bh) - max(ay, by)
+    if w <= 0 or h <= 0:
+        return 0.0
+    inter = w * h
+    return inter / float(aw * ah + bw * bh - inter)
+
+
+def create_tracker():
+    # KCF needs opencv-contrib, MIL ships with the main opencv package
+    for name in ("TrackerKCF_create", "TrackerMIL_create"):
+        factory = getattr(cv2, name, None)
+        if factory is not None:
+            return factory()
+    return None
+
+
+# follows the biggest vehicle through a video, detects every detect_every frames and tracks in between,
+# reads the plate once per vehicle when its box stood still for stable_frames frames
+class VehicleTracker:
+    def __init__(self, detect=detect_vehicles, read=recognize_plate,
+                 detect_every: int = settings.stream_detect_every,
+                 stable_frames: int = settings.stream_stable_frames,
+                 stable_iou: float = settings.stream_stable_iou):
+        self.detect = detect
+        self.read = read
+        self.detect_every = detect_every
+        self.stable_frames = stable_frames
+        self.stable_iou = stable_iou
+        self.frame_idx = 0
+        self.detections = 0
+        self.reads = 0
+        self._reset()
+
+    def _reset(self):
+        self.box = None
+        self.tracker = None
+        self.stable_count = 0
+        self.read_done = False
+
+    async def _detect(self, frame):
+        self.detections += 1
+        boxes = await self.detect(frame)
+        if len(boxes) == 0:
+            return None
+        return tuple(int(v) for v in max(boxes, key=lambda box: box[2] * box[3]))
+
+    async def update(self, frame) -> str | None:
+        self.frame_idx += 1
+        previous = self.box
+
+        if self.box is None or self.frame_idx % self.detect_every == 0:
+            try:
+                box = await self._detect(frame)
+            except HTTPException:
+                # the pool is busy with gate requests, keep the state and detect on a later frame
+                return None
+            if box is None:
+                # vehicle left the frame, the next one gets its own read
+                self._reset()
+                return None
+            if previous is not None and box_iou(previous, box) < 0.3:
+                self._reset()
+                previous = None
+            self.box = box
+            self.tracker = create_tracker()
+            if self.tracker is not None:
+                await asyncio.to_thread(self.tracker.init, frame, box)
+        elif self.tracker is not None:
+            ok, box = await asyncio.to_thread(self.tracker.update, frame)
+            if not ok:
+                # lost the vehicle, whatever is detected next is a new one and gets its own read
+                self._reset()
+                return None
+            self.box = tuple(int(v) for v in box)
+
+        if previous is not None and box_iou(previous, self.box) >= self.stable_iou:
+            self.stable_count += 1
+        else:
+            self.stable_count = 0
+
+        if self.read_done or self.stable_count < self.stable_frames:
+            return None
+
+        x, y, w, h = self.box
+        roi = frame[max(y, 0):y + h, max(x, 0):x + w]
+        self.reads += 1
+        try:
+            license_plate = await self.read(roi)
+        except HTTPException:
+            license_plate = None
+        if license_plate is not None:
+            self.read_done = True
+        else:
+            # wait for another stable window before trying again
+            self.stable_count = 0
+        return license_plate
+
+
+# reads a video file or stream url and registers an entry or exit per vehicle
+class StreamIngestor:
+    def __init__(self, source: str, direction: str):
+        self.id = str(uuid.uuid4())
+        self.source = source
+        self.direction = direction
+        self.tracker = VehicleTracker()
+        self.events = []
+        self.running = False
+        self.error = None
+        self._capture = None
+
+    async def _emit(self, license_plate: str):
+        async with AsyncSessionLocal() as db:
+            if self.direction == "entry":
+                result = await service_gate.enter_gate(license_plate, db)
+            else:
+                result = await service_gate.exit_gate(license_plate, db)
+        parking = result.parking
+        self.events.append({
+            "license_plate": license_plate,
+            "frame": self.tracker.frame_idx,
+            "status": parking if isinstance(parking, str) else parking.status,
+        })
+
+    async def run(self):
+        try:
+            self._capture = await asyncio.to_thread(cv2.VideoCapture, self.source)
+            while self.running:
+                ok, frame = await asyncio.to_thread(self._capture.read)
+                if not ok:
+                    break
+                license_plate = await self.tracker.update(frame)
+                if license_plate is not None:
+                    await self._emit(license_plate)
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            self.running = False
+            if self._capture is not None:
+                self._capture.release()
+
+    def stop(self):
+        self.running = False
+
+    def info(self) -> dict:
+        return {
+            "id": self.id,
+            "source": self.source,
+            "direction": self.direction,
+            "running": self.running,
+            "error": self.error,
+            "frames": self.tracker.frame_idx,
+            "detections": self.tracker.detections,
+            "plate_reads": self.tracker.reads,
+            "events": self.events,
+        }
+
+
+class StreamManager:
+    def __init__(self):
+        self.streams = {}
+        self._tasks = set()
+
+    def start(self, source: str, direction: str) -> StreamIngestor:
+        stream = StreamIngestor(source, direction)
+        self.streams[stream.id] = stream
+        stream.running = True
+        task = asyncio.get_running_loop().create_task(stream.run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        # stopped or failed streams are forgotten, the registry only holds running ones
+        task.add_done_callback(lambda _: self.streams.pop(stream.id, None))
+        return stream
+
+    def stop(self, stream_id: str) -> StreamIngestor | None:
+        stream = self.streams.get(stream_id)
+        if stream:
+            stream.stop()
+        return stream
+
+    def stop_all(self):
+        for stream in list(self.streams.values()):
+            stream.stop()
+
+
+stream_manager = StreamManager()
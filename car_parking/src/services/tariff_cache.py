@@ -0,0 +1,96 @@
+import asyncio
+import time
+
+from redis.exceptions import RedisError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from car_parking.src.conf.config import settings
+from car_parking.src.database.redis_client import redis_client
+from car_parking.src.database.models import Tariff
+from car_parking.src.schemas.tariffs import TariffResponse
+from car_parking.src.services.cache_stats import hit_stats
+
+
+# read-through cache of the tariffs table, invalidate is published to every worker through redis,
+# the TTL bounds staleness if a message is lost
+class TariffCache:
+    channel = "tariffs:invalidate"
+
+    def __init__(self, ttl: int = 300, redis_client=None):
+        self.ttl = ttl
+        self.redis_client = redis_client
+        self._by_id = {}
+        self._by_name = {}
+        # bumped on every invalidation, a load that started before it is not stored
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def get_by_id(self, tariff_id: int, db: AsyncSession) -> TariffResponse | None:
+        return await self._get(self._by_id, tariff_id, select(Tariff).filter(Tariff.id == tariff_id), db)
+
+    async def get_by_name(self, tariff_name: str, db: AsyncSession) -> TariffResponse | None:
+        return await self._get(self._by_name, tariff_name, select(Tariff).filter(Tariff.tariff_name == tariff_name), db)
+
+    async def _get(self, entries: dict, key, query, db: AsyncSession) -> TariffResponse | None:
+        entry = entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        generation = self._generation
+        tariff = await db.scalar(query)
+        if tariff is None:
+            return None
+        tariff = TariffResponse.from_orm(tariff)
+        if generation == self._generation:
+            expires_at = time.monotonic() + self.ttl
+            self._by_id[tariff.id] = (expires_at, tariff)
+            self._by_name[tariff.tariff_name] = (expires_at, tariff)
+        return tariff
+
+    def clear(self) -> None:
+        self._generation += 1
+        self._by_id.clear()
+        self._by_name.clear()
+
+    async def invalidate(self) -> None:
+        self.invalidations += 1
+        self.clear()
+        if self.redis_client is not None:
+            try:
+                await self.redis_client.publish(self.channel, "1")
+            except RedisError:
+                pass
+
+    async def listen(self) -> None:
+        # drops the cache on every message, resubscribes after a redis error
+        while True:
+            pubsub = self.redis_client.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                # messages could have been missed while not subscribed
+                self.clear()
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self.clear()
+            except RedisError:
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.close()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._by_id),
+            **hit_stats(self.hits, self.misses),
+            "invalidations": self.invalidations,
+        }
+
+
+tariff_cache = TariffCache(
+    ttl=settings.tariff_cache_ttl,
+    redis_client=redis_client if settings.tariff_cache_redis else None,
+)
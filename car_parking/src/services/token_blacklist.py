@@ -0,0 +1,147 @@
+import asyncio
+import hashlib
+import time
+
+from fastapi import HTTPException, status
+from jose import JWTError, jwt
+from redis.exceptions import RedisError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from car_parking.src.conf.config import settings
+from car_parking.src.database.redis_client import redis_client
+from car_parking.src.repository import logout as repository_logout
+
+
+class BloomFilter:
+    def __init__(self, size: int, hashes: int):
+        self.size = size
+        self.hashes = hashes
+        self.bits = bytearray(size // 8 + 1)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+# revoked access tokens, a redis key per token that expires with it, every worker keeps a bloom
+# filter of them so only filter hits need a redis call, kept in sync through pub/sub
+class TokenBlacklist:
+    prefix = "blacklist:"
+    channel = "blacklist:add"
+
+    def __init__(self, redis_client, bloom_size: int = 1 << 20, bloom_hashes: int = 7,
+                 rebuild_interval: int = 3600):
+        self.redis_client = redis_client
+        self.bloom_size = bloom_size
+        self.bloom_hashes = bloom_hashes
+        self.rebuild_interval = rebuild_interval
+        self.bloom = BloomFilter(bloom_size, bloom_hashes)
+        # until the filter is loaded and subscribed a miss proves nothing
+        self.synced = False
+        self.bloom_negatives = 0
+        self.redis_checks = 0
+        self.revoked_hits = 0
+
+    @staticmethod
+    def token_id(token: str, payload: dict) -> str:
+        # tokens issued before jti was added are identified by their digest
+        return payload.get("jti") or "sha256:" + hashlib.sha256(token.encode()).hexdigest()
+
+    async def revoke(self, token_id: str, expires_at: int) -> None:
+        ttl = max(int(expires_at - time.time()), 1)
+        try:
+            await self.redis_client.set(self.prefix + token_id, 1, ex=ttl)
+            await self.redis_client.publish(self.channel, token_id)
+        except RedisError:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail="Logout is temporarily unavailable, try again later")
+        self.bloom.add(token_id)
+
+    def maybe_revoked(self, token_id: str) -> bool:
+        # filter only, no redis call, an unsynced filter can't rule anything out
+        return not self.synced or token_id in self.bloom
+
+    async def contains(self, token_id: str) -> bool:
+        if self.synced and token_id not in self.bloom:
+            self.bloom_negatives += 1
+            return False
+
+        self.redis_checks += 1
+        try:
+            revoked = bool(await self.redis_client.exists(self.prefix + token_id))
+        except RedisError:
+            # can't prove the token is still valid
+            revoked = True
+        if revoked:
+            self.revoked_hits += 1
+        return revoked
+
+    async def load(self) -> None:
+        bloom = BloomFilter(self.bloom_size, self.bloom_hashes)
+        async for key in self.redis_client.scan_iter(match=self.prefix + "*", count=1000):
+            bloom.add(key.decode()[len(self.prefix):])
+        self.bloom = bloom
+        self.synced = True
+
+    async def listen(self) -> None:
+        while True:
+            pubsub = self.redis_client.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                # subscribed first, so nothing revoked during the load is missed
+                await self.load()
+                rebuild_at = time.monotonic() + self.rebuild_interval
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is not None:
+                        self.bloom.add(message["data"].decode())
+                    if time.monotonic() >= rebuild_at:
+                        await self.load()
+                        rebuild_at = time.monotonic() + self.rebuild_interval
+            except RedisError:
+                self.synced = False
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.close()
+
+    # method to move the tokens of the old blacklisted_tokens table to redis
+    async def import_legacy(self, db: AsyncSession) -> int:
+        imported = 0
+        for token in await repository_logout.get_blacklisted_tokens(db):
+            try:
+                payload = jwt.decode(token.blacklisted_token, settings.secret_key, algorithms=[settings.algorithm])
+            except JWTError:
+                # expired or invalid, nothing to revoke anymore
+                continue
+            await self.revoke(self.token_id(token.blacklisted_token, payload), payload["exp"])
+            imported += 1
+        await repository_logout.delete_blacklisted_tokens(db)
+        return imported
+
+    def stats(self) -> dict:
+        return {
+            "synced": self.synced,
+            "bloom_entries": self.bloom.count,
+            "bloom_negatives": self.bloom_negatives,
+            "redis_checks": self.redis_checks,
+            "revoked_hits": self.revoked_hits,
+        }
+
+
+token_blacklist = TokenBlacklist(
+    redis_client,
+    bloom_size=settings.token_blacklist_bloom_size,
+    bloom_hashes=settings.token_blacklist_bloom_hashes,
+    rebuild_interval=settings.token_blacklist_rebuild_interval,
+)
@@ -0,0 +1,45 @@
+import hashlib
+import time
+from collections import OrderedDict
+
+from car_parking.src.services.cache_stats import hit_stats
+
+
+# claims of already verified access tokens by token digest, a hit skips the signature check,
+# expired and possibly revoked tokens are neither served nor stored
+class VerifiedTokenCache:
+    def __init__(self, max_size: int = 4096, is_revoked=None):
+        self.max_size = max_size
+        self.is_revoked = is_revoked or (lambda token_id: False)
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> tuple[dict, str] | None:
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is not None:
+            payload, token_id = entry
+            if payload["exp"] > time.time() and not self.is_revoked(token_id):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return payload, token_id
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def set(self, token: str, payload: dict, token_id: str) -> None:
+        if self.is_revoked(token_id):
+            return
+        key = self._key(token)
+        self._entries[key] = (payload, token_id)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), **hit_stats(self.hits, self.misses)}
@@ -0,0 +1,60 @@
+from pydantic import ValidationError
+from redis.exceptions import RedisError
+
+from car_parking.src.conf.config import settings
+from car_parking.src.database.redis_client import redis_client
+from car_parking.src.database.models import User
+from car_parking.src.schemas.users import CachedUser
+from car_parking.src.services.cache_stats import hit_stats
+
+
+# authenticated users by email in redis, bump version when CachedUser changes,
+# every change of a cached field must call invalidate
+class UserCache:
+    version = 3
+
+    def __init__(self, redis_client, ttl: int = 900):
+        self.redis_client = redis_client
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, email: str) -> str:
+        return f"user:v{self.version}:{email}"
+
+    async def get(self, email: str) -> CachedUser | None:
+        try:
+            cached = await self.redis_client.get(self.key(email))
+        except RedisError:
+            cached = None
+        if cached is not None:
+            try:
+                user = CachedUser.parse_raw(cached)
+            except ValidationError:
+                user = None
+            if user is not None:
+                self.hits += 1
+                return user
+        self.misses += 1
+        return None
+
+    async def set(self, user: User) -> CachedUser:
+        cached = CachedUser.from_orm(user)
+        try:
+            # value and expiry in one command
+            await self.redis_client.set(self.key(cached.email), cached.json(), ex=self.ttl)
+        except RedisError:
+            pass
+        return cached
+
+    async def invalidate(self, email: str) -> None:
+        try:
+            await self.redis_client.delete(self.key(email))
+        except RedisError:
+            pass
+
+    def stats(self) -> dict:
+        return hit_stats(self.hits, self.misses)
+
+
+user_cache = UserCache(redis_client, ttl=settings.user_cache_ttl)
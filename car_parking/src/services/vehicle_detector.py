@@ -2,29 +2,46 @@ import cv2
 import numpy as np
 from pathlib import Path
 
+from car_parking.src.conf.config import settings
+
 
 path = str(Path(__file__).parent.parent) + "/models"
 
 
 class VehicleDetector:
 
-    def __init__(self):
+    def __init__(self,
+                 input_size: int = settings.detector_input_size,
+                 refine_size: int = settings.detector_refine_size,
+                 conf_threshold: float = settings.detector_conf_threshold,
+                 nms_threshold: float = settings.detector_nms_threshold):
         # Load Network
         net = cv2.dnn.readNet(path + "/yolov4.weights", path + "/yolov4.cfg")
+        # frames are BGR, YOLOv4 was trained on RGB so channels are swapped on input
+        # cheap low resolution pass over the whole frame
         self.model = cv2.dnn_DetectionModel(net)
-        self.model.setInputParams(size=(832, 832), scale=1 / 255)
+        self.model.setInputParams(size=(input_size, input_size), scale=1 / 255, swapRB=True)
+
+        # optional high resolution pass only inside the biggest vehicle, shares the weights,
+        # refine_size caps its input, smaller vehicles are not upscaled past their own size
+        self.refine_model = None
+        self.refine_size = int(refine_size)
+        if self.refine_size:
+            self.refine_model = cv2.dnn_DetectionModel(net)
+            self.refine_model.setInputParams(size=(self.refine_size, self.refine_size), scale=1 / 255, swapRB=True)
 
+        self.conf_threshold = conf_threshold
+        self.nms_threshold = nms_threshold
 
         # Allow classes containing Vehicles only
         self.classes_allowed = [2, 3, 5, 6, 7]
 
-
-    def detect_vehicles(self, img):
+    def _detect(self, model, img):
         # Detect Objects
         vehicles_boxes = []
-        class_ids, scores, boxes = self.model.detect(img, nmsThreshold=0.4)
+        class_ids, scores, boxes = model.detect(img, nmsThreshold=self.nms_threshold)
         for class_id, score, box in zip(class_ids, scores, boxes):
-            if score < 0.5:
+            if score < self.conf_threshold:
                 # Skip detection with low confidence
                 continue
 
@@ -33,3 +50,22 @@ class VehicleDetector:
 
         return vehicles_boxes
 
+    def detect_vehicles(self, img):
+        vehicles_boxes = self._detect(self.model, img)
+        if self.refine_model is None or len(vehicles_boxes) == 0:
+            return vehicles_boxes
+
+        # re-detect inside the biggest vehicle with some margin around it
+        x, y, w, h = max(vehicles_boxes, key=lambda box: box[2] * box[3])
+        pad_w, pad_h = int(w * 0.1), int(h * 0.1)
+        x0, y0 = max(x - pad_w, 0), max(y - pad_h, 0)
+        x1, y1 = min(x + w + pad_w, img.shape[1]), min(y + h + pad_h, img.shape[0])
+
+        # YOLO input sides are multiples of 32
+        side = min(self.refine_size, -(-max(x1 - x0, y1 - y0) // 32) * 32)
+        self.refine_model.setInputSize(side, side)
+        refined_boxes = self._detect(self.refine_model, img[y0:y1, x0:x1])
+        if len(refined_boxes) == 0:
+            return vehicles_boxes
+
+        return [np.array([bx + x0, by + y0, bw, bh]) for bx, by, bw, bh in refined_boxes]
@@ -1,13 +1,27 @@
 import os
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
 
+import asyncio
+
 import uvicorn
 from fastapi import FastAPI, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-from car_parking.src.routes import auth, users, parking, admin
-from car_parking.src.database.db import get_db
+from car_parking.src.routes import auth, users, parking, admin, metrics
+from car_parking.src.database.db import get_db, AsyncSessionLocal, async_engine
+from car_parking.src.database.redis_client import redis_client
 from car_parking.src.repository import tariff as repository_tariff, parking as repository_parking
+from car_parking.src.repository import occupancy as repository_occupancy
+from car_parking.src.conf.config import settings
+from car_parking.src.services import inference as service_inference
+from car_parking.src.services.classifier import check_backend
+from car_parking.src.services.stream_ingest import stream_manager
+from car_parking.src.services.tariff_cache import tariff_cache
+from car_parking.src.services.token_blacklist import token_blacklist
+from car_parking.src.services.auth import password_executor
+from car_parking.src.services.image_decoder import decode_executor
+from car_parking.src.services.mail_dispatcher import mail_dispatcher
+from car_parking.src.services.outbox import outbox_worker
 
 app = FastAPI(debug=True)
 
@@ -16,7 +30,38 @@ app.include_router(auth.router, prefix='/api')
 app.include_router(users.router, prefix='/api')
 app.include_router(parking.router, prefix='/api')
 app.include_router(admin.router, prefix='/api')
+app.include_router(metrics.router, prefix='/api')
+
+
+@app.on_event("startup")
+async def startup():
+    check_backend()
+    if settings.inference_warm_up:
+        await service_inference.warm_up()
+    if tariff_cache.redis_client is not None:
+        app.state.tariff_cache_listener = asyncio.create_task(tariff_cache.listen())
+    # loads the revoked token filter and keeps it in sync with the other workers
+    app.state.token_blacklist_listener = asyncio.create_task(token_blacklist.listen())
+    mail_dispatcher.start()
+    # delivers the notifications written by the gates
+    app.state.outbox_worker = asyncio.create_task(outbox_worker.run())
+
 
+@app.on_event("shutdown")
+async def shutdown():
+    stream_manager.stop_all()
+    # undelivered rows stay in the outbox for the next start
+    app.state.outbox_worker.cancel()
+    await mail_dispatcher.stop()
+    if hasattr(app.state, "tariff_cache_listener"):
+        app.state.tariff_cache_listener.cancel()
+    app.state.token_blacklist_listener.cancel()
+    service_inference.inference_executor.shutdown()
+    service_inference.classifier_executor.shutdown()
+    password_executor.shutdown()
+    decode_executor.shutdown()
+    await async_engine.dispose()
+    await redis_client.close()
 
 
 @app.get("/")
@@ -42,13 +87,15 @@ def healthchecker(db: Session = Depends(get_db)):
 
 
 async def main():
-    db = next(get_db())
-    await repository_tariff.seed_tariff_table(db)
-    await repository_parking.seed_parking_count(db)
-    db.close()
+    async with AsyncSessionLocal() as db:
+        await repository_tariff.seed_tariff_table(db)
+        await repository_parking.seed_parking_count(db)
+        await repository_occupancy.reconcile_occupancy(db)
+        await token_blacklist.import_legacy(db)
+    # asyncpg connections are bound to this loop, the server starts its own
+    await async_engine.dispose()
     uvicorn.run('main:app', host='0.0.0.0', port=80, reload=True)
 
 if __name__ == '__main__':
-    import asyncio
     asyncio.run(main())
 
@@ -0,0 +1,50 @@
+import os
+
+# database tests run against this postgres database (postgresql+asyncpg://...) and are
+# skipped without it, every test drops and recreates all tables, never point it at real data
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+# redis tests run against this redis (redis://localhost:6379/15) and are skipped without it,
+# the database is flushed by the tests
+TEST_REDIS_URL = os.environ.get("TEST_REDIS_URL")
+
+# settings are read from the environment at import, the app modules need a database url
+# even when the tests replace their sessions
+os.environ.setdefault("SQLALCHEMY_DATABASE_URL", (TEST_DATABASE_URL or "postgresql+asyncpg://postgres@localhost/car_parking_test").replace("+asyncpg", "+psycopg2"))
+os.environ.setdefault("SECRET_KEY", "test-secret-key-of-at-least-32-bytes")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("MAIL_FROM", "parking@example.com")
+
+import pytest  # noqa: E402
+import pytest_asyncio  # noqa: E402
+import redis.asyncio as redis  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine  # noqa: E402
+
+from car_parking.src.database.models import Base  # noqa: E402
+
+
+@pytest_asyncio.fixture
+async def db_engine():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    engine = create_async_engine(TEST_DATABASE_URL, pool_size=20, max_overflow=0)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+def db_sessionmaker(db_engine):
+    return async_sessionmaker(db_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+@pytest_asyncio.fixture
+async def redis_client():
+    if not TEST_REDIS_URL:
+        pytest.skip("TEST_REDIS_URL is not set")
+    client = redis.from_url(TEST_REDIS_URL)
+    await client.flushdb()
+    yield client
+    await client.flushdb()
+    await client.close()
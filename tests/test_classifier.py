@@ -0,0 +1,137 @@
+import importlib.util
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+from car_parking.src.conf.config import settings
+from car_parking.src.services.classifier import BACKENDS, RUNTIMES, check_backend, load_classifier, model_path
+from car_parking.src.services.plate_reader import CLASSES, PlatesReader
+
+
+ROOT = Path(__file__).parent.parent
+
+BENCHMARK = """
+import json, resource, sys, time
+import numpy as np
+from car_parking.src.conf.config import settings
+from car_parking.src.services.classifier import BACKENDS
+backend, path, chars, rounds = sys.argv[1], sys.argv[2], int(sys.argv[3]), int(sys.argv[4])
+model = BACKENDS[backend](path)
+batch = np.random.default_rng(0).random((chars, 44, 24, 1))
+model.predict(batch)
+started = time.perf_counter()
+for _ in range(rounds):
+    model.predict(batch)
+elapsed = time.perf_counter() - started
+print(json.dumps({
+    "char_us": elapsed / (rounds * chars) * 1e6,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}))
+"""
+
+
+def available(backend: str) -> bool:
+    return importlib.util.find_spec(RUNTIMES[backend]) is not None and Path(model_path(backend)).exists()
+
+
+@pytest.fixture(scope="module")
+def chars() -> np.ndarray:
+    # every class drawn and preprocessed like the crops of PlatesReader.get_char_images
+    reader = PlatesReader()
+    crops = []
+    for label in CLASSES.values():
+        img = np.full((50, 30), 255, dtype=np.uint8)
+        cv2.putText(img, str(label), (3, 40), cv2.FONT_HERSHEY_SIMPLEX, 1.3, 0, 3)
+        img = cv2.resize(img, (15, 25))
+        crops.append(reader.resize_with_pad(img, (24, 44), (255, 255, 255)))
+    return np.array(crops).reshape(-1, 44, 24, 1) / 255.
+
+
+@pytest.fixture(scope="module")
+def small_onnx_model(tmp_path_factory) -> str:
+    # stand-in with the exported model's layout (NHWC input, conv, dense, softmax over
+    # the 36 classes) for checking the two ONNX backends against each other
+    onnx = pytest.importorskip("onnx")
+    from onnx import TensorProto, helper, numpy_helper
+
+    rng = np.random.default_rng(0)
+    weights = [
+        numpy_helper.from_array(rng.normal(size=(8, 1, 3, 3)).astype(np.float32), "conv_w"),
+        numpy_helper.from_array(rng.normal(size=8).astype(np.float32), "conv_b"),
+        numpy_helper.from_array(rng.normal(size=(8 * 44 * 24, len(CLASSES))).astype(np.float32) * 0.01, "dense_w"),
+        numpy_helper.from_array(rng.normal(size=len(CLASSES)).astype(np.float32), "dense_b"),
+    ]
+    nodes = [
+        helper.make_node("Transpose", ["input"], ["nchw"], perm=[0, 3, 1, 2]),
+        helper.make_node("Conv", ["nchw", "conv_w", "conv_b"], ["conv"], kernel_shape=[3, 3], pads=[1, 1, 1, 1]),
+        helper.make_node("Relu", ["conv"], ["relu"]),
+        helper.make_node("Flatten", ["relu"], ["flat"], axis=1),
+        helper.make_node("Gemm", ["flat", "dense_w", "dense_b"], ["logits"]),
+        helper.make_node("Softmax", ["logits"], ["output"], axis=1),
+    ]
+    graph = helper.make_graph(
+        nodes, "text_classifier",
+        [helper.make_tensor_value_info("input", TensorProto.FLOAT, [None, 44, 24, 1])],
+        [helper.make_tensor_value_info("output", TensorProto.FLOAT, [None, len(CLASSES)])],
+        initializer=weights,
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    path = tmp_path_factory.mktemp("models") / "text_classifier.onnx"
+    onnx.save(model, str(path))
+    return str(path)
+
+
+def test_check_backend(monkeypatch, small_onnx_model):
+    monkeypatch.setitem(RUNTIMES, "onnxruntime", "onnxruntime_is_not_installed")
+    with pytest.raises(RuntimeError, match="not installed"):
+        check_backend("onnxruntime")
+    with pytest.raises(ValueError):
+        check_backend("tflite")
+
+    monkeypatch.setattr(settings, "classifier_onnx_path", small_onnx_model)
+    check_backend("opencv")
+    monkeypatch.setattr(settings, "classifier_onnx_path", small_onnx_model + ".missing")
+    with pytest.raises(RuntimeError, match="missing"):
+        check_backend("opencv")
+
+
+@pytest.mark.parametrize("backend", ["onnxruntime", "opencv"])
+def test_backend_matches_keras(backend, chars):
+    if not available("keras") or not available(backend):
+        pytest.skip(f"keras and {backend} with their exported models are needed")
+    expected = load_classifier("keras").predict(chars).argmax(axis=1)
+    predicted = load_classifier(backend).predict(chars).argmax(axis=1)
+    assert predicted.tolist() == expected.tolist()
+
+
+def test_onnx_backends_agree(chars, small_onnx_model):
+    pytest.importorskip("onnxruntime")
+    expected = BACKENDS["onnxruntime"](small_onnx_model).predict(chars)
+    predicted = BACKENDS["opencv"](small_onnx_model).predict(chars)
+    assert predicted.shape == (len(CLASSES), len(CLASSES))
+    assert predicted.argmax(axis=1).tolist() == expected.argmax(axis=1).tolist()
+    np.testing.assert_allclose(predicted, expected, rtol=1e-3, atol=1e-5)
+
+
+@pytest.mark.parametrize("backend", list(RUNTIMES))
+def test_benchmark(backend, small_onnx_model):
+    # per character latency and peak RSS, every backend in a fresh process so the RSS
+    # is what one inference worker pays for it
+    path = model_path(backend)
+    if not Path(path).exists() and backend != "keras":
+        path = small_onnx_model
+    if importlib.util.find_spec(RUNTIMES[backend]) is None or not Path(path).exists():
+        pytest.skip(f"{backend} or its model is not installed")
+
+    output = subprocess.run(
+        [sys.executable, "-c", BENCHMARK, backend, path, "64", "20"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    print(f"{backend} ({Path(path).name}): {result['char_us']:.1f}us per character, {result['rss_mb']:.0f}MB RSS")
+    assert result["char_us"] > 0
@@ -0,0 +1,122 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+
+from car_parking.src.database.models import Car, Notification, Parking, Parking_count, Tariff, User
+from car_parking.src.services import gate as service_gate
+
+
+TOTAL_PLACES = 10
+
+
+@pytest_asyncio.fixture
+async def gate_db(db_sessionmaker):
+    async with db_sessionmaker() as db:
+        db.add(Parking_count(total_quantity=TOTAL_PLACES, ococcupied_quantity=0))
+        db.add(Tariff(id=service_gate.DEFAULT_TARIFF_ID, tariff_name="default", tariff_value=20))
+        await db.commit()
+    return db_sessionmaker
+
+
+async def state(db_sessionmaker) -> tuple[int, int, int]:
+    async with db_sessionmaker() as db:
+        occupied = await db.scalar(select(Parking_count.ococcupied_quantity))
+        cars = await db.scalar(select(func.count(Car.id)))
+        sessions = await db.scalar(select(func.count(Parking.id)))
+    return occupied, cars, sessions
+
+
+@pytest.mark.asyncio
+async def test_unknown_plate(gate_db):
+    async with gate_db() as db:
+        result = await service_gate.enter_gate("aa0001bb", db)
+    assert result.parking.status == "Parking successful, to get details please sign up for our Car Parking service"
+    assert result.parking.info.license_plate == "AA0001BB"
+    assert await state(gate_db) == (1, 1, 1)
+
+    async with gate_db() as db:
+        result = await service_gate.exit_gate("ZZ9999ZZ", db)
+    assert result.parking == "Parking place for car ZZ9999ZZ not found"
+    assert await state(gate_db) == (1, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_banned_car(gate_db):
+    async with gate_db() as db:
+        db.add(Car(license_plate="AA0001BB", banned=True))
+        await db.commit()
+
+    async with gate_db() as db:
+        entered = await service_gate.enter_gate("AA0001BB", db)
+    async with gate_db() as db:
+        left = await service_gate.exit_gate("AA0001BB", db)
+    assert entered.parking == left.parking == service_gate.banned_message("AA0001BB")
+    assert await state(gate_db) == (0, 1, 0)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_entry_of_a_new_plate(gate_db, monkeypatch):
+    # both gates read the plate as unknown before either of them commits
+    load_gate_context = service_gate.load_gate_context
+    loaded, both_loaded = [], asyncio.Event()
+
+    async def load_together(license_plate, db):
+        context = await load_gate_context(license_plate, db)
+        if len(loaded) < 2:
+            loaded.append(context)
+            if len(loaded) == 2:
+                both_loaded.set()
+            await both_loaded.wait()
+        return context
+
+    monkeypatch.setattr(service_gate, "load_gate_context", load_together)
+
+    async def enter():
+        async with gate_db() as db:
+            return await service_gate.enter_gate("AA0001BB", db)
+
+    results = await asyncio.gather(enter(), enter())
+    assert [context.car for context in loaded] == [None, None]
+    assert sorted(result.parking.status for result in results) == [
+        "Parking successful, to get details please sign up for our Car Parking service",
+        "This car already in parking.",
+    ]
+    # the second gate's place and car were rolled back with its session
+    assert await state(gate_db) == (1, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_exit_writes_the_invoice_in_one_commit(gate_db, monkeypatch):
+    enter_time = datetime.now(timezone.utc) - timedelta(hours=2)
+    async with gate_db() as db:
+        db.add(Car(license_plate="AA0001BB"))
+        db.add(User(username="driver", email="driver@example.com", password="hash",
+                    license_plate="AA0001BB", tariff_id=service_gate.DEFAULT_TARIFF_ID))
+        db.add(Parking(license_plate="AA0001BB", enter_time=enter_time))
+        await db.commit()
+
+    commits = []
+    async with gate_db() as db:
+        commit = db.commit
+
+        async def counted_commit():
+            commits.append(True)
+            await commit()
+
+        monkeypatch.setattr(db, "commit", counted_commit)
+        result = await service_gate.exit_gate("AA0001BB", db, host="http://gate/")
+
+    assert result.parking.status == "Parking invoice sent to your email << driver@example.com>>. Please confirm payment"
+    assert len(commits) == 1
+    async with gate_db() as db:
+        parking_place = await db.scalar(select(Parking))
+        notification = await db.scalar(select(Notification))
+    assert parking_place.duration == pytest.approx(2, abs=0.01)
+    assert parking_place.amount_paid == pytest.approx(40, abs=0.5)
+    assert parking_place.departure_time > enter_time
+    assert notification.kind == "parking_exit"
+    assert notification.payload["parking_place_id"] == parking_place.id
+    assert notification.payload["amount_paid"] == float(parking_place.amount_paid)
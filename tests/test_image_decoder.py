@@ -0,0 +1,90 @@
+import asyncio
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+import pytest
+from fastapi import HTTPException
+from PIL import Image
+
+from car_parking.src.conf.config import settings
+from car_parking.src.services.image_decoder import decode_image, decode_upload
+
+
+# a 12MP gate camera frame decoded at full resolution
+FULL_DECODE_BYTES = 4000 * 3000 * 3
+
+
+def encode(width: int, height: int, ext: str) -> bytes:
+    img = np.zeros((height, width, 3), dtype=np.uint8)
+    img[:, : width // 2] = (255, 0, 0)
+    ok, content = cv2.imencode(ext, img)
+    assert ok
+    return content.tobytes()
+
+
+def test_small_image_is_decoded_as_is():
+    img = decode_image(encode(640, 480, ".png"))
+    assert img.shape == (480, 640, 3)
+    assert tuple(img[0, 0]) == (255, 0, 0)
+
+
+def test_large_jpeg_is_reduced_while_decoding():
+    assert decode_image(encode(6000, 5000, ".jpg")).shape == (2500, 3000, 3)
+
+
+def test_long_png_is_resized_after_decoding():
+    # within the pixel limit, only the side limit applies
+    assert decode_image(encode(5000, 1000, ".png")).shape == (500, 2500, 3)
+
+
+def test_png_over_the_pixel_limit_is_rejected_before_decoding():
+    with pytest.raises(HTTPException) as error:
+        decode_image(encode(6000, 5000, ".png"))
+    assert error.value.status_code == 413
+
+
+def test_decompression_bomb_is_rejected(monkeypatch):
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 1000)
+    with pytest.raises(HTTPException) as error:
+        decode_image(encode(640, 480, ".png"))
+    assert error.value.status_code == 413
+
+
+def test_invalid_image():
+    with pytest.raises(HTTPException) as error:
+        decode_image(b"not an image")
+    assert error.value.status_code == 400
+
+
+def test_decode_upload_runs_in_the_executor():
+    img = asyncio.run(decode_upload(encode(64, 48, ".jpg")))
+    assert img.shape == (48, 64, 3)
+
+
+def measure(decode, content: bytes):
+    tracemalloc.start()
+    started = time.perf_counter()
+    img = decode(content)
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return img, peak, elapsed
+
+
+def test_12mp_jpeg_is_never_decoded_at_full_size(monkeypatch):
+    monkeypatch.setattr(settings, "image_max_side", 2048)
+    ramp = np.linspace(0, 255, 4000, dtype=np.uint8)
+    noise = np.random.default_rng(0).integers(0, 32, (3000, 4000, 3), dtype=np.uint8)
+    content = cv2.imencode(".jpg", noise + ramp[None, :, None] // 2)[1].tobytes()
+
+    full, full_peak, full_time = measure(lambda c: cv2.imdecode(np.frombuffer(c, dtype=np.uint8), cv2.IMREAD_COLOR), content)
+    img, peak, elapsed = measure(decode_image, content)
+    print(f"12MP jpeg: full decode {full_time * 1000:.0f}ms {full_peak / 2**20:.1f}MB peak, "
+          f"decode_image {elapsed * 1000:.0f}ms {peak / 2**20:.1f}MB peak to {img.shape[1]}x{img.shape[0]}")
+
+    # tracemalloc sees the arrays cv2 allocates, the full decode is the reference
+    assert full.shape == (3000, 4000, 3) and full_peak >= FULL_DECODE_BYTES
+    assert img.shape == (1500, 2000, 3)
+    assert peak < FULL_DECODE_BYTES
@@ -0,0 +1,90 @@
+import time
+
+import pytest
+from jose import JWTError
+
+from car_parking.src.services import token_cache as token_cache_module
+from car_parking.src.services.jwt_codec import CODECS, load_codec
+from car_parking.src.services.token_cache import VerifiedTokenCache
+
+
+KEY = "test-secret-key-of-at-least-32-bytes"
+ROUNDS = 5000
+
+
+class StubBlacklist:
+    def __init__(self):
+        self.revoked = set()
+
+    def maybe_revoked(self, token_id: str) -> bool:
+        return token_id in self.revoked
+
+
+def claims(expires_in: float = 600) -> dict:
+    return {"sub": "driver@example.com", "scope": "access_token", "jti": "jti", "exp": int(time.time() + expires_in)}
+
+
+def codecs() -> list:
+    # PyJWT is the optional pyjwt extra
+    available = ["jose"]
+    try:
+        load_codec("pyjwt")
+        available.append("pyjwt")
+    except ImportError:
+        pass
+    return available
+
+
+def test_cache_never_returns_a_revoked_token():
+    blacklist = StubBlacklist()
+    cache = VerifiedTokenCache(16, is_revoked=blacklist.maybe_revoked)
+    cache.set("token", claims(), "jti")
+    assert cache.get("token") == (claims(), "jti")
+
+    blacklist.revoked.add("jti")
+    assert cache.get("token") is None
+    # dropped, not only hidden, and never stored again while revoked
+    assert cache.stats()["size"] == 0
+    cache.set("token", claims(), "jti")
+    assert cache.get("token") is None
+
+
+def test_cache_never_returns_an_expired_token(monkeypatch):
+    cache = VerifiedTokenCache(16, is_revoked=StubBlacklist().maybe_revoked)
+    cache.set("token", claims(expires_in=60), "jti")
+    assert cache.get("token") is not None
+
+    now = time.time()
+    monkeypatch.setattr(token_cache_module.time, "time", lambda: now + 61)
+    assert cache.get("token") is None
+    assert cache.stats() == {"size": 0, "hits": 1, "misses": 1, "hit_ratio": 0.5}
+
+
+@pytest.mark.parametrize("encoder", list(CODECS))
+@pytest.mark.parametrize("decoder", list(CODECS))
+def test_codecs_read_each_others_tokens(encoder, decoder):
+    if encoder not in codecs() or decoder not in codecs():
+        pytest.skip("PyJWT is not installed")
+    token = load_codec(encoder).encode(claims(), KEY, "HS256")
+    assert load_codec(decoder).decode(token, KEY, "HS256") == claims()
+
+    with pytest.raises(JWTError):
+        load_codec(decoder).decode(token, "another-secret-key-of-32-bytes-too", "HS256")
+    with pytest.raises(JWTError):
+        load_codec(decoder).decode(load_codec(encoder).encode(claims(-60), KEY, "HS256"), KEY, "HS256")
+
+
+def test_benchmark():
+    # per call cost of a token check: the signature check of every codec and a verified token cache hit
+    token = load_codec("jose").encode(claims(), KEY, "HS256")
+    checks = {f"{name} decode": (lambda codec: lambda: codec.decode(token, KEY, "HS256"))(load_codec(name))
+              for name in codecs()}
+    cache = VerifiedTokenCache(16)
+    cache.set(token, claims(), "jti")
+    checks["verified token cache hit"] = lambda: cache.get(token)
+
+    for name, check in checks.items():
+        started = time.perf_counter()
+        for _ in range(ROUNDS):
+            check()
+        print(f"{name}: {(time.perf_counter() - started) / ROUNDS * 1e6:.1f}us per token")
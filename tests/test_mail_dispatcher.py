@@ -0,0 +1,174 @@
+import asyncio
+import socket
+import time
+
+import aiosmtplib
+import pytest
+
+from car_parking.src.conf.config import settings
+from car_parking.src.services.mail_dispatcher import MailDispatcher, MailMessage, is_transient
+
+
+class FakeSMTP:
+    # answers every message with the next planned error of its recipient, sends it once they run out
+    def __init__(self, errors: dict):
+        self.errors = errors
+        self.is_connected = False
+        self.sent = []
+        self.attempts = []
+
+    async def connect(self):
+        self.is_connected = True
+
+    async def send_message(self, email):
+        recipient = email["To"]
+        self.attempts.append(recipient)
+        planned = self.errors.get(recipient)
+        if planned:
+            raise planned.pop(0)
+        self.sent.append(recipient)
+
+    async def quit(self):
+        self.is_connected = False
+
+    def close(self):
+        self.is_connected = False
+
+
+@pytest.fixture(autouse=True)
+def mail_from(monkeypatch):
+    monkeypatch.setattr(settings, "mail_from", "parking@example.com")
+
+
+TEMPLATE_BODY = {"host": "http://localhost/", "username": "user", "token": "token"}
+
+
+def dispatcher_over(smtp: FakeSMTP, max_retries: int = 3) -> MailDispatcher:
+    dispatcher = MailDispatcher(connections=1, max_retries=max_retries)
+    dispatcher._create_connection = lambda: smtp
+    dispatcher.start()
+    return dispatcher
+
+
+async def dispatch(errors: dict, recipients: list, max_retries: int = 3) -> tuple[FakeSMTP, MailDispatcher]:
+    smtp = FakeSMTP(errors)
+    dispatcher = dispatcher_over(smtp, max_retries)
+    for recipient in recipients:
+        await dispatcher.enqueue(recipient, "Confirm your email ", "email_template.html", TEMPLATE_BODY)
+    # retries are scheduled outside of the queue, wait until every email went out or was dropped
+    for _ in range(100):
+        if dispatcher.sent + dispatcher.failed == len(recipients):
+            break
+        await asyncio.sleep(0.1)
+    await dispatcher.stop()
+    return smtp, dispatcher
+
+
+def test_transient_errors():
+    assert is_transient(aiosmtplib.SMTPResponseException(451, "try again later"))
+    assert is_transient(aiosmtplib.SMTPServerDisconnected("gone"))
+    assert is_transient(aiosmtplib.SMTPConnectTimeoutError("timeout"))
+    assert is_transient(ConnectionResetError())
+    assert not is_transient(aiosmtplib.SMTPResponseException(550, "no such user"))
+    assert not is_transient(aiosmtplib.SMTPRecipientsRefused([]))
+    assert not is_transient(aiosmtplib.SMTPNotSupported("no SMTPUTF8"))
+
+
+@pytest.mark.asyncio
+async def test_transient_failure_is_retried_without_holding_the_connection():
+    errors = {"first@example.com": [aiosmtplib.SMTPResponseException(451, "try again later")]}
+    smtp, dispatcher = await dispatch(errors, ["first@example.com", "second@example.com"])
+
+    assert smtp.sent == ["second@example.com", "first@example.com"]
+    # the second email went out while the first one waited for its retry
+    assert smtp.attempts == ["first@example.com", "second@example.com", "first@example.com"]
+    assert dispatcher.retries == 1
+
+
+@pytest.mark.asyncio
+async def test_permanent_failure_is_dropped_at_once():
+    errors = {
+        "unknown@example.com": [aiosmtplib.SMTPResponseException(550, "no such user")],
+        "refused@example.com": [aiosmtplib.SMTPRecipientsRefused([])],
+    }
+    smtp, dispatcher = await dispatch(errors, ["unknown@example.com", "refused@example.com"])
+
+    assert smtp.attempts == ["unknown@example.com", "refused@example.com"]
+    assert dispatcher.retries == 0
+    assert dispatcher.failed == 2
+
+
+@pytest.mark.asyncio
+async def test_retries_are_bounded():
+    errors = {"flaky@example.com": [ConnectionResetError(), ConnectionResetError()]}
+    smtp, dispatcher = await dispatch(errors, ["flaky@example.com"], max_retries=1)
+
+    assert smtp.sent == []
+    assert smtp.attempts == ["flaky@example.com", "flaky@example.com"]
+
+
+@pytest.mark.asyncio
+async def test_send_attempts_once_and_raises():
+    # the outbox owns the retries of the gate notifications
+    smtp = FakeSMTP({"first@example.com": [aiosmtplib.SMTPResponseException(451, "try again later")]})
+    dispatcher = dispatcher_over(smtp)
+    failed = await dispatcher.send("first@example.com", "Parking place info", "email_template.html", TEMPLATE_BODY)
+    sent = await dispatcher.send("second@example.com", "Parking place info", "email_template.html", TEMPLATE_BODY)
+
+    with pytest.raises(aiosmtplib.SMTPResponseException):
+        await asyncio.wait_for(failed, 5)
+    assert await asyncio.wait_for(sent, 5) is None
+    await dispatcher.stop()
+    assert smtp.attempts == ["first@example.com", "second@example.com"]
+    assert dispatcher.retries == 0
+
+
+@pytest.mark.asyncio
+async def test_throughput_against_an_smtp_server():
+    # a real smtp exchange on localhost without tls, the dispatcher's persistent connections
+    # against a new connection per email like fastapi-mail did, a tls handshake per connection
+    # widens the gap against a real server
+    controller_module = pytest.importorskip("aiosmtpd.controller")
+    received = []
+
+    class Handler:
+        async def handle_DATA(self, server, session, envelope):
+            received.append(envelope.rcpt_tos[0])
+            return "250 OK"
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    controller = controller_module.Controller(Handler(), hostname="127.0.0.1", port=port)
+    controller.start()
+    emails = 200
+    try:
+        def connection():
+            return aiosmtplib.SMTP(hostname="127.0.0.1", port=port)
+
+        dispatcher = MailDispatcher(connections=2)
+        dispatcher._create_connection = connection
+
+        started = time.perf_counter()
+        for idx in range(emails):
+            smtp = connection()
+            await smtp.connect()
+            await smtp.send_message(dispatcher._build(MailMessage(
+                f"user{idx}@example.com", "Parking place info", "email_template.html", TEMPLATE_BODY)))
+            await smtp.quit()
+        per_email = time.perf_counter() - started
+
+        dispatcher.start()
+        started = time.perf_counter()
+        results = [await dispatcher.send(f"user{idx}@example.com", "Parking place info", "email_template.html",
+                                         TEMPLATE_BODY) for idx in range(emails)]
+        await asyncio.wait_for(asyncio.gather(*results), 30)
+        dispatched = time.perf_counter() - started
+        await dispatcher.stop()
+    finally:
+        controller.stop()
+
+    print(f"{emails} emails: connection per email {emails / per_email:.0f}/s, "
+          f"dispatcher with 2 connections {emails / dispatched:.0f}/s, avg batch {dispatcher.stats()['avg_batch']}")
+    assert len(received) == 2 * emails
+    assert dispatcher.sent == emails
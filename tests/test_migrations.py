@@ -0,0 +1,67 @@
+import importlib.util
+from datetime import timedelta
+from pathlib import Path
+
+import pytest
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import insert, select, text
+
+from car_parking.src.database.models import Car, Parking
+from car_parking.src.repository import parking as repository_parking
+from car_parking.src.repository import users as repository_users
+
+
+VERSIONS = Path(__file__).parent.parent / "car_parking" / "migrations" / "versions"
+START = repository_parking.parse_kiev_datetime("2024.03.01 08:00")
+
+
+def load_migration(name: str):
+    spec = importlib.util.spec_from_file_location(name, VERSIONS / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_upgrade(migration):
+    def upgrade(conn):
+        with Operations.context(MigrationContext.configure(conn)):
+            migration.upgrade()
+    return upgrade
+
+
+@pytest.mark.asyncio
+async def test_open_session_indexes_close_duplicates(db_engine, db_sessionmaker):
+    migration = load_migration("8d3f6a1c2e57_parking_open_session_indexes")
+    # the tables as they were before the migration, racing gates opened the same car three times
+    async with db_engine.begin() as conn:
+        await conn.execute(text("DROP INDEX ux_parking_open_license_plate"))
+        await conn.execute(text("DROP INDEX ix_parking_license_plate_enter"))
+        await conn.execute(insert(Car), [{"license_plate": "AA0001BB"}])
+        await conn.execute(insert(Parking).values(
+            license_plate="AA0001BB", enter_time=START - timedelta(days=1),
+            departure_time=START - timedelta(days=1) + timedelta(hours=2), status=True, duration=2, amount_paid=40,
+        ))
+        await conn.execute(insert(Parking), [
+            {"license_plate": "AA0001BB", "enter_time": START + timedelta(minutes=minutes), "status": False}
+            for minutes in (0, 1, 2)
+        ])
+
+    async with db_engine.begin() as conn:
+        await conn.run_sync(run_upgrade(migration))
+
+    async with db_sessionmaker() as db:
+        open_sessions = (await db.scalars(select(Parking).where(Parking.status == False))).all()
+        assert [parking.enter_time for parking in open_sessions] == [START + timedelta(minutes=2)]
+
+        # the closed duplicates are empty sessions in the history
+        history = await repository_users.get_parking_info("AA0001BB", db)
+        assert history.total_payment_amount == 40
+        assert history.total_parking_time == 2
+        assert sorted(float(parking.duration) for parking in history.parking_info) == [0, 0, 2]
+
+        # and never parked, only the newest session occupies a place
+        timeline = await repository_parking.occupancy_timeline("2024.03.01 07:00", "2024.03.01 09:00", 30, db)
+        assert [bucket.occupied for bucket in timeline] == [0, 0, 0, 1, 1]
+        assert await repository_parking.free_parking_places("2024.03.01 08:01", db) == 0
+        assert await repository_parking.free_parking_places("2024.03.01 08:02", db) == 1
@@ -0,0 +1,121 @@
+import asyncio
+import time
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select, update
+
+from car_parking.src.database.models import Car, Parking, Parking_count
+from car_parking.src.repository import occupancy as repository_occupancy
+
+
+TOTAL_PLACES = 50
+
+
+async def timed(latencies: list, request):
+    started = time.perf_counter()
+    result = await request
+    latencies.append(time.perf_counter() - started)
+    return result
+
+
+def report(name: str, latencies: list, elapsed: float) -> None:
+    latencies = sorted(latencies)
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{name}: {len(latencies)} gate requests in {elapsed:.2f}s, {len(latencies) / elapsed:.0f} requests/s, "
+          f"p50 {p50 * 1000:.1f}ms, p99 {p99 * 1000:.1f}ms")
+
+
+async def enter(db_sessionmaker, license_plate: str) -> bool:
+    # what a gate does: reserve a place and open the session in one transaction
+    async with db_sessionmaker() as db:
+        if not await repository_occupancy.reserve_place(db):
+            await db.rollback()
+            return False
+        db.add(Car(license_plate=license_plate))
+        db.add(Parking(license_plate=license_plate))
+        await db.commit()
+        return True
+
+
+async def leave(db_sessionmaker, license_plate: str) -> None:
+    async with db_sessionmaker() as db:
+        await db.execute(
+            update(Parking)
+            .where(Parking.license_plate == license_plate, Parking.status == False)
+            .values(status=True)
+        )
+        await repository_occupancy.release_place(db)
+        await db.commit()
+
+
+async def counts(db_sessionmaker) -> tuple[int, int]:
+    async with db_sessionmaker() as db:
+        occupied = await db.scalar(select(Parking_count.ococcupied_quantity))
+        open_sessions = await db.scalar(select(func.count(Parking.id)).where(Parking.status == False))
+    return occupied, open_sessions
+
+
+@pytest_asyncio.fixture
+async def parking(db_sessionmaker):
+    async with db_sessionmaker() as db:
+        db.add(Parking_count(total_quantity=TOTAL_PLACES, ococcupied_quantity=0))
+        await db.commit()
+    return db_sessionmaker
+
+
+@pytest.mark.asyncio
+async def test_concurrent_gates_never_overbook(parking):
+    gates, latencies = 500, []
+    started = time.perf_counter()
+    entered = await asyncio.gather(*(timed(latencies, enter(parking, f"AA{i:04d}BB")) for i in range(gates)))
+    report("concurrent entries", latencies, time.perf_counter() - started)
+
+    assert sum(entered) == TOTAL_PLACES
+    assert await counts(parking) == (TOTAL_PLACES, TOTAL_PLACES)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_entries_and_exits_keep_the_counter_exact(parking):
+    parked = [f"AA{i:04d}BB" for i in range(TOTAL_PLACES)]
+    await asyncio.gather(*(enter(parking, plate) for plate in parked))
+
+    # half of the cars leave while 200 more try to get in
+    latencies = []
+    leaving = [timed(latencies, leave(parking, plate)) for plate in parked[: TOTAL_PLACES // 2]]
+    arriving = [timed(latencies, enter(parking, f"BB{i:04d}CC")) for i in range(200)]
+    started = time.perf_counter()
+    results = await asyncio.gather(*leaving, *arriving)
+    report("concurrent entries and exits", latencies, time.perf_counter() - started)
+
+    occupied, open_sessions = await counts(parking)
+    assert occupied == open_sessions
+    assert TOTAL_PLACES // 2 <= occupied <= TOTAL_PLACES
+    assert sum(result is True for result in results) == occupied - TOTAL_PLACES // 2
+
+
+@pytest.mark.asyncio
+async def test_steady_gate_load(parking):
+    # every gate lets its cars in and out one after another, all gates hit the counter row at once
+    gates, cars, latencies = 20, 25, []
+
+    async def gate(idx: int):
+        for car in range(cars):
+            plate = f"G{idx:02d}{car:04d}"
+            assert await timed(latencies, enter(parking, plate))
+            await timed(latencies, leave(parking, plate))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(gate(idx) for idx in range(gates)))
+    report("steady load", latencies, time.perf_counter() - started)
+    assert await counts(parking) == (0, 0)
+
+
+@pytest.mark.asyncio
+async def test_reconcile_fixes_drift(parking):
+    await asyncio.gather(*(enter(parking, f"AA{i:04d}BB") for i in range(10)))
+    async with parking() as db:
+        await db.execute(update(Parking_count).values(ococcupied_quantity=7))
+        await db.commit()
+        assert await repository_occupancy.reconcile_occupancy(db) == 10
@@ -0,0 +1,106 @@
+import os
+import random
+import time
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import insert, text
+
+from car_parking.src.database.models import Car, Parking
+from car_parking.src.repository import parking as repository_parking
+
+
+# rows of synthetic history for the benchmark, raise it to a few million for a real measurement
+BENCHMARK_ROWS = int(os.environ.get("OCCUPANCY_BENCHMARK_ROWS", 100_000))
+
+# the generate_series join the timeline used before, every bucket scans the earlier sessions
+JOIN_TIMELINE = text(
+    """
+    SELECT buckets.bucket, count(p.id) AS occupied
+    FROM generate_series(
+        CAST(:start AS timestamptz), CAST(:end AS timestamptz), CAST(:step AS interval)
+    ) AS buckets(bucket)
+    LEFT JOIN parking_places_table p
+        ON p.enter_time <= buckets.bucket
+        AND (p.departure_time IS NULL OR p.departure_time > buckets.bucket)
+    GROUP BY buckets.bucket
+    ORDER BY buckets.bucket
+    """
+)
+
+START = repository_parking.parse_kiev_datetime("2024.03.01 00:00")
+
+
+def occupied_at(sessions: list, moment) -> int:
+    return sum(1 for enter, departure in sessions
+               if enter <= moment and (departure is None or departure > moment))
+
+
+async def seed(db, sessions: list) -> None:
+    plates = [f"AA{i:06d}BB" for i in range(len(sessions))]
+    await db.execute(insert(Car), [{"license_plate": plate} for plate in plates])
+    await db.execute(insert(Parking), [
+        {"license_plate": plate, "enter_time": enter, "departure_time": departure, "status": departure is not None}
+        for plate, (enter, departure) in zip(plates, sessions)
+    ])
+    await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_timeline_matches_the_sessions(db_sessionmaker):
+    rng = random.Random(0)
+    sessions = []
+    for _ in range(500):
+        # whole minutes so plenty of events land exactly on a bucket edge
+        enter = START + timedelta(minutes=rng.randrange(-600, 1800))
+        departure = None if rng.random() < 0.1 else enter + timedelta(minutes=rng.randrange(0, 600))
+        sessions.append((enter, departure))
+
+    async with db_sessionmaker() as db:
+        await seed(db, sessions)
+        timeline = await repository_parking.occupancy_timeline("2024.03.01 00:00", "2024.03.01 23:50", 30, db)
+        joined = (await db.execute(JOIN_TIMELINE, {
+            "start": START, "end": START + timedelta(minutes=1430), "step": timedelta(minutes=30),
+        })).all()
+
+    assert [bucket.time for bucket in timeline] == [START + timedelta(minutes=30 * n) for n in range(48)]
+    assert [bucket.occupied for bucket in timeline] == [occupied_at(sessions, bucket.time) for bucket in timeline]
+    assert [bucket.occupied for bucket in timeline] == [row.occupied for row in joined]
+
+
+@pytest.mark.asyncio
+async def test_benchmark_against_the_join(db_sessionmaker):
+    async with db_sessionmaker() as db:
+        # a year of history ending in the measured day, one session every ~30 seconds
+        await db.execute(text(
+            """
+            INSERT INTO cars_table (license_plate, banned)
+            SELECT 'P' || n, false FROM generate_series(1, :rows) AS n
+            """
+        ), {"rows": BENCHMARK_ROWS})
+        await db.execute(text(
+            """
+            INSERT INTO parking_places_table (license_plate, enter_time, departure_time, status)
+            SELECT 'P' || n, enter_time, enter_time + (random() * interval '8 hours'), true
+            FROM (
+                SELECT n, CAST(:start AS timestamptz) - random() * interval '365 days' AS enter_time
+                FROM generate_series(1, :rows) AS n
+            ) AS sessions
+            """
+        ), {"rows": BENCHMARK_ROWS, "start": START + timedelta(days=1)})
+        await db.commit()
+        await db.execute(text("ANALYZE parking_places_table"))
+
+        started = time.perf_counter()
+        timeline = await repository_parking.occupancy_timeline("2024.02.29 00:00", "2024.02.29 23:45", 15, db)
+        sweep_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        joined = (await db.execute(JOIN_TIMELINE, {
+            "start": START - timedelta(days=1), "end": START - timedelta(minutes=15), "step": timedelta(minutes=15),
+        })).all()
+        join_time = time.perf_counter() - started
+
+    print(f"96 buckets over {BENCHMARK_ROWS} sessions: join {join_time * 1000:.0f}ms, sweep {sweep_time * 1000:.0f}ms")
+    assert [bucket.occupied for bucket in timeline] == [row.occupied for row in joined]
+    assert sweep_time < join_time
@@ -0,0 +1,148 @@
+import asyncio
+from datetime import timedelta
+
+import aiosmtplib
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, insert, select, update
+
+from car_parking.src.database.models import Notification
+from car_parking.src.services import outbox as service_outbox
+from car_parking.src.services.outbox import OutboxWorker
+
+
+class FakeMail:
+    # a single send attempt per call like MailDispatcher.send, raises the planned error of the recipient
+    def __init__(self, errors: dict | None = None):
+        self.errors = errors or {}
+        self.sent = []
+
+    async def __call__(self, email: str, **payload) -> asyncio.Future:
+        result = asyncio.get_running_loop().create_future()
+        if email in self.errors:
+            result.set_exception(self.errors[email])
+        else:
+            self.sent.append(email)
+            result.set_result(None)
+        return result
+
+
+@pytest_asyncio.fixture
+async def outbox_db(db_sessionmaker, monkeypatch):
+    monkeypatch.setattr(service_outbox, "AsyncSessionLocal", db_sessionmaker)
+    return db_sessionmaker
+
+
+@pytest.fixture
+def mail(monkeypatch) -> FakeMail:
+    mail = FakeMail()
+    monkeypatch.setitem(service_outbox.HANDLERS, "parking_enter", mail)
+    return mail
+
+
+async def add(db_sessionmaker, emails: list, **values) -> None:
+    async with db_sessionmaker() as db:
+        # a multi row VALUES, the leases may be sql expressions
+        await db.execute(insert(Notification).values([
+            {"kind": "parking_enter", "payload": {"email": email}, **values} for email in emails
+        ]))
+        await db.commit()
+
+
+async def rows(db_sessionmaker) -> dict:
+    # by email: attempts, delivered, claimed_by and the seconds until the lease or retry ends
+    async with db_sessionmaker() as db:
+        result = await db.execute(
+            select(Notification, func.extract("epoch", Notification.locked_until - func.now())).order_by(Notification.id)
+        )
+        return {
+            notification.payload["email"]: (notification.attempts, notification.delivered_at is not None,
+                                            notification.claimed_by, remaining)
+            for notification, remaining in result
+        }
+
+
+def worker(name: str, **options) -> OutboxWorker:
+    worker = OutboxWorker(**{"batch_size": 4, "max_attempts": 3, "lease_seconds": 60, **options})
+    worker.worker_id = name
+    return worker
+
+
+@pytest.mark.asyncio
+async def test_workers_claim_disjoint_batches(outbox_db):
+    await add(outbox_db, [f"user{idx}@example.com" for idx in range(10)])
+    first, second = worker("first"), worker("second")
+
+    claimed = await asyncio.gather(first._claim(), second._claim())
+    ids = [{n.id for n in batch} for batch in claimed]
+    assert len(ids[0]) == len(ids[1]) == 4
+    assert not ids[0] & ids[1]
+
+    leases = await rows(outbox_db)
+    assert sorted(claimed_by for _, _, claimed_by, _ in leases.values() if claimed_by) == ["first"] * 4 + ["second"] * 4
+    assert all(55 < remaining <= 60 for _, _, claimed_by, remaining in leases.values() if claimed_by)
+    # the leased rows stay away from a third worker until the leases expire
+    assert len(await worker("third", batch_size=10)._claim()) == 2
+
+
+@pytest.mark.asyncio
+async def test_expired_lease_is_taken_over(outbox_db, mail):
+    await add(outbox_db, ["dead@example.com"], claimed_by="dead", locked_until=func.now() - timedelta(seconds=1))
+    await add(outbox_db, ["busy@example.com"], claimed_by="busy", locked_until=func.now() + timedelta(seconds=60))
+
+    assert await worker("alive").process_batch() == 1
+    assert mail.sent == ["dead@example.com"]
+    leases = await rows(outbox_db)
+    assert leases["dead@example.com"][:3] == (0, True, None)
+    assert leases["busy@example.com"][:3] == (0, False, "busy")
+
+
+@pytest.mark.asyncio
+async def test_transient_failure_delays_the_retry(outbox_db, mail):
+    mail.errors["later@example.com"] = aiosmtplib.SMTPResponseException(451, "try again later")
+    await add(outbox_db, ["later@example.com", "now@example.com"])
+    outbox = worker("worker")
+
+    assert await outbox.process_batch() == 2
+    attempts, delivered, claimed_by, remaining = (await rows(outbox_db))["later@example.com"]
+    assert (attempts, delivered, claimed_by) == (1, False, None)
+    # backed off by 2 ** attempts seconds instead of the lease
+    assert 0 < remaining <= 2
+    assert await outbox.process_batch() == 0
+    assert (outbox.delivered, outbox.failed, outbox.stats()["backlog"]) == (1, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_retries_stop_at_max_attempts(outbox_db, mail):
+    mail.errors["flaky@example.com"] = aiosmtplib.SMTPServerDisconnected("gone")
+    mail.errors["unknown@example.com"] = aiosmtplib.SMTPResponseException(550, "no such user")
+    await add(outbox_db, ["flaky@example.com"], attempts=2)
+    await add(outbox_db, ["unknown@example.com"])
+    outbox = worker("worker")
+
+    assert await outbox.process_batch() == 2
+    # the last transient attempt and a permanent failure both end at max_attempts
+    assert {email: row[0] for email, row in (await rows(outbox_db)).items()} == {
+        "flaky@example.com": 3, "unknown@example.com": 3,
+    }
+    # even with the backoff over, the rows are never claimed again
+    async with outbox_db() as db:
+        await db.execute(update(Notification).values(locked_until=None))
+        await db.commit()
+    assert await outbox.process_batch() == 0
+    assert outbox.stats()["backlog"] == 0
+
+
+@pytest.mark.asyncio
+async def test_backlog_is_counted_on_every_iteration(outbox_db, mail):
+    outbox = worker("worker")
+    await add(outbox_db, ["first@example.com"])
+    await outbox.process_batch()
+    # counted when the batch is claimed, before its rows are delivered
+    assert outbox.stats()["backlog"] == 1
+
+    # written while another worker holds every pending row, nothing to claim but still counted
+    await add(outbox_db, [f"user{idx}@example.com" for idx in range(3)], claimed_by="other",
+              locked_until=func.now() + timedelta(seconds=60))
+    assert await outbox.process_batch() == 0
+    assert outbox.stats()["backlog"] == 3
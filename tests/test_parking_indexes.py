@@ -0,0 +1,92 @@
+import os
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import literal, select, text
+from sqlalchemy.dialects import postgresql
+
+from car_parking.src.database.models import Car, Parking
+
+
+# parking sessions seeded for the plan checks, the planner only prefers an index on a table of some size
+PLAN_ROWS = int(os.environ.get("PLAN_TEST_ROWS", 200_000))
+CARS = 5_000
+
+
+def index_names(plan: dict) -> set[str]:
+    names = {plan["Index Name"]} if "Index Name" in plan else set()
+    for child in plan.get("Plans", []):
+        names |= index_names(child)
+    return names
+
+
+async def explain(db, statement) -> dict:
+    sql = statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+    plan = await db.scalar(text(f"EXPLAIN (FORMAT JSON) {sql}"))
+    return plan[0]["Plan"]
+
+
+@pytest_asyncio.fixture
+async def seeded(db_sessionmaker):
+    async with db_sessionmaker() as db:
+        await db.execute(text(
+            """
+            INSERT INTO cars_table (license_plate, banned)
+            SELECT 'AA' || n || 'BB', false FROM generate_series(1, :cars) AS n
+            """
+        ), {"cars": CARS})
+        # a long closed history for every car and one open session for every tenth of them
+        await db.execute(text(
+            """
+            INSERT INTO parking_places_table (license_plate, enter_time, departure_time, status)
+            SELECT 'AA' || (n % :cars + 1) || 'BB', enter_time, enter_time + interval '2 hours', true
+            FROM (
+                SELECT n, now() - interval '1 day' - random() * interval '365 days' AS enter_time
+                FROM generate_series(1, :rows) AS n
+            ) AS sessions
+            """
+        ), {"cars": CARS, "rows": PLAN_ROWS})
+        await db.execute(text(
+            """
+            INSERT INTO parking_places_table (license_plate, enter_time, status)
+            SELECT 'AA' || n || 'BB', now(), false FROM generate_series(1, :cars, 10) AS n
+            """
+        ), {"cars": CARS})
+        await db.commit()
+        await db.execute(text("ANALYZE parking_places_table"))
+        await db.execute(text("ANALYZE cars_table"))
+    return db_sessionmaker
+
+
+@pytest.mark.asyncio
+async def test_open_session_lookup_uses_the_partial_index(seeded):
+    # repository_parking.get_parking_place_by_car_license_plate and repository_users.get_user_me
+    statement = select(Parking).filter(Parking.license_plate == "AA11BB", Parking.status == False)
+    async with seeded() as db:
+        plan = await explain(db, statement)
+    assert "ux_parking_open_license_plate" in index_names(plan)
+
+
+@pytest.mark.asyncio
+async def test_gate_context_uses_the_partial_index(seeded):
+    # the open session join of gate.load_gate_context
+    plate = select(literal("AA11BB").label("license_plate")).subquery()
+    statement = (
+        select(Car, Parking)
+        .select_from(plate)
+        .outerjoin(Car, Car.license_plate == plate.c.license_plate)
+        .outerjoin(Parking, (Parking.license_plate == plate.c.license_plate) & (Parking.status == False))
+        .limit(1)
+    )
+    async with seeded() as db:
+        plan = await explain(db, statement)
+    assert "ux_parking_open_license_plate" in index_names(plan)
+
+
+@pytest.mark.asyncio
+async def test_parking_history_uses_the_license_plate_index(seeded):
+    # repository_users.get_parking_info
+    statement = select(Parking).filter(Parking.license_plate == "AA12BB", Parking.status == True)
+    async with seeded() as db:
+        plan = await explain(db, statement)
+    assert "ix_parking_license_plate_enter" in index_names(plan)
@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+import pytest
+from passlib.context import CryptContext
+
+from car_parking.src.services.auth import service_auth
+
+
+LOGINS = 16
+GATES = 40
+# a gate request is mostly awaiting the database and the inference pool
+GATE_IO = 0.01
+
+
+def percentile(latencies: list, fraction: float) -> float:
+    latencies = sorted(latencies)
+    return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))]
+
+
+async def gate_latencies(burst) -> list:
+    latencies = []
+
+    async def gate():
+        started = time.perf_counter()
+        await asyncio.sleep(GATE_IO)
+        latencies.append(time.perf_counter() - started)
+
+    async def gates():
+        requests = []
+        for _ in range(GATES):
+            requests.append(asyncio.create_task(gate()))
+            await asyncio.sleep(GATE_IO / 2)
+        await asyncio.gather(*requests)
+
+    await asyncio.gather(gates(), burst())
+    return latencies
+
+
+@pytest.mark.asyncio
+async def test_gate_latency_during_a_login_burst(monkeypatch):
+    # cheaper rounds keep the test short, the event loop stalls the same way at any cost
+    monkeypatch.setattr(service_auth, "pwd_context", CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=8))
+    hashed = service_auth.pwd_context.hash("secret")
+
+    async def no_logins():
+        pass
+
+    async def inline_logins():
+        # what the routes did before, bcrypt on the event loop
+        for _ in range(LOGINS):
+            service_auth.pwd_context.verify("secret", hashed)
+            await asyncio.sleep(0)
+
+    async def executor_logins():
+        results = await asyncio.gather(*(service_auth.verify_password("secret", hashed) for _ in range(LOGINS)))
+        assert all(verified for verified, _ in results)
+
+    p99 = {}
+    for name, burst in [("no logins", no_logins), ("bcrypt on the event loop", inline_logins),
+                        ("bcrypt on password_executor", executor_logins)]:
+        latencies = await gate_latencies(burst)
+        p99[name] = percentile(latencies, 0.99)
+        print(f"{name}: gate p50 {percentile(latencies, 0.5) * 1000:.1f}ms, p99 {p99[name] * 1000:.1f}ms")
+
+    assert p99["bcrypt on password_executor"] < p99["bcrypt on the event loop"]
@@ -0,0 +1,134 @@
+import time
+
+import numpy as np
+import pytest
+
+from car_parking.src.services.plate_reader import PlatesReader
+
+
+MAX_DIAG_MULTIPLYER = 5
+MAX_ANGLE_DIFF = 12.0
+MAX_AREA_DIFF = 0.5
+MAX_WIDTH_DIFF = 0.8
+MAX_HEIGHT_DIFF = 0.2
+MIN_N_MATCHED = 5
+
+
+def find_chars_reference(rects: np.ndarray) -> list:
+    # the recursive grouping that PlatesReader.get_rectangles used before it was vectorized
+    possible_contours = [
+        {"idx": idx, "w": w, "h": h, "cx": x + w / 2, "cy": y + h / 2}
+        for idx, (x, y, w, h) in enumerate(rects.tolist())
+    ]
+
+    def find_chars(contour_list):
+        matched_result_idx = []
+
+        for d1 in contour_list:
+            matched_contours_idx = []
+            for d2 in contour_list:
+                if d1["idx"] == d2["idx"]:
+                    continue
+
+                dx = abs(d1["cx"] - d2["cx"])
+                dy = abs(d1["cy"] - d2["cy"])
+
+                diagonal_length1 = np.sqrt(d1["w"] ** 2 + d1["h"] ** 2)
+
+                distance = np.linalg.norm(np.array([d1["cx"], d1["cy"]]) - np.array([d2["cx"], d2["cy"]]))
+                if dx == 0:
+                    angle_diff = 90
+                else:
+                    angle_diff = np.degrees(np.arctan(dy / dx))
+                area_diff = abs(d1["w"] * d1["h"] - d2["w"] * d2["h"]) / (d1["w"] * d1["h"])
+                width_diff = abs(d1["w"] - d2["w"]) / d1["w"]
+                height_diff = abs(d1["h"] - d2["h"]) / d1["h"]
+
+                if distance < diagonal_length1 * MAX_DIAG_MULTIPLYER \
+                and angle_diff < MAX_ANGLE_DIFF and area_diff < MAX_AREA_DIFF \
+                and width_diff < MAX_WIDTH_DIFF and height_diff < MAX_HEIGHT_DIFF:
+                    matched_contours_idx.append(d2["idx"])
+
+            matched_contours_idx.append(d1["idx"])
+
+            if len(matched_contours_idx) < MIN_N_MATCHED:
+                continue
+
+            matched_result_idx.append(matched_contours_idx)
+
+            unmatched_contour_idx = []
+            for d4 in contour_list:
+                if d4["idx"] not in matched_contours_idx:
+                    unmatched_contour_idx.append(d4["idx"])
+
+            unmatched_contour = np.take(possible_contours, unmatched_contour_idx)
+
+            for idx in find_chars(unmatched_contour):
+                matched_result_idx.append(idx)
+
+            break
+
+        return matched_result_idx
+
+    return find_chars(possible_contours)
+
+
+def plate_row(x: int, y: int, chars: int = 7, w: int = 12, h: int = 24, gap: int = 4) -> list:
+    return [(x + i * (w + gap), y, w, h) for i in range(chars)]
+
+
+def random_layout(rng: np.random.Generator, boxes: int, plates: int) -> np.ndarray:
+    rects = [
+        (rng.integers(0, 1200), rng.integers(0, 800), rng.integers(5, 30), rng.integers(10, 40))
+        for _ in range(boxes)
+    ]
+    for _ in range(plates):
+        rects += plate_row(rng.integers(0, 1000), rng.integers(0, 760),
+                           chars=rng.integers(5, 9), w=rng.integers(8, 16), h=rng.integers(18, 30))
+    order = rng.permutation(len(rects))
+    return np.array(rects, dtype=np.float64)[order]
+
+
+def test_no_boxes():
+    assert PlatesReader.find_chars(np.zeros((0, 4))) == []
+
+
+def test_single_plate():
+    rects = np.array(plate_row(100, 50) + [(400, 300, 20, 30), (10, 10, 6, 12)], dtype=np.float64)
+    assert PlatesReader.find_chars(rects) == [[1, 2, 3, 4, 5, 6, 0]]
+    assert PlatesReader.find_chars(rects) == find_chars_reference(rects)
+
+
+def test_two_plates():
+    rects = np.array(plate_row(100, 50) + plate_row(600, 400, chars=6), dtype=np.float64)
+    groups = PlatesReader.find_chars(rects)
+    assert [sorted(group) for group in groups] == [list(range(7)), list(range(7, 13))]
+    assert groups == find_chars_reference(rects)
+
+
+def test_too_few_characters():
+    rects = np.array(plate_row(100, 50, chars=MIN_N_MATCHED - 1), dtype=np.float64)
+    assert PlatesReader.find_chars(rects) == []
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_matches_reference_on_random_layouts(seed):
+    rng = np.random.default_rng(seed)
+    rects = random_layout(rng, boxes=int(rng.integers(0, 80)), plates=int(rng.integers(0, 3)))
+    assert PlatesReader.find_chars(rects) == find_chars_reference(rects)
+
+
+def test_faster_than_reference():
+    rects = random_layout(np.random.default_rng(0), boxes=400, plates=3)
+
+    started = time.perf_counter()
+    expected = find_chars_reference(rects)
+    reference_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    groups = PlatesReader.find_chars(rects)
+    vectorized_time = time.perf_counter() - started
+
+    print(f"find_chars on {len(rects)} boxes: {reference_time * 1000:.1f}ms -> {vectorized_time * 1000:.1f}ms")
+    assert groups == expected
+    assert vectorized_time * 10 < reference_time
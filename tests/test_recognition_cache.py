@@ -0,0 +1,52 @@
+import cv2
+import numpy as np
+import pytest
+
+from car_parking.src.conf.config import settings
+from car_parking.src.routes import parking as routes_parking
+from car_parking.src.services.recognition_cache import RecognitionCache
+
+
+class Upload:
+    def __init__(self, content: bytes):
+        self.content = content
+
+    async def read(self) -> bytes:
+        return self.content
+
+
+def frame(quality: int) -> bytes:
+    # a ramp without flat areas, so re-encoding does not flip the bits of the image hash
+    ramp = np.linspace(0, 255, 320, dtype=np.uint8)
+    img = np.repeat(np.tile(ramp, (240, 1))[:, :, None], 3, axis=2)
+    return cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes()
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = RecognitionCache()
+    monkeypatch.setattr(routes_parking, "recognition_cache", cache)
+    return cache
+
+
+@pytest.mark.parametrize("phash", [False, True])
+@pytest.mark.asyncio
+async def test_one_miss_per_lookup(monkeypatch, cache, phash):
+    monkeypatch.setattr(settings, "recognition_cache_phash", phash)
+    recognized = []
+
+    async def recognize_plate(img):
+        recognized.append(img)
+        return "AA1234BB"
+
+    monkeypatch.setattr(routes_parking, "recognize_plate", recognize_plate)
+
+    assert await routes_parking.read_license_plate(Upload(frame(90))) == "AA1234BB"
+    assert (cache.hits, cache.misses) == (0, 1)
+    assert await routes_parking.read_license_plate(Upload(frame(90))) == "AA1234BB"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # the same frame encoded again, only the image hash finds it
+    await routes_parking.read_license_plate(Upload(frame(70)))
+    assert (cache.hits, cache.misses) == ((2, 1) if phash else (1, 2))
+    assert len(recognized) == (1 if phash else 2)
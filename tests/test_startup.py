@@ -0,0 +1,59 @@
+import importlib.util
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from car_parking.src.conf.config import settings
+from car_parking.src.services.classifier import RUNTIMES, model_path
+
+
+ROOT = Path(__file__).parent.parent
+
+STARTUP = """
+import json, resource, sys, time
+started = time.perf_counter()
+import car_parking.src.routes.parking
+imported = time.perf_counter() - started
+result = {
+    "import_s": imported,
+    "import_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "loaded": sorted(name for name in ("keras", "tensorflow", "onnxruntime") if name in sys.modules),
+}
+if len(sys.argv) > 1:
+    from car_parking.src.services.inference import get_reader
+    started = time.perf_counter()
+    get_reader().warm_up(detector=False)
+    result["warm_up_s"] = time.perf_counter() - started
+    result["warm_up_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print(json.dumps(result))
+"""
+
+
+def startup(*args) -> dict:
+    # a fresh process, the test process has imported the models already
+    output = subprocess.run(
+        [sys.executable, "-c", STARTUP, *args], cwd=ROOT, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def test_routes_import_without_models():
+    result = startup()
+    print(f"routes import: {result['import_s']:.2f}s, {result['import_rss_mb']:.0f}MB RSS")
+    assert result["loaded"] == []
+
+
+def test_warm_up_cost():
+    # what the startup hook pays once per inference worker and the import no longer does
+    backend = settings.classifier_backend
+    if importlib.util.find_spec(RUNTIMES[backend]) is None or not Path(model_path(backend)).exists():
+        pytest.skip(f"{backend} or its model is not installed")
+    result = startup("warm_up")
+    print(
+        f"routes import: {result['import_s']:.2f}s, {result['import_rss_mb']:.0f}MB RSS, "
+        f"classifier warm-up: {result['warm_up_s']:.2f}s, {result['warm_up_rss_mb']:.0f}MB RSS"
+    )
+    assert result["warm_up_rss_mb"] >= result["import_rss_mb"]
@@ -0,0 +1,97 @@
+import threading
+
+import cv2
+import numpy as np
+import pytest
+
+from car_parking.src.services import stream_ingest
+from car_parking.src.services.stream_ingest import StreamIngestor, VehicleTracker
+
+
+DETECT_EVERY = 5
+# (first frame, last frame, brightness, plate), frames are counted from 1 like VehicleTracker.frame_idx
+VEHICLES = [(1, 30, 255, "AA0001AA"), (36, 65, 160, "BB0002BB")]
+FRAMES = 70
+
+
+def vehicle_at(idx: int):
+    for first, last, brightness, plate in VEHICLES:
+        if first <= idx <= last:
+            # drives in for 10 frames, then stands at the gate
+            return (20 + 10 * min(idx - first, 10), 90, 100, 60), brightness, plate
+    return None
+
+
+def bright_box(frame):
+    points = cv2.findNonZero((frame.max(axis=2) > 100).astype(np.uint8))
+    return None if points is None else cv2.boundingRect(points)
+
+
+@pytest.fixture
+def clip(tmp_path) -> str:
+    path = str(tmp_path / "gate.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 25, (320, 240))
+    for idx in range(1, FRAMES + 1):
+        frame = np.zeros((240, 320, 3), dtype=np.uint8)
+        vehicle = vehicle_at(idx)
+        if vehicle is not None:
+            (x, y, w, h), brightness, _ = vehicle
+            frame[y:y + h, x:x + w] = brightness
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+class FakeTracker:
+    # follows the only bright box in the frame, remembers the threads it was initialised on
+    threads = []
+
+    def init(self, frame, box):
+        self.threads.append(threading.get_ident())
+
+    def update(self, frame):
+        box = bright_box(frame)
+        return box is not None, box
+
+
+@pytest.mark.asyncio
+async def test_stream_detects_every_k_frames_and_reads_each_vehicle_once(monkeypatch, clip):
+    monkeypatch.setattr(stream_ingest, "create_tracker", FakeTracker)
+    monkeypatch.setattr(FakeTracker, "threads", [])
+    detected, read = [], []
+
+    async def detect(frame):
+        detected.append(stream.tracker.frame_idx)
+        box = bright_box(frame)
+        return [] if box is None else [box]
+
+    async def recognize(roi):
+        read.append(stream.tracker.frame_idx)
+        return "AA0001AA" if roi.mean() > 200 else "BB0002BB"
+
+    async def emit(license_plate):
+        stream.events.append({"license_plate": license_plate, "frame": stream.tracker.frame_idx})
+
+    stream = StreamIngestor(clip, "entry")
+    stream.tracker = VehicleTracker(detect=detect, read=recognize, detect_every=DETECT_EVERY,
+                                    stable_frames=3, stable_iou=0.9)
+    stream._emit = emit
+    stream.running = True
+    await stream.run()
+
+    assert stream.error is None
+    assert stream.tracker.frame_idx == FRAMES
+    # a tracked vehicle is detected again only every DETECT_EVERY frames, the frame it
+    # appears on and the empty frames are searched because there is nothing to track,
+    # except the first one after a vehicle left, where the tracker loses it
+    visible = [idx for idx in detected if vehicle_at(idx) is not None]
+    appeared = [first for first, *_ in VEHICLES]
+    assert [idx for idx in visible if idx not in appeared] == [
+        idx for idx in range(1, FRAMES + 1) if idx % DETECT_EVERY == 0 and idx not in appeared and vehicle_at(idx)
+    ]
+    empty = FRAMES - sum(last - first + 1 for first, last, *_ in VEHICLES)
+    assert len(detected) - len(visible) == empty - len(VEHICLES)
+
+    assert [event["license_plate"] for event in stream.events] == [plate for *_, plate in VEHICLES]
+    assert len(read) == len(VEHICLES)
+    assert FakeTracker.threads and threading.get_ident() not in FakeTracker.threads
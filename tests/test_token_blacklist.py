@@ -0,0 +1,116 @@
+import asyncio
+import time
+import uuid
+
+import pytest
+from jose import jwt
+from sqlalchemy import event, func, select
+
+from car_parking.src.conf.config import settings
+from car_parking.src.database.models import BlacklistedToken, User
+from car_parking.src.services import auth as service_auth_module, logout as service_logout
+from car_parking.src.services.auth import service_auth
+from car_parking.src.services.token_blacklist import BloomFilter, TokenBlacklist
+from car_parking.src.services.token_cache import VerifiedTokenCache
+from car_parking.src.services.user_cache import UserCache
+
+
+REQUESTS = 1000
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1 << 16, 7)
+    added = [uuid.uuid4().hex for _ in range(5000)]
+    for token_id in added:
+        bloom.add(token_id)
+    assert all(token_id in bloom for token_id in added)
+
+    # 5000 entries in 64k bits with 7 hashes, about 0.2% of the never added ids pass the filter
+    false_positives = sum(uuid.uuid4().hex in bloom for _ in range(10000)) / 10000
+    print(f"bloom filter false positive rate {false_positives:.2%}")
+    assert false_positives < 0.01
+
+
+async def wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_logout_is_seen_by_every_worker(redis_client):
+    workers = [TokenBlacklist(redis_client, bloom_size=1 << 16), TokenBlacklist(redis_client, bloom_size=1 << 16)]
+    listeners = [asyncio.create_task(worker.listen()) for worker in workers]
+    try:
+        await wait_for(lambda: all(worker.synced for worker in workers))
+        assert not await workers[1].contains("jti")
+
+        await workers[0].revoke("jti", time.time() + 60)
+        await wait_for(lambda: workers[1].maybe_revoked("jti"))
+        assert await workers[1].contains("jti")
+        assert 0 < await redis_client.ttl(TokenBlacklist.prefix + "jti") <= 60
+    finally:
+        for listener in listeners:
+            listener.cancel()
+        await asyncio.gather(*listeners, return_exceptions=True)
+
+    # a worker started later loads the revoked tokens from redis
+    late = TokenBlacklist(redis_client, bloom_size=1 << 16)
+    await late.load()
+    assert late.maybe_revoked("jti") and not late.maybe_revoked("other")
+
+
+@pytest.mark.asyncio
+async def test_import_legacy(redis_client, db_sessionmaker):
+    valid = jwt.encode({"sub": "driver@example.com", "exp": int(time.time()) + 600, "jti": "valid"},
+                       settings.secret_key, algorithm=settings.algorithm)
+    expired = jwt.encode({"sub": "old@example.com", "exp": int(time.time()) - 600},
+                         settings.secret_key, algorithm=settings.algorithm)
+    async with db_sessionmaker() as db:
+        for idx, token in enumerate([valid, expired]):
+            db.add(User(id=idx + 1, username=f"user{idx}", email=f"user{idx}@example.com", password="hash"))
+            await db.flush()
+            db.add(BlacklistedToken(user_id=idx + 1, blacklisted_token=token))
+        await db.commit()
+
+        blacklist = TokenBlacklist(redis_client, bloom_size=1 << 16)
+        assert await blacklist.import_legacy(db) == 1
+        assert await db.scalar(select(func.count(BlacklistedToken.id))) == 0
+
+    assert 590 <= await redis_client.ttl(TokenBlacklist.prefix + "valid") <= 600
+    assert await blacklist.contains("valid")
+
+
+@pytest.mark.asyncio
+async def test_protected_request_makes_no_database_queries(redis_client, db_engine, db_sessionmaker, monkeypatch):
+    blacklist = TokenBlacklist(redis_client, bloom_size=1 << 16)
+    await blacklist.load()
+    monkeypatch.setattr(service_auth_module, "user_cache", UserCache(redis_client, ttl=60))
+    monkeypatch.setattr(service_auth_module, "token_blacklist", blacklist)
+    monkeypatch.setattr(service_logout, "token_blacklist", blacklist)
+    monkeypatch.setattr(service_auth, "token_cache", VerifiedTokenCache(16, is_revoked=blacklist.maybe_revoked))
+    async with db_sessionmaker() as db:
+        db.add(User(username="driver", email="driver@example.com", password="hash"))
+        await db.commit()
+    token = await service_auth.create_access_token({"sub": "driver@example.com"})
+
+    statements = []
+    event.listen(db_engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    async def request():
+        async with db_sessionmaker() as db:
+            principal = await service_auth.resolve_principal(token, db)
+            await service_logout.logout_dependency(principal)
+
+    # the first request loads the user into the cache
+    await request()
+    assert len(statements) == 1
+
+    started = time.perf_counter()
+    for _ in range(REQUESTS):
+        await request()
+    elapsed = time.perf_counter() - started
+    print(f"auth and logout check: {elapsed / REQUESTS * 1e6:.0f}us per request")
+    assert len(statements) == 1
+    assert blacklist.redis_checks == 0
@@ -0,0 +1,68 @@
+import time
+
+import pytest
+
+from car_parking.src.database.models import User
+from car_parking.src.schemas.users import CachedUser
+from car_parking.src.services.token_blacklist import TokenBlacklist
+from car_parking.src.services.user_cache import UserCache
+
+
+REQUESTS = 2000
+
+
+def driver() -> User:
+    return User(id=1, username="driver", email="driver@example.com", role="user", banned=False,
+                tariff_id=1, license_plate="AA0001BB")
+
+
+@pytest.mark.asyncio
+async def test_set_get_invalidate(redis_client):
+    cache = UserCache(redis_client, ttl=60)
+    cached = await cache.set(driver())
+    assert await cache.get("driver@example.com") == cached
+    assert 0 < await redis_client.ttl(cache.key("driver@example.com")) <= 60
+
+    await cache.invalidate("driver@example.com")
+    assert await cache.get("driver@example.com") is None
+    # an entry that does not match the projection is a miss
+    await redis_client.set(cache.key("driver@example.com"), '{"id": 1}')
+    assert await cache.get("driver@example.com") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+@pytest.mark.asyncio
+async def test_round_trips_per_request(redis_client):
+    # the request asked for pipelined reads of the user and the logout check, the bloom filter
+    # answers the logout check of a never revoked token without redis, so an authenticated
+    # request makes one round trip and there is nothing left to pipeline, measured here
+    cache = UserCache(redis_client, ttl=60)
+    blacklist = TokenBlacklist(redis_client)
+    await blacklist.load()
+    await cache.set(driver())
+    email, token_id = "driver@example.com", "jti"
+
+    async def separate():
+        CachedUser.parse_raw(await redis_client.get(cache.key(email)))
+        assert not await redis_client.exists(blacklist.prefix + token_id)
+
+    async def pipelined():
+        async with redis_client.pipeline(transaction=False) as pipe:
+            cached, revoked = await pipe.get(cache.key(email)).exists(blacklist.prefix + token_id).execute()
+        CachedUser.parse_raw(cached)
+        assert not revoked
+
+    async def current():
+        await cache.get(email)
+        assert not await blacklist.contains(token_id)
+
+    for name, request in [("get + exists", separate), ("pipelined get + exists", pipelined),
+                          ("user cache + bloom filter", current)]:
+        await request()
+        started = time.perf_counter()
+        for _ in range(REQUESTS):
+            await request()
+        elapsed = time.perf_counter() - started
+        print(f"{name}: {elapsed / REQUESTS * 1e6:.0f}us per request")
+
+    assert blacklist.redis_checks == 0
@@ -0,0 +1,57 @@
+import os
+import time
+from pathlib import Path
+
+import cv2
+import pytest
+
+from car_parking.src.services.vehicle_detector import VehicleDetector, path
+
+
+# a directory of photos of cars at the gate, the benchmark is skipped without it
+BENCHMARK_IMAGES = os.environ.get("DETECTOR_BENCHMARK_IMAGES")
+WEIGHTS = Path(path) / "yolov4.weights"
+
+
+def biggest(boxes):
+    return max(boxes, key=lambda box: box[2] * box[3]) if len(boxes) else None
+
+
+def iou(a, b) -> float:
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    w = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    h = max(0, min(ay + ah, by + bh) - max(ay, by))
+    return w * h / (aw * ah + bw * bh - w * h)
+
+
+def test_benchmark():
+    # the single 832 pass over the whole frame is the reference, the cascade should find the
+    # same biggest vehicle (the one the plate is read from) in a fraction of the time
+    # (the weights are kept in git lfs, a checkout without them has a pointer file only)
+    if not WEIGHTS.exists() or WEIGHTS.stat().st_size < 1024 * 1024:
+        pytest.skip("yolov4.weights are not downloaded")
+    if not BENCHMARK_IMAGES:
+        pytest.skip("DETECTOR_BENCHMARK_IMAGES is not set")
+    images = [cv2.imread(str(image)) for image in sorted(Path(BENCHMARK_IMAGES).glob("*.jp*g"))]
+    if not images:
+        pytest.skip("no jpeg images in DETECTOR_BENCHMARK_IMAGES")
+
+    detectors = {
+        "reference": VehicleDetector(input_size=832, refine_size=0),
+        "low-res": VehicleDetector(refine_size=0),
+        "cascade": VehicleDetector(),
+    }
+    results = {}
+    for name, detector in detectors.items():
+        detector.detect_vehicles(images[0])
+        started = time.perf_counter()
+        results[name] = [biggest(detector.detect_vehicles(img)) for img in images]
+        elapsed = (time.perf_counter() - started) / len(images)
+
+        matched = sum(
+            (box is None and expected is None) or (box is not None and expected is not None and iou(box, expected) >= 0.5)
+            for box, expected in zip(results[name], results["reference"])
+        )
+        print(f"{name}: {elapsed * 1000:.1f}ms per image, {matched}/{len(images)} biggest vehicles match the reference")
+        assert elapsed > 0